@@ -1,6 +1,5 @@
-from light_controller import LightStripController
 from machine import Pin
-import neopixel
+from trickLED import FrameBuffer
 
 # LED_PIN
 LED1_PIN = 13
@@ -16,13 +15,24 @@ LED4_NUM_PIXELS = 10
 
 
 class LightStrip:
-    def __init__(self, led_pin, led_num_pixels) -> None:
-        self.pin = Pin(led_pin, Pin.OUT)
-        self.pixel_count = led_num_pixels
-        self.np = neopixel.NeoPixel(self.pin, self.pixel_count)
+    def __init__(self, np) -> None:
+        """
+        :param np: TrickLED view of the strip in the shared framebuffer
+        """
+        self.np = np
+        self.pin = np.pin
+        self.pixel_count = np.n
 
 
-LightStrip1 = LightStrip(LED1_PIN, LED1_NUM_PIXELS)
-LightStrip2 = LightStrip(LED2_PIN, LED2_NUM_PIXELS)
-LightStrip3 = LightStrip(LED3_PIN, LED3_NUM_PIXELS)
-LightStrip4 = LightStrip(LED4_PIN, LED4_NUM_PIXELS)
+# one buffer for all strips, framebuffer.show() renders and writes them back to back
+framebuffer = FrameBuffer([
+    (Pin(LED1_PIN, Pin.OUT), LED1_NUM_PIXELS),
+    (Pin(LED2_PIN, Pin.OUT), LED2_NUM_PIXELS),
+    (Pin(LED3_PIN, Pin.OUT), LED3_NUM_PIXELS),
+    (Pin(LED4_PIN, Pin.OUT), LED4_NUM_PIXELS),
+])
+
+LightStrip1 = LightStrip(framebuffer[0])
+LightStrip2 = LightStrip(framebuffer[1])
+LightStrip3 = LightStrip(framebuffer[2])
+LightStrip4 = LightStrip(framebuffer[3])
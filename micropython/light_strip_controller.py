@@ -1,6 +1,20 @@
-import time
+from random import getrandbits
+
+import trickLED
+from trickLED import animations
+from trickLED import lut
 
 OPEN_CLOSE_TIME = 0.2
+# how the blade lights and retracts, see animations.Ignition
+IGNITION_STYLE = animations.Ignition.STYLE_STANDARD
+IGNITION_EASING = lut.EASE_OUT
+RETRACTION_EASING = lut.EASE_IN
+# opacity the clash flash loses each frame as it fades back to the blade
+FLASH_DECAY = 64
+# lockup overlay color, opacity and how much the opacity flickers each frame (up to 256)
+LOCK_COLOR = (255, 255, 160)
+LOCK_OPACITY = 160
+LOCK_FLICKER = 64
 
 
 class LightStripController:
@@ -9,37 +23,56 @@ class LightStripController:
         self.light_strip = light_strip
         self.pixel_count = self.light_strip.pixel_count
         self.open_time = OPEN_CLOSE_TIME  # time to open or close
-        # time per pixel on open or close
-        self.pixel_delay = int(self.open_time/self.pixel_count*1000)
         self.white_color = (255, 255, 255)
         self.current_color = self.white_color
+        # ignition and retraction, drawn by update() while it runs
+        self.ignition = animations.Ignition(self.light_strip.np, style=IGNITION_STYLE)
+        self.igniting = False
+        # overlays drawn over whatever the blade is showing, advanced by update()
+        self.locked = False
+        self.lock_layer = self.light_strip.np.add_layer(trickLED.BLEND_ADD)
+        self.lock_layer.fill(LOCK_COLOR)
+        self.flash_layer = self.light_strip.np.add_layer(trickLED.BLEND_REPLACE)
+        self.flash_layer.fill(self.white_color)
 
     def open(self):
-        self.light_strip.np.write()
-        for i in range(self.pixel_count):
-            self.light_strip.np[i] = self.current_color
-            self.light_strip.np.write()
-            time.sleep_ms(self.pixel_delay)
+        """ Start lighting the blade, update() draws it over open_time """
+        self._ignite(False, IGNITION_EASING)
 
     def close(self):
-        for i in range(self.pixel_count-1, -1, -1):
-            self.light_strip.np[i] = (0, 0, 0)
-            self.light_strip.np.write()
-            time.sleep_ms(self.pixel_delay)
+        """ Start retracting the blade, update() draws it over open_time """
+        self._ignite(True, RETRACTION_EASING)
+
+    def _ignite(self, retract, easing):
+        self.ignition.start(color=self.current_color, duration=int(self.open_time * 1000), easing=easing,
+                            retract=retract)
+        self.igniting = True
 
     def set_color(self, color):
         self.current_color = color
 
     def fill_color(self, color):
-        for i in range(self.pixel_count):
-            self.light_strip.np[i] = color
+        self.light_strip.np.fill_solid(color)
         self.light_strip.np.write()
 
     def flash_white(self):
-        self.fill_color(self.white_color)
-        time.sleep_ms(self.pixel_delay)
-        self.fill_color(self.current_color)
-        pass
+        """ Flash the blade white, update() fades it back to the blade """
+        self.flash_layer.opacity = 255
+        self.light_strip.np.write()
+
+    def update(self):
+        """ Advance the ignition and the overlays one frame. Call before each write, e.g.
+            framebuffer.show(controller.update)
+        """
+        if self.igniting:
+            self.ignition.update()
+            self.igniting = not self.ignition.done
+        flash = self.flash_layer
+        if flash.opacity:
+            flash.opacity = max(flash.opacity - FLASH_DECAY, 0)
+        if self.locked:
+            # a random byte scaled to 0 to LOCK_FLICKER - 1, centered on LOCK_OPACITY
+            self.lock_layer.opacity = LOCK_OPACITY - (LOCK_FLICKER >> 1) + (getrandbits(8) * LOCK_FLICKER >> 8)
 
     def idle(self):
         pass
@@ -49,12 +82,14 @@ class LightStripController:
         pass
 
     def lock(self):
-        self.fill_color(self.white_color)
-        pass
+        self.locked = True
+        self.lock_layer.opacity = LOCK_OPACITY
+        self.light_strip.np.write()
 
     def unlock(self):
-        self.fill_color(self.current_color)
-        pass
+        self.locked = False
+        self.lock_layer.opacity = 0
+        self.light_strip.np.write()
 
     def move(self):
         self.flash_white()
@@ -1,6 +1,6 @@
-from machine import Pin
+from machine import Pin, Timer
 
-from light_strip import LightStrip1, LightStrip2, LightStrip3, LightStrip4
+from light_strip import LightStrip1, LightStrip2, LightStrip3, LightStrip4, framebuffer
 from light_strip_controller import LightStripController
 from sound_controller import SoundController
 from config_controller import ConfigController
@@ -21,7 +21,7 @@ from button_controller import ButtonController
 LED_STATUS_PIN = 16
 led_status = Pin(LED_STATUS_PIN, Pin.OUT)
 
-# Light Strip - Defines a light strip
+# Light Strip - Defines a light strip, all four are views into one framebuffer
 light_strip1 = LightStrip1
 light_strip2 = LightStrip2
 light_strip3 = LightStrip3
@@ -33,6 +33,24 @@ light_strip_controller2 = LightStripController(light_strip2)
 light_strip_controller3 = LightStripController(light_strip3)
 light_strip_controller4 = LightStripController(light_strip4)
 
+# Light Frames - Advances the overlays (clash, lockup) on every strip and writes the ones that changed
+LIGHT_FRAME_TIME = 20  # ms
+
+
+def render_light_frame(timer):
+    framebuffer.show(
+        light_strip_controller1.update,
+        light_strip_controller2.update,
+        light_strip_controller3.update,
+        light_strip_controller4.update
+    )
+
+
+light_frame_timer = Timer(1)
+light_frame_timer.init(period=LIGHT_FRAME_TIME,
+                       mode=Timer.PERIODIC,
+                       callback=render_light_frame)
+
 # Accessory Controllers - Controls sound, movement, config, sd card
 # # SPI Specific
 spi_controller = SPIController()
@@ -0,0 +1,23 @@
+"""
+Run the trickLED tests on a PC with the stand-ins from trickLEDSamples/host.py: python3 -m pytest tests
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'trickLEDSamples'))
+
+import host  # noqa: E402
+
+host.install()
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def wire(monkeypatch):
+    """ Bytes sent by every NeoPixel.write(), in order """
+    sent = []
+    monkeypatch.setattr(host.NeoPixel, 'write', lambda self: sent.append(bytes(self.buf)))
+    return sent
@@ -0,0 +1,19 @@
+import benchmark
+
+GOOD = {'X/10': {'us': 100, 'alloc': 0}}
+
+
+def test_new_error_is_regression():
+    assert benchmark.compare({'X/10': {'error': 'boom'}}, GOOD) == ['X/10']
+
+
+def test_old_errors_are_not_regressions():
+    bad = {'X/10': {'error': 'boom'}}
+    assert benchmark.compare(bad, bad) == []
+    assert benchmark.compare(GOOD, bad) == []
+
+
+def test_slower_and_allocating_are_regressions():
+    assert benchmark.compare({'X/10': {'us': 100, 'alloc': 0}}, GOOD) == []
+    assert benchmark.compare({'X/10': {'us': 200, 'alloc': 0}}, GOOD) == ['X/10']
+    assert benchmark.compare({'X/10': {'us': 100, 'alloc': 64}}, GOOD) == ['X/10']
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from trickLED import BitMap
+
+
+def _bitmap(bits, scroll=0):
+    bm = BitMap(len(bits))
+    for i, v in enumerate(bits):
+        bm[i] = v
+    bm.scroll(scroll)
+    return bm, bits[-scroll:] + bits[:-scroll] if scroll else list(bits)
+
+
+def _random_bits(n, seed):
+    rnd = random.Random(seed)
+    # long runs of zeros and ones so the word and byte skips are taken
+    return [rnd.random() < 0.1 if (i // 40) & 1 else rnd.random() < 0.9 for i in range(n)]
+
+
+@pytest.mark.parametrize('n', [1, 7, 32, 45, 100, 130])
+@pytest.mark.parametrize('scroll', [0, 3, -17])
+def test_popcount_and_iter_bits(n, scroll):
+    bm, bits = _bitmap([int(b) for b in _random_bits(n, n)], scroll % n)
+    assert bm.popcount() == sum(bits)
+    assert list(bm.iter_bits()) == [i for i, b in enumerate(bits) if b]
+    assert list(bm.iter_bits(0)) == [i for i, b in enumerate(bits) if not b]
+    assert [bm[i] for i in range(n)] == bits
+
+
+@pytest.mark.parametrize('scroll', [0, 5])
+def test_bit_ops(scroll):
+    n = 77
+    a_bits = [int(b) for b in _random_bits(n, 1)]
+    b_bits = [int(b) for b in _random_bits(n, 2)]
+    for method, op in (('bit_and', lambda x, y: x & y), ('bit_or', lambda x, y: x | y),
+                       ('bit_xor', lambda x, y: x ^ y)):
+        a, _ = _bitmap(a_bits)
+        b, _ = _bitmap(b_bits, scroll)
+        expected = [op(x, b[i]) for i, x in enumerate(a_bits)]
+        getattr(a, method)(b)
+        assert [a[i] for i in range(n)] == expected
+        assert a.popcount() == sum(expected)
+    a, _ = _bitmap(a_bits)
+    a.bit_not()
+    assert [a[i] for i in range(n)] == [1 - x for x in a_bits]
+    # the padding bits past n are never counted
+    assert a.popcount() == n - sum(a_bits)
+
+
+def test_different_sizes_rejected():
+    with pytest.raises(ValueError):
+        BitMap(10).bit_or(BitMap(11))
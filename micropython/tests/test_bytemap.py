@@ -0,0 +1,42 @@
+import pytest
+
+import host
+from trickLED import ByteMap, TrickLED, uint8
+
+VALS = [(0, 0, 0), (10, 128, 250), (255, 3, 77)]
+
+
+def _bytemap():
+    bm = ByteMap(len(VALS), bpi=3)
+    for i, v in enumerate(VALS):
+        bm[i] = v
+    return bm
+
+
+def _old(bm, op, val):
+    # the per item arithmetic the kernels replaced
+    return bytearray(uint8(op(bm.buf[i], val[i % bm.bpi] if isinstance(val, tuple) else val))
+                     for i in range(bm.n * bm.bpi))
+
+
+@pytest.mark.parametrize('val', [7, -7, (5, -20, 300), (1, 2, 3, 99)])
+def test_add_sub_match_per_item(val):
+    for method, op in (('add', lambda a, b: a + b), ('sub', lambda a, b: a - b)):
+        bm = _bytemap()
+        expected = _old(bm, op, val)
+        getattr(bm, method)(val)
+        assert bm.buf == expected
+
+
+def test_short_operand_rejected():
+    with pytest.raises(ValueError):
+        _bytemap().add((1, 2))
+
+
+def test_trickled_negative_channel_subtracts():
+    leds = TrickLED(host.Pin(0), 2)
+    leds.fill((100, 100, 100))
+    leds.add((-30, 20, 0))
+    assert leds[0] == (70, 120, 100)
+    leds.sub((-10, 200, 0, 5))
+    assert leds[1] == (80, 0, 100)
@@ -0,0 +1,47 @@
+import colorsys
+
+import pytest
+
+from trickLED import color
+
+
+def _close(col, ref, tol=2):
+    return max(abs(a - round(b * 255)) for a, b in zip(col, ref)) <= tol
+
+
+@pytest.mark.parametrize('s', [0, 1, 64, 128, 200, 255])
+def test_hsv_within_2_of_float(s):
+    for h in range(256):
+        for v in range(0, 256, 15):
+            assert _close(color.hsv(h, s, v), colorsys.hsv_to_rgb(h / 256, s / 255, v / 255)), (h, s, v)
+
+
+@pytest.mark.parametrize('s', [0, 50, 128, 255])
+def test_hsl_within_2_of_float(s):
+    for h in range(0, 256, 3):
+        for l in range(0, 256, 15):
+            assert _close(color.hsl(h, s, l), colorsys.hls_to_rgb(h / 256, l / 255, s / 255)), (h, s, l)
+
+
+def test_rgb_to_hsv_within_2_of_float():
+    for r in range(0, 256, 17):
+        for g in range(0, 256, 17):
+            for b in range(0, 256, 17):
+                h, s, v = color.rgb_to_hsv(r, g, b)
+                rh, rs, rv = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+                assert abs(s - rs * 255) <= 2 and abs(v - rv * 255) <= 2
+                if s:
+                    dh = abs(h - rh * 256) % 256
+                    assert min(dh, 256 - dh) <= 2, (r, g, b)
+
+
+def test_fill_hsv_matches_hsv():
+    hues = bytes(range(0, 256, 5))
+    vals = bytes((i * 7) & 255 for i in range(len(hues)))
+    order = (1, 0, 2)
+    buf = bytearray(len(hues) * 3)
+    color.fill_hsv(buf, hues, vals, sat=180, shift=3, order=order)
+    for i, h in enumerate(hues):
+        ref = color.hsv(h + 3, 180, vals[i])
+        px = buf[i * 3:i * 3 + 3]
+        assert max(abs(px[order[c]] - ref[c]) for c in range(3)) <= 2
@@ -0,0 +1,22 @@
+import types
+
+import pytest
+
+import host
+import light_strip_controller
+import trickLED
+
+
+@pytest.mark.parametrize('flicker', [16, 64, 100])
+def test_lock_flicker_stays_in_range(monkeypatch, flicker):
+    monkeypatch.setattr(light_strip_controller, 'LOCK_FLICKER', flicker)
+    leds = trickLED.TrickLED(host.Pin(0), 10)
+    controller = light_strip_controller.LightStripController(types.SimpleNamespace(np=leds, pixel_count=10))
+    controller.lock()
+    seen = []
+    for bits in (0, 255):
+        monkeypatch.setattr(light_strip_controller, 'getrandbits', lambda k, bits=bits: bits & ((1 << k) - 1))
+        controller.update()
+        seen.append(controller.lock_layer.opacity)
+    opacity = light_strip_controller.LOCK_OPACITY - (flicker >> 1)
+    assert seen == [opacity, opacity + flicker - 1]
@@ -0,0 +1,28 @@
+import tracemalloc
+
+import host
+from trickLED import FrameBuffer
+
+STRIPS = [(host.Pin(i), 10000) for i in range(4)]
+
+
+def test_views_share_one_buffer():
+    fb = FrameBuffer(STRIPS)
+    for v, off in zip(fb.views, fb.offsets):
+        assert v.n == 10000
+        assert isinstance(v.buf, memoryview) and v.buf.obj is fb.buf
+    fb[1][0] = (1, 2, 3)
+    assert fb.region(1)[:3] == fb[1].buf[:3]
+    assert any(fb.buf[fb.offsets[1] * 3:fb.offsets[1] * 3 + 3])
+
+
+def test_single_allocation():
+    size = 4 * 10000 * 3
+    tracemalloc.start()
+    try:
+        FrameBuffer(STRIPS)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # the shared buffer plus bookkeeping, not another n * bpp per strip
+    assert peak < size * 1.25
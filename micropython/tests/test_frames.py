@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import host
+import trickLED
+from trickLED import animations
+from trickLED import animations32
+from trickLED import frames
+
+
+def _live(make, n_frames):
+    random.seed(5)
+    leds = trickLED.TrickLED(host.Pin(0), 30)
+    ani = make(leds)
+    ani.start()
+    out = []
+    for _ in range(n_frames):
+        ani.frame += 1
+        ani.update()
+        leds.render()
+        out.append(bytes(leds.buf))
+    return out
+
+
+def _baked(make, n_frames, path, compress):
+    random.seed(5)
+    leds = trickLED.TrickLED(host.Pin(0), 30)
+    frames.bake(make(leds), path, n_frames, compress=compress)
+    reader = frames.FrameReader(path)
+    buf = bytearray(reader.frame_size)
+    out = []
+    while reader.readinto(buf):
+        out.append(bytes(buf))
+    reader.close()
+    return out
+
+
+@pytest.mark.parametrize('compress', [False, True])
+@pytest.mark.parametrize('make', [
+    lambda leds: animations32.Conjunction(leds, prng=trickLED.PRNG(3)),
+    lambda leds: animations32.Fire(leds, prng=trickLED.PRNG(3)),
+    lambda leds: animations.Jitter(leds, prng=trickLED.PRNG(3)),
+])
+def test_baked_matches_live(tmp_path, make, compress):
+    """ Baking without indexed captures the colors of index driven animations too """
+    live = _live(make, 20)
+    baked = _baked(make, 20, str(tmp_path / 'frames.tlf'), compress)
+    assert baked == live
+    assert sum(1 for f in baked if any(f)) > 10
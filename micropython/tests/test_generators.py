@@ -0,0 +1,79 @@
+import itertools
+import math
+
+import pytest
+
+import trickLED
+from trickLED import generators
+
+FADE_OUT = [(255, 0, 0), (238, 0, 0), (212, 0, 0), (194, 0, 0), (176, 0, 0), (152, 0, 0), (136, 0, 0), (114, 0, 0),
+            (100, 0, 0), (84, 0, 0), (68, 0, 0), (54, 0, 0), (44, 0, 0), (32, 0, 0), (22, 0, 0), (14, 0, 0),
+            (8, 0, 0), (4, 0, 0), (2, 0, 0), (2, 0, 0), (225, 30, 0), (210, 28, 0)]
+FADE_IN_OUT = [(2, 0, 0), (45, 0, 0), (81, 0, 0), (121, 0, 0), (157, 0, 0), (189, 0, 0), (213, 0, 0), (235, 0, 0),
+               (249, 0, 0), (255, 0, 0), (255, 0, 0), (249, 0, 0), (235, 0, 0), (213, 0, 0), (189, 0, 0),
+               (157, 0, 0), (121, 0, 0), (81, 0, 0), (45, 0, 0), (2, 0, 0), (1, 0, 0), (39, 5, 0)]
+STRIPED = [(200, 0, 0)] * 10 + [(177, 23, 0)] * 2
+COMPLIMENT = [(200, 0, 0), (0, 102, 98), (177, 23, 0), (0, 78, 122), (153, 47, 0), (0, 55, 145), (130, 70, 0),
+              (0, 31, 169), (106, 94, 0), (0, 8, 192), (83, 117, 0), (16, 0, 184)]
+
+
+def _float_wheel(hue, val):
+    # color_wheel before the lookup tables, the fading wheels may differ from it by rounding
+    hue = hue % 255
+    ci = int(val / 85 * (hue % 85)) & 0xFF
+    cd = val - ci
+    if hue < 85:
+        return cd, ci, 0
+    elif hue < 170:
+        return 0, cd, ci
+    return ci, 0, cd
+
+
+def _take(gen, n):
+    return [tuple(c) for c in itertools.islice(gen, n)]
+
+
+@pytest.mark.parametrize('make, expected', [
+    (lambda: generators.fading_color_wheel(), FADE_OUT),
+    (lambda: generators.fading_color_wheel(mode=trickLED.FADE_IN_OUT), FADE_IN_OUT),
+    (lambda: generators.striped_color_wheel(), STRIPED),
+    (lambda: generators.color_compliment(), COMPLIMENT),
+])
+def test_exact_colors(make, expected):
+    assert _take(make(), len(expected)) == expected
+    buf = bytearray(len(expected) * 3)
+    make().fill(buf, 0, len(expected))
+    assert [tuple(buf[i:i + 3]) for i in range(0, len(buf), 3)] == expected
+
+
+@pytest.mark.parametrize('mode', [trickLED.FADE_OUT, trickLED.FADE_IN, trickLED.FADE_IN_OUT])
+def test_fading_within_one_of_float(mode):
+    gen = generators.fading_color_wheel(hue_stride=7, stripe_size=12, start_hue=3, mode=mode)
+    levels = gen.brightness_values
+    for i, col in enumerate(_take(gen, 12 * 40)):
+        ref = _float_wheel(3 + 7 * (i // 12), levels[i % 12])
+        assert max(abs(a - b) for a, b in zip(col, ref)) <= 1
+
+
+@pytest.mark.parametrize('mode', [trickLED.FADE_OUT, trickLED.FADE_IN, trickLED.FADE_IN_OUT])
+@pytest.mark.parametrize('stripe_size', [2, 5, 20, 64])
+def test_fade_levels_follow_sine(mode, stripe_size):
+    # the levels come from the integer sine table, within a few steps of the float sine they replaced
+    levels = generators.fading_color_wheel(stripe_size=stripe_size, mode=mode).brightness_values
+    for i, level in enumerate(levels):
+        if mode == trickLED.FADE_IN_OUT:
+            ref = 2 + int(math.sin(i * math.pi / (stripe_size - 1)) * 253)
+        else:
+            ref = 255 - int(math.sin((i / (stripe_size - 1) + (mode == trickLED.FADE_IN)) * math.pi / 2) * 253)
+        assert abs(level - ref) <= 4
+
+
+def test_table_kept_for_an_equal_order():
+    gen = generators.striped_color_wheel(stripe_size=4)
+    buf = bytearray(12)
+    gen.fill(buf, 0, 4, 3, (1, 0, 2))
+    table = bytes(gen._table)
+    gen._table[:] = bytes(len(table))
+    # an equal order built anew, as NeoPixel.ORDER slices are, must not rebuild the table
+    gen.fill(buf, 0, 4, 3, tuple([1, 0, 2]))
+    assert not any(gen._table)
@@ -0,0 +1,29 @@
+import host
+import trickLED
+from trickLED import animations
+
+
+def test_retraction_starts_from_the_lit_blade(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(animations.time, 'ticks_ms', lambda: now[0])
+    leds = trickLED.TrickLED(host.Pin(0), 20)
+    ignition = animations.Ignition(leds, color=(0, 0, 200), duration=100)
+    ignition.start()
+    now[0] = 100
+    ignition.update()
+    assert ignition.done and bytes(leds.buf) == bytes((0, 0, 200)) * 20
+    ignition.start(retract=True)
+    assert bytes(leds.buf) == bytes((0, 0, 200)) * 20
+    now[0] = 150
+    ignition.update()
+    assert 0 < leds.buf.count(200) < 20
+    now[0] = 200
+    ignition.update()
+    assert not any(leds.buf)
+
+
+def test_lighting_starts_dark():
+    leds = trickLED.TrickLED(host.Pin(0), 20)
+    leds.fill((9, 9, 9))
+    animations.Ignition(leds).start()
+    assert not any(leds.buf)
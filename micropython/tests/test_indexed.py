@@ -0,0 +1,91 @@
+import host
+import trickLED
+from trickLED import TrickLED
+
+N = 6
+PAL = [(200, 0, 0), (0, 200, 0), (0, 0, 200), (10, 20, 30)]
+
+
+def _palette():
+    pal = trickLED.ByteMap(len(PAL), bpi=3)
+    for i, col in enumerate(PAL):
+        pal[i] = col
+    return pal
+
+
+def _rgb(leds, index):
+    # the wire bytes of the same colors set directly
+    ref = TrickLED(host.Pin(0), N)
+    for i, k in enumerate(index):
+        ref[i] = PAL[k]
+    return bytes(ref.buf)
+
+
+def test_strips_share_one_wire_buffer(wire):
+    a = TrickLED(host.Pin(0), N)
+    b = TrickLED(host.Pin(1), N)
+    ia = a.set_indexed(_palette())
+    ib = b.set_indexed(_palette())
+    assert a.buf is b.buf
+    ia.buf[:] = bytes((0, 1, 2, 3, 0, 1))
+    ib.buf[:] = bytes((3, 3, 2, 2, 1, 1))
+    a.write()
+    b.write()
+    assert wire == [_rgb(a, ia.buf), _rgb(b, ib.buf)]
+    # a strip given its buffer keeps it
+    c = TrickLED(host.Pin(2), N, buf=bytearray(N * 3))
+    c.set_indexed(_palette())
+    assert c.buf is not a.buf
+
+
+def test_indexed_strip_holds_a_third():
+    rgb = TrickLED(host.Pin(0), 144)
+    rgb.write()
+    leds = TrickLED(host.Pin(1), 144)
+    leds.set_indexed(_palette())
+    leds.write()
+    assert leds._last is None and leds._rbuf is None
+    # the index and its copy for change tracking against buf and its copy
+    assert (len(leds.index.buf) + len(leds._ilast)) * 3 == len(rgb.buf) + len(rgb._last)
+
+
+def test_transition_children_keep_their_buffers():
+    from trickLED import animations32
+    from trickLED.animations import Transition
+    leds = TrickLED(host.Pin(0), N)
+    tr = Transition(leds, animations32.Fire(leds), animations32.Conjunction(leds))
+    tr.setup()
+    first, second = tr.children
+    assert first.leds.index is not None and second.leds.index is not None
+    assert first.leds.buf is not second.leds.buf
+
+
+def test_changes_tracked_on_index(wire):
+    leds = TrickLED(host.Pin(0), N)
+    idx = leds.set_indexed(_palette())
+    leds.write()
+    leds.write()
+    assert leds.write_stats['skipped'] == 1
+    idx[2] = 1
+    leds.write()
+    assert len(wire[-1]) == 9
+    leds.set_palette(_palette())
+    leds.write()
+    assert len(wire[-1]) == N * 3
+    leds.index_shift = 1
+    leds.write()
+    assert len(wire) == 4
+
+
+def test_clear_keeps_last_colors():
+    a = TrickLED(host.Pin(0), N)
+    b = TrickLED(host.Pin(1), N)
+    ia = a.set_indexed(_palette())
+    ia.buf[:] = bytes((2,) * N)
+    b.set_indexed(_palette())
+    a.write()
+    b.write()
+    shared = a.buf
+    a.clear_indexed()
+    assert a.buf is not shared
+    assert a[0] == PAL[2] and a[N - 1] == PAL[2]
@@ -0,0 +1,152 @@
+"""
+The viper kernels run here with ptr8 and ptr32 emulated: ptr8 stores the low byte, ptr32 reads unsigned 32 bit
+values the way a 64 bit port does. Each is checked against the Python version on the same input.
+"""
+import copy
+import importlib
+import os
+import random
+import sys
+import types
+from array import array
+
+import pytest
+
+from trickLED import kernels
+
+
+class _Ptr:
+    def __init__(self, obj, fmt, mask):
+        self.mv = memoryview(obj).cast('B').cast(fmt)
+        self.mask = mask
+
+    def __getitem__(self, i):
+        return self.mv[i]
+
+    def __setitem__(self, i, v):
+        self.mv[i] = v & self.mask
+
+
+def _load_viper():
+    path = os.path.join(os.path.dirname(kernels.__file__), 'kernels_viper.py')
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    stand_in = types.ModuleType('micropython')
+    stand_in.viper = lambda f: f
+    ns = {
+        '__name__': 'kernels_viper',
+        'ptr8': lambda obj: _Ptr(obj, 'B', 0xFF),
+        'ptr32': lambda obj: _Ptr(obj, 'I', 0xFFFFFFFF),
+        'uint': lambda v: v & 0xFFFFFFFF,
+    }
+    real = sys.modules['micropython']
+    sys.modules['micropython'] = stand_in
+    try:
+        exec(code, ns)
+    finally:
+        sys.modules['micropython'] = real
+    return types.SimpleNamespace(**ns)
+
+
+viper = _load_viper()
+rnd = random.Random(5)
+
+
+def _bytes(n):
+    return bytearray(rnd.getrandbits(8) for _ in range(n))
+
+
+def _cases():
+    n = 30
+    yield 'add_const', (_bytes(n * 3), 3, n * 3, 3, 200)
+    yield 'sub_const', (_bytes(n * 3), 1, n * 3, 2, 90)
+    yield 'scale_const', (_bytes(n * 3), 0, n * 3, 1, 300)
+    yield 'div_const', (_bytes(n * 3), 0, n * 3, 3, kernels.RECIP[7])
+    for name in ('add_buf', 'sub_buf', 'scale_buf'):
+        yield name, (_bytes(n * 3), 0, n * 3, _bytes(n), 3)
+    src = _bytes(n)
+    src[::4] = bytes(len(src[::4]))
+    yield 'div_buf', (_bytes(n * 3), 0, n * 3, src, 3, kernels.RECIP)
+    yield 'blend_color', (_bytes(n * 3), 0, n * 3, bytes((10, 250, 128)), 3, 100)
+    yield 'blend_buf', (_bytes(n * 3), 3, n * 3, _bytes(n * 3), 256)
+    for mode in range(4):
+        yield 'blend_layer', (_bytes(n * 3), _bytes(n * 3), _bytes(n), 6, n * 3, mode, 180, 3)
+    yield 'hue_fill', (_bytes(n * 3), 3, n - 1, _bytes(n), _bytes(n), 1, 40, _bytes(256 * 3), 3)
+    yield 'hue_fill', (_bytes(n * 3), 0, n, _bytes(n), bytes((255,)), 0, 0, _bytes(256 * 3), 3)
+    yield 'heat_step', (_bytes(n), _bytes(n), n, 7, _bytes(4), 3)
+    yield 'stamp_add', (_bytes(n * 3), array('i', [256 * 5 + 9, 256 * 17, 256 * 29]), _bytes(9), _bytes(3), 3,
+                        bytes((255, 120, 30)), n, 3, array('i', [0, 0, 0]))
+    yield 'stamp_add', (_bytes(n * 3), array('i', [0, 256 * 2, 256 * 30 - 1]), _bytes(9), _bytes(3), 3,
+                        bytes((255, 170, 90, 20)), n, 3, array('i', [0, 0, 0]))
+    yield 'stamp_erase', (_bytes(n * 3), array('i', [6, 0, 30]), 3, 2, bytes((1, 2, 3)), n)
+    yield 'copy_runs', (_bytes(n * 3), _bytes(n * 3), array('i', [0, 4, 4, 1, 10, 0, 6, 1]), 3)
+    yield 'copy_runs', (_bytes(n * 3), _bytes(n * 3), array('i', [0, 9, 4, 0, 4, 3, 2, 1, 20, 29, 10, 0]), 3)
+    yield 'fill_pattern', (_bytes(n * 3), 2, n * 3 - 1, bytes((1, 2, 3, 4)))
+    yield 'gradient', (_bytes(n * 3), 3, n - 1, bytes((0, 255, 100)), array('i', [5 << 16, -(7 << 16), 1000]), 3)
+    yield 'popcount', (_bytes(n), 2, n)
+    for op in range(4):
+        yield 'bool_buf', (_bytes(n), _bytes(n), 1, n, op)
+    yield 'xorshift_fill', (_bytes(n), 1, n - 2, array('I', [2463534242]))
+    yield 'xorshift_bits', (array('I', [2463534242]), 7)
+    a = _bytes(n)
+    b = bytearray(a)
+    b[11] ^= 1
+    yield 'last_diff', (a, b, n)
+    yield 'last_diff', (a, bytearray(a), n)
+    yield 'rotate', (_bytes(n), _bytes(n), 3, n, 5)
+    yield 'map_channels', (_bytes(n * 3), _bytes(n * 3), 0, n * 3, _bytes(256 * 3), 3)
+    yield 'expand', (_bytes(n * 3), _bytes(n), n, 4, _bytes(16 * 3), 16, 3, 2)
+    runs = bytearray((1, 1, 2, 3, 7, 8, 9, 0x81, 9, 9, 9, 0x80, 0, 0, 0, 0, 4, 5, 6))
+    yield 'rle_apply', (_bytes(n * 3), runs, len(runs), 3, 0, n * 3)
+    yield 'rle_apply', (_bytes(n * 3), runs, len(runs), 3, 1, n * 3)
+
+
+CASES = list(_cases())
+
+
+@pytest.mark.parametrize('name, args', CASES, ids=[c[0] for c in CASES])
+def test_viper_matches_python(name, args):
+    py_args = copy.deepcopy(args)
+    vp_args = copy.deepcopy(args)
+    assert getattr(kernels, name)(*py_args) == getattr(viper, name)(*vp_args)
+    assert py_args == vp_args
+
+
+def test_helpers_saturate():
+    buf = bytearray((0, 100, 250))
+    kernels.add(buf, 10)
+    assert buf == bytearray((10, 110, 255))
+    kernels.sub(buf, (20, 0, 5))
+    assert buf == bytearray((0, 110, 250))
+    kernels.scale(buf, 2)
+    assert buf == bytearray((0, 220, 255))
+    kernels.div(buf, 3)
+    assert buf == bytearray((0, 73, 85))
+
+
+def test_falls_back_when_viper_fails(monkeypatch):
+    class Rejected(types.ModuleType):
+        def __getattr__(self, name):
+            raise RuntimeError('ViperTypeError stand-in')
+
+    monkeypatch.setitem(sys.modules, 'trickLED.kernels_viper', Rejected('trickLED.kernels_viper'))
+    try:
+        importlib.reload(kernels)
+        assert kernels.add_const.__module__ == 'trickLED.kernels'
+    finally:
+        monkeypatch.undo()
+        importlib.reload(kernels)
+
+
+@pytest.mark.parametrize('mode', range(1, 6))
+def test_repeat_plans_match(mode):
+    import host
+    from trickLED import TrickLED
+    leds = TrickLED(host.Pin(0), 20, repeat_n=6, repeat_mode=mode)
+    leds._build_plan()
+    src = _bytes(60)
+    py_dst = bytearray(60)
+    vp_dst = bytearray(60)
+    kernels.copy_runs(py_dst, src, leds._plan, 3)
+    viper.copy_runs(vp_dst, src, leds._plan, 3)
+    assert py_dst == vp_dst
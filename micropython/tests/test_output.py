@@ -0,0 +1,40 @@
+import pytest
+
+import host
+import trickLED
+from trickLED import TrickLED
+
+
+def _strip(indexed):
+    leds = TrickLED(host.Pin(0), 4)
+    if indexed:
+        pal = trickLED.ByteMap(2, bpi=3)
+        pal[0] = (200, 100, 50)
+        pal[1] = (200, 100, 50)
+        leds.set_indexed(pal)
+    else:
+        leds.fill((200, 100, 50))
+    leds.set_output(brightness=64)
+    return leds
+
+
+@pytest.mark.parametrize('indexed', [False, True])
+def test_layers_go_through_output_stage(wire, indexed):
+    leds = _strip(indexed)
+    flash = leds.add_layer(trickLED.BLEND_REPLACE)
+    flash.fill((255, 255, 255))
+    flash.opacity = 255
+    leds.write()
+    assert wire[-1] == bytes([64] * 12)
+
+
+def test_indexed_matches_rgb(wire):
+    for indexed in (False, True):
+        leds = _strip(indexed)
+        layer = leds.add_layer(trickLED.BLEND_ADD)
+        layer.fill((40, 40, 40))
+        leds.write()
+        layer.opacity = 128
+        leds.write()
+    assert wire[0] == wire[2]
+    assert wire[1] == wire[3]
@@ -0,0 +1,34 @@
+import host
+from trickLED import TrickLED
+from trickLED.particles import ParticleSystem
+
+
+def _pixels(leds):
+    return [tuple(leds[i]) for i in range(leds.n)]
+
+
+def test_particles_land_on_scrolled_strip():
+    leds = TrickLED(host.Pin(0), 10)
+    leds[0] = (1, 1, 1)
+    leds.scroll(3)
+    ps = ParticleSystem(leds)
+    ps.emit(5, 0, (200, 0, 0))
+    ps.render()
+    pixels = _pixels(leds)
+    assert pixels[5] == (200, 0, 0)
+    assert pixels[3] == (1, 1, 1)
+    assert pixels.count((0, 0, 0)) == 8
+
+
+def test_moving_particle_restores_background():
+    leds = TrickLED(host.Pin(0), 10)
+    ps = ParticleSystem(leds, glow=1, background=(0, 0, 5))
+    leds.fill((0, 0, 5))
+    ps.emit(2, 256, (0, 90, 0))
+    ps.render()
+    ps.step()
+    ps.render()
+    pixels = _pixels(leds)
+    assert pixels[1] == (0, 0, 5)
+    assert pixels[3] == (0, 90, 5)
+    assert pixels[2][1] and pixels[4][1]
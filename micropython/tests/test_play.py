@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+import host
+from trickLED import TrickLED
+from trickLED import animations
+
+
+class Slow(animations.AnimationBase):
+    """ Takes longer than its interval every frame """
+
+    def update(self):
+        time.sleep(0.025)
+
+
+def test_fps_counts_rendered_frames(capsys):
+    ani = Slow(TrickLED(host.Pin(0), 4), interval=10)
+    asyncio.run(ani.play(max_iterations=12))
+    out = capsys.readouterr().out
+    fps = float(out.split('Actual fps: ')[1].split()[0])
+    assert ani.clock.stats['dropped'] > 0
+    # about 35 fps rendered, counting the dropped frames would report the nominal 100
+    assert fps < 60
@@ -0,0 +1,66 @@
+import host
+import trickLED
+from trickLED import PRNG, TrickLED
+from trickLED import animations
+
+
+def _draws(prng):
+    out = [prng.getrandbits(k) for k in (1, 5, 16, 17, 32)]
+    out += [prng.randrange(-3, 1000) for _ in range(20)]
+    buf = bytearray(13)
+    prng.fill_bytes(buf, 1)
+    bits = bytearray(16)
+    prng.fill_bits(bits, 30)
+    return out, bytes(buf), bytes(bits)
+
+
+def test_seed_replays():
+    assert _draws(PRNG(1234)) == _draws(PRNG(1234))
+    assert _draws(PRNG(1234)) != _draws(PRNG(1235))
+    prng = PRNG(99)
+    first = _draws(prng)
+    prng.seed(99)
+    assert _draws(prng) == first
+
+
+def test_animation_replays():
+    def run(seed):
+        leds = TrickLED(host.Pin(0), 30)
+        ani = animations.Jitter(leds, prng=PRNG(seed))
+        ani.setup()
+        frames = []
+        for _ in range(10):
+            ani.frame += 1
+            ani.update()
+            frames.append(bytes(leds.buf))
+        return frames
+
+    assert run(5) == run(5)
+    assert run(5) != run(6)
+
+
+def test_randrange_rejects_out_of_range():
+    prng = PRNG(1)
+    drawn = iter([3, 3, 2])
+    asked = []
+
+    def fake(k):
+        asked.append(k)
+        return next(drawn)
+
+    prng.getrandbits = fake
+    # 3 values need 2 bits, 3 is out of range and drawn again instead of wrapping to 0
+    assert prng.randrange(10, 13) == 12
+    assert asked == [2, 2, 2]
+
+
+def test_randrange_in_range():
+    prng = PRNG(3)
+    seen = set()
+    for _ in range(600):
+        v = prng.randrange(5, 11)
+        assert 5 <= v < 11
+        seen.add(v)
+    assert seen == set(range(5, 11))
+    assert prng.randrange(7, 8) == 7
+    assert 0 <= prng.randrange(0, 1 << 32) < 1 << 32
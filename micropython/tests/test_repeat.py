@@ -0,0 +1,33 @@
+import pytest
+
+import host
+import trickLED
+from trickLED import TrickLED
+
+COLORS = [(10, 0, 0), (0, 20, 0), (0, 0, 30), (40, 40, 0)]
+MODES = [TrickLED.REPEAT_MODE_STRIPE, TrickLED.REPEAT_MODE_MIRROR, TrickLED.REPEAT_MODE_REVERSE,
+         TrickLED.REPEAT_MODE_CENTER, TrickLED.REPEAT_MODE_INTERLEAVE]
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_section_survives_writes(wire, mode):
+    leds = TrickLED(host.Pin(0), 12, repeat_n=4, repeat_mode=mode)
+    for i, col in enumerate(COLORS):
+        leds[i] = col
+    section = bytes(leds.buf[:12])
+    expected = b''.join(section[k * 3:k * 3 + 3] for k in leds._repeat_map())
+    for _ in range(3):
+        leds.write(force=True)
+        assert bytes(leds.buf[:12]) == section
+        assert wire[-1] == expected
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_scroll_after_repeat(wire, mode):
+    leds = TrickLED(host.Pin(0), 12, repeat_n=4, repeat_mode=mode)
+    for i, col in enumerate(COLORS):
+        leds[i] = col
+    leds.write()
+    leds.scroll(1)
+    leds.write()
+    assert [leds[i] for i in range(4)] == [trickLED.colval(c) for c in COLORS[-1:] + COLORS[:-1]]
@@ -0,0 +1,45 @@
+from trickLED import scheduler
+
+
+def _record(stats, *update_us):
+    for us in update_us:
+        stats.begin()
+        stats.end(us, us * 2)
+
+
+def test_no_frames():
+    stats = scheduler.FrameStats(4)
+    assert stats.summary('update_us') is None
+    assert stats.report().startswith('no frames - frames: 0')
+
+
+def test_summary_of_kept_frames():
+    stats = scheduler.FrameStats(4)
+    _record(stats, 40, 10, 30)
+    assert stats.summary('update_us') == (10, 26, 40, 40)
+    assert stats.summary('write_us') == (20, 53, 80, 80)
+
+
+def test_oldest_frames_overwritten():
+    stats = scheduler.FrameStats(4)
+    _record(stats, 900, 800, 1, 2, 3, 4)
+    assert stats.frames == 6
+    assert stats.summary('update_us') == (1, 2, 4, 4)
+
+
+def test_p99_ignores_the_worst_frame():
+    stats = scheduler.FrameStats(200)
+    _record(stats, *([5] * 198 + [7, 1000]))
+    assert stats.summary('update_us')[2:] == (1000, 7)
+
+
+def test_report_and_reset():
+    stats = scheduler.FrameStats(4)
+    _record(stats, 10, 20)
+    report = stats.report()
+    for field in scheduler.FrameStats.FIELDS:
+        assert field in report
+    assert 'frames: 2' in report
+    assert all(v >= 0 for v in stats.summary('alloc'))
+    stats.reset()
+    assert stats.summary('frame_us') is None
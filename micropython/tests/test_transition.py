@@ -0,0 +1,70 @@
+import pytest
+
+import host
+import trickLED
+from trickLED import animations
+
+
+def _convergent(leds):
+    return animations.Convergent(leds, palette=[(200, 0, 0), (0, 200, 0), (0, 0, 200)])
+
+
+def _blaster(leds):
+    return animations.BlasterDeflect(leds, odds=255, prng=trickLED.PRNG(7))
+
+
+def _clash(leds):
+    return animations.ClashSparks(leds, odds=255, prng=trickLED.PRNG(7))
+
+
+@pytest.mark.parametrize('make', [_convergent, _blaster, _clash])
+def test_child_draws_off_screen(make):
+    """ A child in a transition draws the same pixels into its own strip as it does playing alone """
+    alone = make(trickLED.TrickLED(host.Pin(0), 30))
+    alone.start()
+    leds = trickLED.TrickLED(host.Pin(0), 30)
+    child = make(leds)
+    # alternate=False updates the child every frame, like playing alone
+    tr = animations.Transition(leds, child, animations.Rainbow(leds), duration=10000, alternate=False)
+    tr.start()
+    assert child.leds is not leds
+    for _ in range(12):
+        alone.frame += 1
+        alone.update()
+        alone.leds.render()
+        tr.frame += 1
+        tr.update()
+    assert bytes(child.leds.buf) == bytes(alone.leds.buf)
+    assert any(child.leds.buf)
+
+
+def test_set_leds_checks_length():
+    ani = animations.Convergent(trickLED.TrickLED(host.Pin(0), 30))
+    with pytest.raises(ValueError):
+        ani.set_leds(trickLED.TrickLED(host.Pin(0), 20))
+
+
+def test_blend_follows_time(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(animations.time, 'ticks_ms', lambda: now[0])
+    leds = trickLED.TrickLED(host.Pin(0), 10)
+    first = animations.Rainbow(leds)
+    second = animations.Convergent(leds, palette=[(200, 0, 0)])
+    tr = animations.Transition(leds, first, second, duration=400, interval=10)
+    tr.start()
+    # however many frames run, the blend only moves with the clock
+    for _ in range(50):
+        tr.frame += 1
+        tr.update()
+    assert not tr.done and bytes(leds.buf) == bytes(first.leds.buf)
+    now[0] = 400
+    tr.frame += 1
+    tr.update()
+    assert tr.done and bytes(leds.buf) == bytes(second.leds.buf)
+
+
+def test_children_leave_the_pin_alone():
+    leds = trickLED.TrickLED(host.Pin(0), 10)
+    tr = animations.Transition(leds, animations.Rainbow(leds), animations.Rainbow(leds))
+    assert all(ani.leds.pin is None for ani in tr.children)
+    assert tr.children[0].leds.buf is not tr.children[1].leds.buf
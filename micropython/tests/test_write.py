@@ -0,0 +1,54 @@
+import host
+from trickLED import TrickLED
+
+
+def _strip():
+    leds = TrickLED(host.Pin(0), 8)
+    leds.fill((5, 6, 7))
+    return leds
+
+
+def test_unchanged_frames_skipped(wire):
+    leds = _strip()
+    leds.write()
+    leds.write()
+    leds.write()
+    assert len(wire) == 1
+    assert leds.write_stats == {'writes': 1, 'skipped': 2, 'shortened': 0}
+
+
+def test_partial_write_stops_at_last_change(wire):
+    leds = _strip()
+    leds.write()
+    leds[2] = (1, 1, 1)
+    leds.write()
+    assert wire[-1] == bytes(leds.buf[:9])
+    assert leds.write_stats['shortened'] == 1
+    # the buffer is put back after the shortened write
+    assert len(leds.buf) == 24
+    leds.partial_writes = False
+    leds[0] = (9, 9, 9)
+    leds.write()
+    assert wire[-1] == bytes(leds.buf)
+    assert leds.write_stats == {'writes': 3, 'skipped': 0, 'shortened': 1}
+
+
+def test_force_and_untracked_write_everything(wire):
+    leds = _strip()
+    leds.write()
+    leds.write(force=True)
+    assert len(wire) == 2 and wire[1] == bytes(leds.buf)
+    leds.track_changes = False
+    leds.write()
+    leds.write()
+    assert len(wire) == 4 and wire[3] == bytes(leds.buf)
+    assert leds.write_stats['skipped'] == 0
+
+
+def test_output_stage_change_is_written(wire):
+    leds = _strip()
+    leds.write()
+    leds.brightness = 128
+    leds.write()
+    assert len(wire) == 2
+    assert wire[-1] == bytes((v * 128 * 255 + 32512) // 65025 for v in leds.buf)
@@ -1,6 +1,12 @@
 import time
+from micropython import const
 from . import trickLED
+from . import frames
 from . import generators
+from . import kernels
+from . import lut
+from . import particles
+from . import scheduler
 from random import getrandbits
 
 try:
@@ -8,11 +14,6 @@ try:
 except ImportError:
     randrange = trickLED.randrange
 
-try:
-    import uasyncio as asyncio
-except ImportError:
-    import asyncio
-
 
 def default_palette(n, brightness=200):
     """ Generate a color palette by stepping through the color wheel """
@@ -29,13 +30,16 @@ def default_palette(n, brightness=200):
 class AnimationBase:
     """ Animation base class. """
 
-    def __init__(self, leds, interval=50, palette=None, generator=None, brightness=200, **kwargs):
+    def __init__(self, leds, interval=50, palette=None, generator=None, brightness=200, prng=None,
+                 frame_policy=scheduler.POLICY_SKIP, **kwargs):
         """
         :param leds: TrickLED object
-        :param interval: millisecond pause between each frame
+        :param interval: milliseconds from the start of one frame to the start of the next
         :param palette: color palette
         :param generator: color generator
         :param brightness: set brightness 0-255
+        :param prng: trickLED.PRNG for animations that use random numbers, seed it to replay exactly
+        :param frame_policy: What to do when frames run late, one of the scheduler.POLICY constants
         :param kwargs: additional keywords will be saved to self.settings
         """
         if not isinstance(leds, trickLED.TrickLED):
@@ -44,9 +48,17 @@ class AnimationBase:
         self.frame = 0
         self.palette = palette
         self.generator = generator
+        self.prng = prng
+        self.getrandbits = prng.getrandbits if prng else getrandbits
+        self.randrange = prng.randrange if prng else randrange
         # configuration values can also be set as keyword arguments to __init__ or run
         self.settings = {'interval': int(interval), 'stripe_size': int(1),
-                         'scroll_speed': int(1), 'brightness': trickLED.uint8(brightness)}
+                         'scroll_speed': int(1), 'brightness': trickLED.uint8(brightness),
+                         'frame_policy': frame_policy}
+        # frame timing of the last play(), see scheduler.FrameClock
+        self.clock = None
+        # per frame profile, see enable_stats()
+        self.stats = None
         # stores run time information needed for the animation
         self.state = {}
         # number of pixels to calculate before copying from buffer
@@ -87,6 +99,17 @@ class AnimationBase:
                 val.__class__.__name__))
         self.__palette = pal
 
+    def set_leds(self, leds):
+        """
+        Move the animation to another strip that calculates the same pixels, e.g. an off-screen strip. Subclasses
+        that keep objects bound to the strip move them too.
+
+        :param leds: TrickLED object
+        """
+        if (leds.repeat_n or leds.n) != self.calc_n or leds.bpp != self.leds.bpp:
+            raise ValueError('leds must calculate {} pixels of {} bytes'.format(self.calc_n, self.leds.bpp))
+        self.leds = leds
+
     def setup(self):
         """ Called once at the start of animation.  """
         pass
@@ -95,25 +118,59 @@ class AnimationBase:
         """ Called before rendering each frame """
         pass
 
-    async def play(self, max_iterations=0, **kwargs):
+    def enable_stats(self, samples=scheduler.STATS_SAMPLES):
         """
-        Plays animation
-        :param max_iterations: Number of frames to render
+        Record the update, write and frame time and the bytes allocated of every frame played. Query it at any
+        time with stats.summary() or stats.report().
+
+        :param samples: Number of frames kept for the summaries
+        :return: scheduler.FrameStats
+        """
+        self.stats = scheduler.FrameStats(samples)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def start(self, **kwargs):
+        """
+        Clear the strip and set up the animation to play from the first frame. Called by play() and StripGroup.
         :param kwargs: Any keys in the settings dictionary can be set by passing as keyword arguments
         """
         for kw in kwargs:
             self.settings[kw] = kwargs[kw]
         self.leds.fill((0, 0, 0))
+        # animations that use indexed color turn it back on in setup()
+        self.leds.clear_indexed()
         self.setup()
         self.frame = 0
-        interval = self.settings['interval']
+
+    async def play(self, max_iterations=0, **kwargs):
+        """
+        Plays animation
+        :param max_iterations: Number of frames to render
+        :param kwargs: Any keys in the settings dictionary can be set by passing as keyword arguments
+        """
+        self.start(**kwargs)
+        clock = self.clock = scheduler.FrameClock(self.settings['interval'], self.settings['frame_policy'])
         self.state['start_ticks'] = time.ticks_ms()
         try:
             while max_iterations == 0 or self.frame < max_iterations:
                 self.frame += 1
+                stats = self.stats
+                if stats is not None:
+                    stats.begin()
+                start = time.ticks_us()
                 self.update()
+                rendered = time.ticks_us()
                 self.leds.write()
-                await asyncio.sleep(interval/1000.0)
+                render_us = time.ticks_diff(rendered, start)
+                write_us = time.ticks_diff(time.ticks_us(), rendered)
+                if stats is not None:
+                    stats.end(render_us, write_us)
+                clock.frame_done(render_us, write_us)
+                # frames dropped by the clock are skipped so the animation stays on time
+                self.frame += await clock.wait()
             self._print_fps()
         except KeyboardInterrupt:
             self._print_fps()
@@ -123,12 +180,93 @@ class AnimationBase:
         start_ticks = self.state.get('start_ticks')
         if start_ticks is None:
             return
-        end_ticks = time.ticks_ms()
-        interval = self.settings.get('interval')
-        fps = self.frame / time.ticks_diff(end_ticks, start_ticks) * 1000
-        interval_fps = 1000 / interval if interval > 0 else 1000
+        elapsed = time.ticks_diff(time.ticks_ms(), start_ticks)
+        # frames actually rendered, self.frame also counts the frames the clock dropped
+        fps = self.clock.stats['frames'] / elapsed * 1000 if elapsed > 0 else 0
         print(
-            'Actual fps: {:0.02f} - interval fps: {:0.02f}\n'.format(fps, interval_fps))
+            'Actual fps: {:0.02f} - interval fps: {:0.02f}'.format(fps, self.clock.fps()))
+        print(self.clock.report())
+        if self.stats is not None:
+            print(self.stats.report())
+        print()
+
+
+class StripGroup:
+    """ Plays animations on several strips from one clock. Each tick runs the update of every animation that is
+        due, then writes the strips in the order their animations were added, so the strips stay in phase.
+        Strips are shared, so the stats of an animation in a group only time its update, write time is in the
+        group clock.
+    """
+
+    def __init__(self, interval=20, frame_policy=scheduler.POLICY_SKIP):
+        """
+        :param interval: milliseconds between ticks
+        :param frame_policy: What to do when ticks run late, one of the scheduler.POLICY constants
+        """
+        self.interval = int(interval)
+        self.frame_policy = frame_policy
+        self.tick = 0
+        self.clock = None
+        # [animation, divisor] pairs
+        self.entries = []
+
+    def add(self, animation, divisor=1):
+        """
+        Add an animation to the group.
+
+        :param animation: AnimationBase object
+        :param divisor: Update the animation every divisor ticks
+        :return: animation
+        """
+        self.entries.append([animation, max(int(divisor), 1)])
+        return animation
+
+    async def play(self, max_ticks=0):
+        """
+        Plays every animation in the group
+        :param max_ticks: Number of ticks to run
+        """
+        entries = self.entries
+        strips = []
+        for ani, _ in entries:
+            ani.start()
+            if ani.leds not in strips:
+                strips.append(ani.leds)
+        slots = [strips.index(ani.leds) for ani, _ in entries]
+        due = [False] * len(strips)
+        clock = self.clock = scheduler.FrameClock(self.interval, self.frame_policy)
+        self.tick = 0
+        try:
+            while max_ticks == 0 or self.tick < max_ticks:
+                self.tick += 1
+                start = time.ticks_us()
+                for e in range(len(entries)):
+                    ani, div = entries[e]
+                    if self.tick % div == 0:
+                        ani.frame += 1
+                        stats = ani.stats
+                        if stats is not None:
+                            stats.begin()
+                            ani.update()
+                            stats.end(stats.elapsed(), 0)
+                        else:
+                            ani.update()
+                        due[slots[e]] = True
+                rendered = time.ticks_us()
+                for i in range(len(strips)):
+                    if due[i]:
+                        strips[i].write()
+                        due[i] = False
+                clock.frame_done(time.ticks_diff(rendered, start), time.ticks_diff(time.ticks_us(), rendered))
+                skipped = await clock.wait()
+                if skipped:
+                    # keep each animation on time by counting the updates it would have run
+                    for ani, div in entries:
+                        ani.frame += (self.tick + skipped) // div - self.tick // div
+                    self.tick += skipped
+        except KeyboardInterrupt:
+            pass
+        print(clock.report() + '\n')
 
 
 class NextGen(AnimationBase):
@@ -163,12 +301,14 @@ class NextGen(AnimationBase):
         # pre-fill the strip. Go in the opposite direction we are scrolling
         if self.settings['scroll_speed'] < 0:
             self.state['insert_point'] = self.calc_n - 1
-            for i in range(0, self.calc_n, blanks + 1):
-                self.leds[i] = next(self.generator)
+            if blanks:
+                for i in range(0, self.calc_n, blanks + 1):
+                    self.leds[i] = next(self.generator)
+            else:
+                self.leds.fill_gen(self.generator, 0, self.calc_n - 1)
         else:
             self.state['insert_point'] = 0
-            for i in range(self.calc_n - 1, -1,  -1):
-                self.leds[i] = next(self.generator)
+            self.leds.fill_gen(self.generator, 0, self.calc_n - 1, direction=-1)
 
     def update(self):
         self.leds.scroll(self.settings['scroll_speed'])
@@ -203,7 +343,7 @@ class LitBits(AnimationBase):
         self.settings['lit_scroll_speed'] = int(lit_scroll_speed)
         self.settings['lit_percent'] = lit_percent
         # controls which leds are lit and which are off
-        self.lit = trickLED.BitMap(self.calc_n)
+        self.lit = trickLED.BitMap(self.calc_n, prng=self.prng)
         if not self.settings['lit_percent']:
             self.lit.repeat(119)  # three on one off
 
@@ -218,13 +358,7 @@ class LitBits(AnimationBase):
     def update(self):
         if self.settings['lit_percent'] and self.frame % 30 == 0:
             self.lit.randomize()
-        pl = len(self.palette)
-        for i in range(self.calc_n):
-            if self.lit[i] == 1:
-                col = self.palette[i % pl]
-            else:
-                col = 0
-            self.leds[i] = col
+        self.leds.fill_masked(self.lit, self.palette, 0)
         self.palette.scroll(self.settings.get('scroll_speed', 1))
         self.lit.scroll(self.settings.get('lit_scroll_speed', -1))
 
@@ -256,37 +390,32 @@ class Jitter(LitBits):
         self.settings['background'] = trickLED.colval(
             self.settings['background'])
         if not self.generator:
-            self.generator = generators.random_pastel(bpp=self.leds.bpp)
+            self.generator = generators.random_pastel(bpp=self.leds.bpp, prng=self.prng)
+        self.state['settled'] = False
 
     def update(self):
         bg = self.settings.get('background')
         fade_percent = self.settings.get('fade_percent')
-        rv = getrandbits(8)
+        rv = self.getrandbits(8)
         fill_mode = self.settings.get('fill_mode')
+        # fade every pixel toward the background in one pass
+        self.leds.blend_to_color(bg, fade_percent, 0, self.calc_n - 1)
         if rv < self.settings.get('sparking'):
             # sparking
             self.lit.randomize()
             spark_col = next(self.generator)
-            for i in range(self.calc_n):
-                if self.lit[i]:
-                    if fill_mode == trickLED.FILL_MODE_SOLID:
-                        col = spark_col
-                    else:
-                        col = next(self.generator)
-                    self.leds[i] = col
-                else:
-                    col = self.leds[i]
-                    if col != bg:
-                        col = trickLED.blend(col, bg, fade_percent)
-                        self.leds[i] = col
-        else:
-            # not sparking
-            for i in range(self.calc_n):
-                if self.lit[i]:
-                    col = trickLED.blend(self.leds[i], bg, fade_percent)
+            for i in self.lit.iter_bits():
+                if fill_mode == trickLED.FILL_MODE_SOLID:
+                    col = spark_col
                 else:
-                    col = bg
+                    col = next(self.generator)
                 self.leds[i] = col
+            self.state['settled'] = False
+        elif not self.state.get('settled'):
+            # first frame after sparking, pixels that did not spark go straight to the background
+            for i in self.lit.iter_bits(0):
+                self.leds[i] = bg
+            self.state['settled'] = True
 
 
 class SideSwipe(AnimationBase):
@@ -329,110 +458,436 @@ class Convergent(AnimationBase):
         if self.palette is None:
             self.palette = default_palette(20)
         self.settings['fill_mode'] = fill_mode or trickLED.FILL_MODE_SOLID
+        # movers are particles, pixels where they stopped are kept in stacked
+        self.particles = particles.ParticleSystem(leds, capacity=2)
+        self.stacked = trickLED.BitMap(self.calc_n)
+        self._next = [0, 0]
+
+    def set_leds(self, leds):
+        super().set_leds(leds)
+        self.particles.set_target(leds)
 
     def setup(self):
         if self.generator is not None:
             self.palette.fill_gen(self.generator)
-        self.state['insert_points'] = [0, self.calc_n - 1]
+        self.state['insert_points'] = (0, self.calc_n - 1)
+        self.state['directions'] = (1, -1)
         self.state['palette_idx'] = 0
         self.start_cycle()
 
     def start_cycle(self):
-        self.state['movers'] = self.state['insert_points'][:]
+        self.particles.clear()
+        self.stacked.repeat(0)
         self.leds.fill((0, 0, 0))
         self.state['palette_idx'] = (
             self.state['palette_idx'] + 1) % len(self.palette)
         self.state['color'] = self.palette[self.state['palette_idx']]
-        for ip in self.state['insert_points']:
-            self.leds[ip] = self.state['color']
+        self.insert()
+
+    def insert(self):
+        """ Start a mover at each insertion point """
+        for ip, direction in zip(self.state['insert_points'], self.state['directions']):
+            self.particles.emit(ip, direction * particles.FIXED_ONE, self.state['color'])
+        self.particles.render()
 
     def update(self):
-        idir = 1
-        mvr = []
+        ps = self.particles
+        nxt = self._next
         new_insert = False
         new_cycle = False
-        for mv in self.state['movers']:
-            ni = mv + idir
-            idir *= -1
-            if 0 <= ni < self.calc_n:
-                if not any(self.leds[ni]):
-                    self.leds[ni] = self.leds[mv]
-                    self.leds[mv] = 0
-                    mvr.append(ni)
-                elif mv in self.state['insert_points']:
+        # movers go in order, each one sees where the ones before it have moved to
+        for i in range(ps.count):
+            p = ps.pixel(i)
+            ni = p + (ps.vel[i] >> 8)
+            free = 0 <= ni < self.calc_n and not self.stacked[ni]
+            if free:
+                for j in range(ps.count):
+                    if j != i and (nxt[j] if j < i else ps.pixel(j)) == ni:
+                        free = False
+            if free:
+                nxt[i] = ni
+            else:
+                nxt[i] = p
+                if 0 <= ni < self.calc_n and p in self.state['insert_points']:
                     new_cycle = True
                 else:
                     new_insert = True
-            else:
-                print("{} + {} out of range".format(mv, idir))
         if new_cycle:
             self.start_cycle()
             return
+        for i in range(ps.count):
+            if nxt[i] == ps.pixel(i):
+                ps.vel[i] = 0
+        ps.step()
         if new_insert:
+            # every mover stops where it is
+            for i in range(ps.count):
+                self.stacked[ps.pixel(i)] = 1
+            ps.bake()
             if self.settings['fill_mode'] == trickLED.FILL_MODE_MULTI:
                 self.state['palette_idx'] = (
                     self.state['palette_idx'] + 1) % len(self.palette)
                 self.state['color'] = self.palette[self.state['palette_idx']]
-            for ip in self.state['insert_points']:
-                self.leds[ip] = self.state['color']
-            mvr = self.state['insert_points'][:]
-        self.state['movers'] = mvr
+            self.insert()
+        else:
+            ps.render()
 
 
-class Divergent(AnimationBase):
+class Divergent(Convergent):
     """ Like Convergent, but not """
 
-    def __init__(self, leds, fill_mode=None, **kwargs):
-        super().__init__(leds, **kwargs)
-        if self.palette is None:
-            self.palette = default_palette(20)
-        self.settings['fill_mode'] = fill_mode or trickLED.FILL_MODE_SOLID
-
     def setup(self):
         if self.generator is not None:
             self.palette.fill_gen(self.generator)
         hwp = self.calc_n // 2
-        self.state['insert_points'] = [hwp, hwp+1]
+        self.state['insert_points'] = (hwp, hwp + 1)
+        self.state['directions'] = (-1, 1)
         self.state['palette_idx'] = 0
         self.start_cycle()
 
-    def start_cycle(self):
-        self.state['movers'] = self.state['insert_points'][:]
-        self.leds.fill((0, 0, 0))
-        self.state['palette_idx'] = (
-            self.state['palette_idx'] + 1) % len(self.palette)
-        self.state['color'] = self.palette[self.state['palette_idx']]
-        for ip in self.state['insert_points']:
-            self.leds[ip] = self.state['color']
+
+class BlasterDeflect(AnimationBase):
+    """ Solid blade where blaster bolts hit at random points. Each hit is a glowing flash that fades while a few
+        sparks fly off to both sides.
+    """
+
+    def __init__(self, leds, color=(0, 0, 255), bolt_color=(255, 200, 120), odds=12, sparks=4, **kwargs):
+        """
+        :param leds: TrickLED object
+        :param color: Blade color
+        :param bolt_color: Color of the flash and sparks
+        :param odds: Odds / 255 of a hit each frame
+        :param sparks: Number of sparks thrown by each hit
+        :param kwargs:
+        """
+        super().__init__(leds, **kwargs)
+        self.settings['color'] = color
+        self.settings['bolt_color'] = bolt_color
+        self.settings['odds'] = int(odds)
+        self.settings['sparks'] = int(sparks)
+        self.particles = particles.ParticleSystem(leds, capacity=4 * (sparks + 1), glow=2, background=color)
+
+    def set_leds(self, leds):
+        super().set_leds(leds)
+        self.particles.set_target(leds)
+
+    def setup(self):
+        self.particles.clear()
+        self.particles.set_background(self.settings['color'])
+        self.leds.fill_solid(self.settings['color'])
+
+    def hit(self, pixel):
+        """ Deflect a bolt at pixel """
+        ps = self.particles
+        col = self.settings['bolt_color']
+        ps.emit(pixel, 0, col, 12, 255, 20)
+        for k in range(self.settings['sparks']):
+            vel = 64 + self.getrandbits(7)
+            ps.emit(pixel, vel if k & 1 else -vel, col, 8 + self.getrandbits(3), 160, 16)
 
     def update(self):
-        idir = -1
-        mvr = []
-        new_insert = False
-        new_cycle = False
-        for mv in self.state['movers']:
-            ni = mv + idir
-            idir *= -1
-            if 0 <= ni < self.calc_n:
-                if not any(self.leds[ni]):
-                    self.leds[ni] = self.leds[mv]
-                    self.leds[mv] = 0
-                    mvr.append(ni)
-                elif mv in self.state['insert_points']:
-                    new_cycle = True
-                else:
-                    new_insert = True
-            else:
-                new_insert = True
-        if new_cycle:
-            self.start_cycle()
+        if self.getrandbits(8) < self.settings['odds']:
+            self.hit(self.randrange(0, self.calc_n))
+        self.particles.step()
+        self.particles.render()
+
+
+class ClashSparks(BlasterDeflect):
+    """ Solid blade where clashes throw a shower of fast white sparks that burn out as they fly. """
+
+    def __init__(self, leds, color=(0, 0, 255), bolt_color=(255, 255, 255), odds=6, sparks=10, **kwargs):
+        super().__init__(leds, color=color, bolt_color=bolt_color, odds=odds, sparks=sparks, **kwargs)
+        self.particles.set_glow(1)
+
+    def hit(self, pixel):
+        """ Clash at pixel """
+        ps = self.particles
+        col = self.settings['bolt_color']
+        ps.emit(pixel, 0, col, 4, 255, 60)
+        for k in range(self.settings['sparks']):
+            vel = 128 + self.getrandbits(8)
+            ps.emit(pixel, vel if k & 1 else -vel, col, 6 + self.getrandbits(4), 255, 12 + self.getrandbits(4))
+
+
+class Rainbow(AnimationBase):
+    """ Rainbow that rotates along the strip. Each frame is a single fill_hsv pass. """
+
+    def __init__(self, leds, hue_span=256, saturation=255, scroll_speed=2, **kwargs):
+        """
+        :param leds: TrickLED object
+        :param hue_span: Hues spread across the strip, 256 shows the whole wheel once
+        :param saturation: Saturation 0-255
+        :param scroll_speed: Hue steps to rotate each frame, negative to go the other way
+        :param kwargs:
+        """
+        super().__init__(leds, **kwargs)
+        self.settings['hue_span'] = int(hue_span)
+        self.settings['saturation'] = trickLED.uint8(saturation)
+        self.settings['scroll_speed'] = int(scroll_speed)
+
+    def setup(self):
+        hues = bytearray(self.calc_n)
+        span = self.settings['hue_span']
+        for i in range(self.calc_n):
+            hues[i] = (i * span // self.calc_n) & 255
+        self.state['hues'] = hues
+
+    def update(self):
+        self.leds.fill_hsv(self.state['hues'], self.settings['brightness'], self.settings['saturation'],
+                           self.frame * self.settings['scroll_speed'])
+
+
+class FramePlayer(AnimationBase):
+    """ Plays frames baked with frames.bake(). Each frame is read from the file straight into the strip buffer (or
+        the palette index for indexed files), so playing costs only the read. Compressed files are decoded in place
+        over the last frame.
+    """
+
+    def __init__(self, leds, path, loop=True, interval=None, **kwargs):
+        """
+        :param leds: TrickLED object
+        :param path: Baked frame file
+        :param loop: Start over at the end of the file, otherwise the last frame stays
+        :param interval: millisecond between frames, defaults to the interval the frames were baked at
+        :param kwargs:
+        """
+        self.reader = frames.FrameReader(path)
+        if interval is None:
+            interval = self.reader.interval
+        super().__init__(leds, interval=interval, **kwargs)
+        if self.reader.n > self.calc_n:
+            raise ValueError('frames have {} pixels, the strip calculates {}'.format(self.reader.n, self.calc_n))
+        if self.reader.bpp != self.leds.bpp:
+            raise ValueError('frames have {} bytes per pixel, the strip has {}'.format(self.reader.bpp, self.leds.bpp))
+        self.settings['loop'] = loop
+        self.index = None
+        self._view = None
+
+    def setup(self):
+        reader = self.reader
+        reader.rewind()
+        leds = self.leds
+        if reader.indexed:
+            self.index = trickLED.ByteMap(self.calc_n, bpi=1)
+            leds.set_indexed(reader.palette, self.index)
+            self._view = memoryview(self.index.buf)[:reader.frame_size]
+        else:
+            leds.resolve()
+            self._view = memoryview(leds.buf)[:reader.frame_size]
+
+    def update(self):
+        if not self.reader.readinto(self._view) and self.settings['loop']:
+            self.reader.rewind()
+            self.reader.readinto(self._view)
+
+
+class Transition(AnimationBase):
+    """ Blends from one animation to another over a duration. Each child draws into a strip of its own that is
+        allocated once and never written, the blade shows the blend of the two. While both are visible the children
+        take turns updating, so a frame costs the heavier child plus the blend instead of both children. A child's
+        frame follows the transition's, so taking turns it advances by 2 each update as if every other frame had
+        been dropped. How far the blend has got comes from the time since start(), like Ignition.
+    """
+    # the second animation sweeps in from pixel 0 behind a soft edge
+    MODE_WIPE = const(0)
+    # every pixel fades from the first animation to the second
+    MODE_DISSOLVE = const(1)
+    # the second animation grows out from the middle of the calculated pixels
+    MODE_CENTER = const(2)
+
+    def __init__(self, leds, from_animation, to_animation, duration=1000, mode=MODE_DISSOLVE, edge=8,
+                 alternate=True, **kwargs):
+        """
+        :param leds: TrickLED object
+        :param from_animation: AnimationBase on leds to blend from, it is moved to a strip of its own with set_leds()
+        :param to_animation: AnimationBase on leds to blend to, it is moved to a strip of its own with set_leds()
+        :param duration: Milliseconds the blend takes, the second animation keeps playing after it
+        :param mode: MODE_WIPE, MODE_DISSOLVE or MODE_CENTER
+        :param edge: Pixels of the soft edge for MODE_WIPE and MODE_CENTER
+        :param alternate: Update one child per frame while both are visible, so the cost of a frame stays bounded
+        :param kwargs:
+        """
+        super().__init__(leds, **kwargs)
+        self.settings['duration'] = int(duration)
+        self.settings['mode'] = mode
+        self.settings['edge'] = max(int(edge), 0)
+        self.settings['alternate'] = alternate
+        self.children = (from_animation, to_animation)
+        for ani in self.children:
+            # off-screen, so the pin of the blade is left alone and each child keeps a buffer of its own
+            ani.set_leds(trickLED.TrickLED(None, self.calc_n, bpp=leds.bpp))
+
+    @property
+    def done(self):
+        return self.state.get('done', False)
+
+    def setup(self):
+        self.leds.resolve()
+        for ani in self.children:
+            ani.start()
+            ani.leds.render()
+        self.state['start_ms'] = time.ticks_ms()
+        self.state['done'] = False
+
+    def progress(self):
+        """ Time since start() as a fraction of the duration, 0-256 """
+        duration = self.settings['duration']
+        elapsed = time.ticks_diff(time.ticks_ms(), self.state['start_ms'])
+        return 256 if elapsed >= duration else (elapsed << 8) // duration
+
+    def _step(self, ani):
+        # frames the child missed while the other one took its turn count as dropped
+        ani.frame = self.frame
+        ani.update()
+        ani.leds.render()
+
+    def update(self):
+        settings = self.settings
+        pos = self.progress()
+        self.state['done'] = pos == 256
+        first, second = self.children
+        if pos == 256:
+            self._step(second)
+        elif settings['alternate']:
+            self._step(self.children[self.frame & 1])
+        else:
+            self._step(first)
+            self._step(second)
+        n = self.calc_n
+        bpp = self.leds.bpp
+        dst = self.leds.buf
+        src = second.leds.buf
+        if pos == 256:
+            kernels.rotate(dst, src, 0, n * bpp, 0)
             return
-        if new_insert:
-            if self.settings['fill_mode'] == trickLED.FILL_MODE_MULTI:
-                self.state['palette_idx'] = (
-                    self.state['palette_idx'] + 1) % len(self.palette)
-                self.state['color'] = self.palette[self.state['palette_idx']]
-            for ip in self.state['insert_points']:
-                self.leds[ip] = self.state['color']
-            mvr = self.state['insert_points'][:]
-        self.state['movers'] = mvr
+        kernels.rotate(dst, first.leds.buf, 0, n * bpp, 0)
+        mode = settings['mode']
+        if mode == Transition.MODE_DISSOLVE:
+            kernels.blend_buf(dst, 0, n * bpp, src, pos)
+            return
+        # pixels lo to hi show the second animation, fading in over edge pixels at each end
+        edge = settings['edge']
+        if mode == Transition.MODE_CENTER:
+            c = n >> 1
+            half = ((n - c + edge) * pos) >> 8
+            lo = c - half
+            hi = c + half
+        else:
+            lo = -edge
+            hi = ((n + edge) * pos) >> 8
+        full_lo = max(lo + edge, 0)
+        full_hi = min(hi - edge, n)
+        if full_hi > full_lo:
+            kernels.rotate(dst, src, full_lo * bpp, full_hi * bpp, 0)
+        for p in range(max(lo, 0), min(lo + edge, hi, n)):
+            o = p * bpp
+            kernels.blend_buf(dst, o, o + bpp, src, ((p - lo + 1) << 8) // (edge + 1))
+        for p in range(max(hi - edge, lo + edge, 0), min(hi, n)):
+            o = p * bpp
+            kernels.blend_buf(dst, o, o + bpp, src, ((hi - p) << 8) // (edge + 1))
+
+
+class Ignition(AnimationBase):
+    """ Lights the blade (or retracts it) over a fixed time. The lit length comes from the time since start() through
+        an easing curve rather than from the frame count, so the blade is fully lit duration ms after start() however
+        long the strip is and however late the frames run. Each update only draws, write once per frame.
+    """
+    # lit from the hilt out
+    STYLE_STANDARD = const(0)
+    # the blade slides out with its tip fading in over tip_size pixels
+    STYLE_SCROLL = const(1)
+    # a flickering white hot tip leads the blade
+    STYLE_SPARK_TIP = const(2)
+    # lit from the middle out to both ends
+    STYLE_CENTER_OUT = const(3)
+
+    def __init__(self, leds, color=(255, 255, 255), duration=200, style=STYLE_STANDARD, easing=lut.EASE_OUT,
+                 retract=False, tip_color=(255, 255, 255), tip_size=3, interval=20, **kwargs):
+        """
+        :param leds: TrickLED object
+        :param color: Blade color
+        :param duration: Milliseconds from start() to fully lit, or dark when retracting
+        :param style: One of the STYLE constants
+        :param easing: One of the lut.EASE constants
+        :param retract: Retract a lit blade instead
+        :param tip_color: Color of the tip for STYLE_SPARK_TIP
+        :param tip_size: Pixels of the tip for STYLE_SCROLL and STYLE_SPARK_TIP
+        :param interval: milliseconds between frames when played
+        :param kwargs:
+        """
+        super().__init__(leds, interval=interval, **kwargs)
+        self.settings['color'] = color
+        self.settings['duration'] = int(duration)
+        self.settings['style'] = style
+        self.settings['easing'] = easing
+        self.settings['retract'] = retract
+        self.settings['tip_color'] = tip_color
+        self.settings['tip_size'] = max(int(tip_size), 1)
+
+    @property
+    def done(self):
+        return self.state.get('done', False)
+
+    def start(self, **kwargs):
+        """
+        Set up to light the blade from the first frame. A retraction starts from the blade as it is, clearing the
+        strip would blank it for a frame.
+        :param kwargs: Any keys in the settings dictionary can be set by passing as keyword arguments
+        """
+        for kw in kwargs:
+            self.settings[kw] = kwargs[kw]
+        if not self.settings['retract']:
+            super().start()
+            return
+        self.leds.clear_indexed()
+        self.setup()
+        self.frame = 0
+
+    def setup(self):
+        self.state['start_ms'] = time.ticks_ms()
+        self.state['lit'] = -1
+        self.state['done'] = False
+
+    def progress(self):
+        """ Time since start() as a fraction of the duration, 0-256 """
+        duration = self.settings['duration']
+        elapsed = time.ticks_diff(time.ticks_ms(), self.state['start_ms'])
+        return 256 if elapsed >= duration else (elapsed << 8) // duration
+
+    def update(self):
+        if self.state['done']:
+            return
+        settings = self.settings
+        leds = self.leds
+        n = self.calc_n
+        t = self.progress()
+        finished = t == 256
+        p = lut.ease(settings['easing'], t)
+        if settings['retract']:
+            p = 256 - p
+        lit = (n * p + 128) >> 8
+        style = settings['style']
+        # the blade only changes when it grows, except for the flickering tip and the last frame without a tip
+        if lit == self.state['lit'] and style != Ignition.STYLE_SPARK_TIP and not finished:
+            return
+        self.state['lit'] = lit
+        color = settings['color']
+        if style == Ignition.STYLE_CENTER_OUT:
+            c = n >> 1
+            lo = c - (lit >> 1)
+            hi = lo + lit
+            leds.fill_solid(0, 0, lo - 1)
+            leds.fill_solid(color, lo, hi - 1)
+            leds.fill_solid(0, hi, n - 1)
+        else:
+            leds.fill_solid(color, 0, lit - 1)
+            leds.fill_solid(0, lit, n - 1)
+            if not finished and lit:
+                tip = min(settings['tip_size'], lit)
+                if style == Ignition.STYLE_SCROLL:
+                    leds.fill_gradient(color, 0, lit - tip, lit - 1)
+                elif style == Ignition.STYLE_SPARK_TIP:
+                    level = 192 + self.getrandbits(6)
+                    tc = trickLED.colval(settings['tip_color'], 3)
+                    leds.fill_solid((tc[0] * level >> 8, tc[1] * level >> 8, tc[2] * level >> 8), lit - tip, lit - 1)
+        self.state['done'] = finished
@@ -4,8 +4,9 @@ Animations that are CPU and memory intensive and only run on the ESP32.
 
 from . import trickLED
 from . import generators
+from . import kernels
 
-from .animations import AnimationBase, getrandbits, randrange
+from .animations import AnimationBase
 
 try:
     import uasyncio as asyncio
@@ -14,50 +15,32 @@ except ImportError:
 
 
 class MappedAnimationBase(AnimationBase):
-    """ Animations that use metadata on each pixel and map that to a color. """
+    """ Animations that use metadata on each pixel and map that to a color. The strip runs in indexed color mode
+        with pixel_meta as the index, so the colors are expanded once at write().
+    """
 
     def __init__(self, leds, **kwargs):
         super().__init__(leds, **kwargs)
         # bit shift if we need to map 0-255 values to a smaller palette size of 128, 64 or 32
         self.settings['palette_shift'] = 0
         self.pixel_meta = trickLED.ByteMap(self.calc_n, 1)
-        self._ordered_palette = None
 
     def set_ordered_palette(self):
-        """ Convert RGB palette to byte order of our strip.  """
-        pal = self.palette
-        if self._ordered_palette is None or pal.n != self._ordered_palette.n:
-            self._ordered_palette = trickLED.ByteMap(pal.n, pal.bpi)
-        op = self._ordered_palette
-        for i in range(pal.n):
-            op[i] = pal.get_ordered_item(i)
+        """ Put the strip in indexed mode with our palette. Call again after changing the palette. """
+        if self.leds.index is self.pixel_meta:
+            self.leds.set_palette(self.palette)
+        else:
+            self.leds.set_indexed(self.palette, self.pixel_meta, self.settings.get('palette_shift', 0))
 
     def colorize(self):
-        """ Convert pixel meta data to colors.  To improve speed:
-        1) We write directly to the leds buffer
-        2) Pre-convert the palette from RGB to strip byte order (probably GRB)
-        """
-        buf = bytearray()
-        pal = self._ordered_palette
-        meta = self.pixel_meta
-        shift = self.settings.get('palette_shift', 0)
-        zero = bytearray([0, 0, 0])
-        bpi = pal.bpi
-        for m in meta:
-            if m:
-                i = (m >> shift) * bpi
-                buf += pal.buf[i:i+bpi]
-            else:
-                buf += zero
-        if len(self.leds.buf) == len(buf):
-            self.leds.buf = buf
-        else:
-            raise Exception('buffer length changed')
+        """ Pixel meta data is converted to colors by the strip at write(), only the palette shift is updated. """
+        self.leds.index_shift = self.settings.get('palette_shift', 0)
 
 
 class Fire(MappedAnimationBase):
     """
-    Simulate fire.
+    Simulate fire. The heat map is double buffered, each frame is scrolled, diffused and cooled from one buffer into
+    the other in a single pass without allocating.
     """
 
     def __init__(self, leds, sparking=64, cooling=15, scroll_speed=1, hotspots=1, **kwargs):
@@ -72,6 +55,8 @@ class Fire(MappedAnimationBase):
         super().__init__(leds, **kwargs)
         # Blend map keeps track of which positions need blended
         self._blend_map = trickLED.BitMap(self.calc_n)
+        # second heat buffer, swapped with pixel_meta.buf every frame
+        self._heat = bytearray(self.calc_n)
         self.settings['sparking'] = sparking
         self.settings['cooling'] = cooling
         self.settings['scroll_speed'] = int(scroll_speed)
@@ -105,14 +90,14 @@ class Fire(MappedAnimationBase):
             bmin = -10
             bmax = 1
         else:
-            self._flash_points.add(randrange(0, self.calc_n - 1))
+            self._flash_points.add(self.randrange(0, self.calc_n - 1))
             bmin = -5
             bmax = 6
 
         sect_size = self.calc_n // self.settings['hotspots']
         for i in range(1, self.settings['hotspots']):
             # add additional flash_points with some randomness so they are not exactly evenly spaced
-            rn = getrandbits(4) - 8
+            rn = self.getrandbits(4) - 8
             ip = sect_size * i + rn
             if not 0 < ip < self.calc_n:
                 ip = min(max(ip, 0), self.calc_n - 1)
@@ -124,6 +109,9 @@ class Fire(MappedAnimationBase):
             for i in range(fp + bmin, fp + bmax):
                 if 0 <= i < self.calc_n and i not in self._flash_points:
                     self._blend_map[i] = 1
+        self._blend_map.resolve()
+        self._flash_points = tuple(sorted(self._flash_points))
+        self.pixel_meta.resolve()
 
         # determine if we are mapping 256 levels of heat to 64, 128 or 256 colors
         if len(self.palette) >= 256:
@@ -134,36 +122,24 @@ class Fire(MappedAnimationBase):
             self.settings['palette_shift'] = 2
 
     def update(self):
-        uint8 = trickLED.uint8
         cn = self.calc_n
-        mi = cn - 1
-        if self.settings['scroll_speed'] != 0:
-            self.pixel_meta.scroll(self.settings['scroll_speed'])
-
-        # calculate sparks at insertion points
+        pm = self.pixel_meta
+        src = pm.buf
+        # read position of pixel 0, scrolling moves the heat by scroll_speed
+        po = -self.settings['scroll_speed'] % cn
+        sparking = self.settings['sparking']
+        # sparks go where the heat pass will read them for each insertion point
         for ip in self._flash_points:
-            spark = getrandbits(8)
-            if spark <= self.settings['sparking']:
+            spark = self.getrandbits(8)
+            if spark <= sparking:
                 # add a spark at insert_point with random heat between 192 and 255
                 val = 192 + (spark & 63)
             else:
                 val = (spark & 127) | 64
-            self.pixel_meta[ip] = val
-
-        # blend - copy heat map so we don't "cool" as we are blending
-        heat_map = trickLED.ByteMap(self.calc_n, bpi=1)
-        heat_map.buf = self.pixel_meta.buf[:]
-        for i in range(self.calc_n):
-            if self._blend_map[i]:
-                if 0 < i < mi:
-                    val = sum(heat_map[i-1:i+2]) / 3
-                elif i == 0:
-                    val = sum(heat_map[0:2]) / 2
-                else:
-                    val = sum(heat_map[-2:]) / 2
-                self.pixel_meta[i] = uint8(val)
-        # cool
-        self.pixel_meta.sub(self.settings.get('cooling'))
+            k = ip + po
+            src[k - cn if k >= cn else k] = val
+        kernels.heat_step(self._heat, src, cn, po, self._blend_map.buf, self.settings['cooling'])
+        pm.buf, self._heat = self._heat, src
         self.colorize()
 
 
@@ -182,8 +158,6 @@ class Conjunction(MappedAnimationBase):
 
     def setup(self):
         self.state = {'step': 0, 'insert_points': []}
-        self._ordered_palette = trickLED.ByteMap(
-            self.palette.n, self.palette.bpi)
         self.start_cycle()
 
     def start_cycle(self):
@@ -193,7 +167,7 @@ class Conjunction(MappedAnimationBase):
         self.palette[0] = trickLED.colval(0)
         self.set_ordered_palette()
         self.state['step'] = 0
-        rn = getrandbits(5)  # 0-31
+        rn = self.getrandbits(5)  # 0-31
         self.state['insert_points'] = [rn - 32, rn]
         while rn < self.calc_n:
             rn += 32
@@ -0,0 +1,133 @@
+"""
+Integer HSV and HSL colors.
+
+Hue runs 0 - 255 around the whole wheel (256 steps, so hue bytes wrap without a modulo). Saturation, value and
+lightness are 0 - 255. Unlike color_wheel() every saturation is supported.
+
+fill_hsv() converts a buffer of hues (and optionally values) into pixels in one pass using a table of colors for
+the saturation, already in the byte order of the strip.
+"""
+from micropython import const
+
+from . import kernels
+
+# number of hue tables to keep (256 * bpp bytes each)
+HSV_CACHE_SIZE = const(4)
+
+_tables = {}
+_table_keys = []
+# holds the value when one value is used for every pixel
+_val = bytearray(1)
+
+
+def _div255(x):
+    """ Rounded x / 255 for 0 <= x <= 65025 """
+    x += 128
+    return (x + (x >> 8)) >> 8
+
+
+def hsv(h, s=255, v=255):
+    """ Convert hue, saturation, value to an RGB tuple """
+    if s == 0:
+        return v, v, v
+    h = (h & 255) * 6
+    f = h & 255
+    p = _div255(v * (255 - s))
+    q = _div255(v * (255 - _div255(s * f)))
+    t = _div255(v * (255 - _div255(s * (255 - f))))
+    sector = h >> 8
+    if sector == 0:
+        return v, t, p
+    if sector == 1:
+        return q, v, p
+    if sector == 2:
+        return p, v, t
+    if sector == 3:
+        return p, q, v
+    if sector == 4:
+        return t, p, v
+    return v, p, q
+
+
+def hsl_to_hsv(h, s, l):
+    """ Convert hue, saturation, lightness to hue, saturation, value """
+    v = l + _div255(s * min(l, 255 - l))
+    if v == 0:
+        return h, 0, 0
+    return h, min((510 * (v - l) + (v >> 1)) // v, 255), v
+
+
+def hsl(h, s=255, l=128):
+    """ Convert hue, saturation, lightness to an RGB tuple """
+    return hsv(*hsl_to_hsv(h, s, l))
+
+
+def rgb_to_hsv(r, g, b):
+    """ Convert an RGB color to hue, saturation, value. Useful to tint or desaturate a fixed font color. """
+    mx = max(r, g, b)
+    d = mx - min(r, g, b)
+    if d == 0:
+        return 0, 0, mx
+    if mx == r:
+        h = g - b
+    elif mx == g:
+        h = 2 * d + b - r
+    else:
+        h = 4 * d + r - g
+    h = ((h << 8) + 3 * d) // (6 * d)
+    return h & 255, (d * 255 + (mx >> 1)) // mx, mx
+
+
+def hsv_table(sat=255, order=None, bpp=3):
+    """
+    Colors for all 256 hues at full value, bpp bytes each.
+
+    :param sat: Saturation
+    :param order: Byte position of red, green and blue in a pixel (NeoPixel.ORDER), defaults to RGB
+    :param bpp: Bytes per pixel, extra bytes (white) are 0
+    """
+    if order is None:
+        order = (0, 1, 2)
+    key = (sat, order[0], order[1], order[2], bpp)
+    tbl = _tables.get(key)
+    if tbl is None:
+        if len(_table_keys) >= HSV_CACHE_SIZE:
+            del _tables[_table_keys.pop(0)]
+        tbl = bytearray(256 * bpp)
+        for h in range(256):
+            col = hsv(h, sat)
+            i = h * bpp
+            for c in range(3):
+                tbl[i + order[c]] = col[c]
+        _tables[key] = tbl
+        _table_keys.append(key)
+    return tbl
+
+
+def fill_hsv(buf, hues, vals=255, sat=255, shift=0, start=0, n=None, order=None, bpp=3):
+    """
+    Convert a buffer of hues to pixels in buf in one pass.
+
+    :param buf: Pixel buffer to write to
+    :param hues: Buffer with one hue per pixel
+    :param vals: Buffer with one value per pixel or a single value for every pixel
+    :param sat: Saturation for every pixel
+    :param shift: Added to every hue, change it each frame to rotate the colors
+    :param start: First pixel to write
+    :param n: Number of pixels, defaults to the length of hues
+    :param order: Byte position of red, green and blue in a pixel (NeoPixel.ORDER)
+    :param bpp: Bytes per pixel
+    """
+    if n is None:
+        n = len(hues)
+    n = min(n, len(hues), len(buf) // bpp - start)
+    if n <= 0:
+        return
+    if isinstance(vals, int):
+        _val[0] = vals
+        vals = _val
+        vstep = 0
+    else:
+        n = min(n, len(vals))
+        vstep = 1
+    kernels.hue_fill(buf, start * bpp, n, hues, vals, vstep, shift & 255, hsv_table(sat, order, bpp), bpp)
@@ -0,0 +1,233 @@
+"""
+Baked animation frames. bake() runs an animation headless and writes every frame to a file, FrameReader reads them
+back one frame at a time straight into a buffer. Played back with animations.FramePlayer a baked effect costs only
+the file read.
+
+File layout, little endian:
+
+    header      HEADER_FMT: magic, version, format, bpp, 0, pixels per frame, frame count, interval ms, palette count
+    palette     palette count RGB(W) colors of bpp bytes, only for FORMAT_INDEXED
+    frames      frame count frames of pixels * bpp bytes in the byte order of the strip (FORMAT_RAW)
+                or pixels bytes of palette indexes (FORMAT_INDEXED)
+
+With FORMAT_RLE set each frame is a record instead: kind (FRAME_KEY or FRAME_DELTA), payload length (2 bytes) and
+a payload of pixel runs, see kernels.rle_apply(). Key frames hold the pixels, delta frames the xor with the frame
+before, so pixels that did not change cost almost nothing and a uniform flicker is a single run. Frames are decoded
+in place over the previous frame.
+
+Frames hold the calculated pixels of the animation (repeat_n when the strip repeats), the player's strip repeats
+them again and applies its own output stage.
+"""
+import struct
+
+from micropython import const
+
+from . import kernels
+from .trickLED import ByteMap
+
+MAGIC = b'TLF1'
+VERSION = const(1)
+FORMAT_RAW = const(0)
+FORMAT_INDEXED = const(1)
+FORMAT_RLE = const(2)
+HEADER_FMT = '<4sBBBBHIHH'
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+FRAME_KEY = const(0)
+FRAME_DELTA = const(1)
+RECORD_FMT = '<BH'
+RECORD_SIZE = const(3)
+# frames between key frames in RLE files
+KEYFRAME_INTERVAL = const(64)
+
+# palette indexes map to themselves, used to read the index of a strip in order
+_IDENTITY = bytes(range(256))
+
+
+def _capture(leds, dst, indexed):
+    """ Copy the current frame of leds into dst """
+    if indexed:
+        idx = leds.index
+        kernels.expand(dst, idx.buf, idx.n, idx._po, _IDENTITY, max(leds._ipal_n, 1), 1, leds.index_shift)
+    else:
+        # animations that draw through an index are expanded to colors first
+        leds.render()
+        dst[:] = memoryview(leds.buf)[:len(dst)]
+
+
+def _palette(leds):
+    """ Palette of a strip in indexed mode, back in RGB order """
+    bpp = leds.bpp
+    order = leds.ORDER
+    ip = leds._ipal
+    pal = bytearray(leds._ipal_n * bpp)
+    for k in range(leds._ipal_n):
+        off = k * bpp
+        for j in range(bpp):
+            pal[off + j] = ip[off + order[j]]
+    return pal
+
+
+def _rle(data, bpp):
+    """ Encode data as runs of pixels for kernels.rle_apply() """
+    out = bytearray()
+    n = len(data) // bpp
+    # a repeated pixel only saves space over a literal for runs this long
+    min_run = 2 if bpp > 1 else 3
+    lit = 0
+    i = 0
+    while i < n:
+        px = data[i * bpp:(i + 1) * bpp]
+        j = i + 1
+        while j < n and j - i < 128 and data[j * bpp:(j + 1) * bpp] == px:
+            j += 1
+        if j - i < min_run:
+            i += 1
+            continue
+        while lit < i:
+            c = min(i - lit, 128)
+            out.append(c - 1)
+            out += data[lit * bpp:(lit + c) * bpp]
+            lit += c
+        out.append(128 | (j - i - 1))
+        out += px
+        i = lit = j
+    while lit < n:
+        c = min(n - lit, 128)
+        out.append(c - 1)
+        out += data[lit * bpp:(lit + c) * bpp]
+        lit += c
+    return out
+
+
+def max_record(frame_size, px_size):
+    """ Largest RLE payload for a frame, all literals """
+    return frame_size + (frame_size // px_size + 127) // 128
+
+
+def bake(animation, path, n_frames, indexed=False, compress=False, keyframe=KEYFRAME_INTERVAL):
+    """
+    Run an animation without writing to the strip and save its frames.
+
+    :param animation: AnimationBase object, its strip does not need to be connected
+    :param path: File to write, usually in the font directory on the SD card
+    :param n_frames: Number of frames to bake
+    :param indexed: Save palette indexes instead of colors, for animations in indexed color mode like Fire.
+        The palette must not change while baking.
+    :param compress: Save key frames and xor deltas as runs of pixels (FORMAT_RLE)
+    :param keyframe: Frames between key frames when compressing
+    :return: Number of bytes written
+    """
+    animation.start()
+    leds = animation.leds
+    n = animation.calc_n
+    bpp = leds.bpp
+    if indexed:
+        if leds.index is None:
+            raise ValueError('{} does not use indexed color'.format(animation.__class__.__name__))
+        palette = _palette(leds)
+        frame = bytearray(n)
+    else:
+        palette = b''
+        frame = bytearray(n * bpp)
+    fmt = (FORMAT_INDEXED if indexed else FORMAT_RAW) | (FORMAT_RLE if compress else 0)
+    px_size = 1 if indexed else bpp
+    prev = bytearray(len(frame))
+    with open(path, 'wb') as f:
+        size = f.write(struct.pack(HEADER_FMT, MAGIC, VERSION, fmt, bpp, 0,
+                                   n, n_frames, animation.settings['interval'], len(palette) // bpp))
+        size += f.write(palette)
+        for i in range(n_frames):
+            animation.frame += 1
+            animation.update()
+            if indexed and _palette(leds) != palette:
+                raise ValueError('palette changed while baking, bake without indexed')
+            _capture(leds, frame, indexed)
+            if not compress:
+                size += f.write(frame)
+                continue
+            if keyframe and i % keyframe == 0 or i == 0:
+                kind = FRAME_KEY
+                payload = _rle(frame, px_size)
+            else:
+                kind = FRAME_DELTA
+                payload = _rle(bytes(a ^ b for a, b in zip(frame, prev)), px_size)
+            size += f.write(struct.pack(RECORD_FMT, kind, len(payload)))
+            size += f.write(payload)
+            prev[:] = frame
+    return size
+
+
+class FrameReader:
+    """ Reads a baked frame file one frame at a time. """
+
+    def __init__(self, path):
+        """
+        :param path: Baked frame file
+        """
+        self.path = path
+        self.f = open(path, 'rb')
+        magic, version, fmt, bpp, _, n, count, interval, pal_n = struct.unpack(HEADER_FMT,
+                                                                                self.f.read(HEADER_SIZE))
+        if magic != MAGIC or version != VERSION:
+            self.f.close()
+            raise ValueError('{} is not a baked frame file'.format(path))
+        self.format = fmt
+        self.bpp = bpp
+        self.n = n
+        self.count = count
+        self.interval = interval
+        self.palette = None
+        if self.indexed:
+            self.palette = ByteMap(pal_n, bpi=bpp)
+            self.f.readinto(self.palette.buf)
+        self.px_size = 1 if self.indexed else bpp
+        self.frame_size = n * self.px_size
+        self.data_start = HEADER_SIZE + (pal_n * bpp if self.indexed else 0)
+        self.frame = 0
+        # bytes read from the file for the frames so far
+        self.bytes_read = 0
+        if self.compressed:
+            self._record = bytearray(RECORD_SIZE)
+            self._payload = bytearray(max_record(self.frame_size, self.px_size))
+
+    @property
+    def indexed(self):
+        return bool(self.format & FORMAT_INDEXED)
+
+    @property
+    def compressed(self):
+        return bool(self.format & FORMAT_RLE)
+
+    def readinto(self, buf):
+        """
+        Read the next frame into buf. Compressed frames are decoded in place, buf must still hold the frame before.
+
+        :param buf: Buffer or memoryview of frame_size bytes
+        :return: False at the end of the file
+        """
+        if self.frame >= self.count:
+            return False
+        if self.compressed:
+            rec = self._record
+            if self.f.readinto(rec) != RECORD_SIZE:
+                return False
+            kind = rec[0]
+            length = rec[1] | (rec[2] << 8)
+            if length > len(self._payload) or self.f.readinto(memoryview(self._payload)[:length]) != length:
+                return False
+            kernels.rle_apply(buf, self._payload, length, self.px_size, kind == FRAME_DELTA, self.frame_size)
+            self.bytes_read += RECORD_SIZE + length
+        else:
+            if self.f.readinto(buf) != self.frame_size:
+                return False
+            self.bytes_read += self.frame_size
+        self.frame += 1
+        return True
+
+    def rewind(self):
+        """ Go back to the first frame """
+        self.f.seek(self.data_start)
+        self.frame = 0
+
+    def close(self):
+        self.f.close()
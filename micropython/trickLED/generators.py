@@ -1,3 +1,17 @@
+"""
+Color generators. Each generator writes colors straight into a buffer with fill(), n pixels per call in the byte
+order of the target. Iterating a generator with next() still returns one RGB tuple per pixel, so plain Python
+generators and the generators here can be used in the same places.
+
+The color wheel generators repeat a stripe of colors for every hue. Their stripes are kept in a table in the byte
+order of the target, in fixed point, and fill() copies runs of the table. The table holds as many stripes as fit in
+TABLE_PIXELS pixels, when that is the whole cycle of hues it is never rebuilt.
+"""
+from array import array
+
+from micropython import const
+
+from . import kernels
 from . import trickLED
 from random import getrandbits
 try:
@@ -5,6 +19,238 @@ try:
 except ImportError:
     randrange = trickLED.randrange
 
+# most pixels of stripes kept in a table
+TABLE_PIXELS = const(256)
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+class BatchGenerator:
+    """
+    Base for generators that fill a buffer. Subclasses implement
+    fill(buf, start_pos, n, bpp=3, order=trickLED.ORDER_RGB, reverse=False), which writes the next n colors into buf
+    from pixel start_pos, bpp bytes per pixel with channel c at byte order[c], from the last pixel back to the
+    first if reverse is set.
+    """
+
+    def __init__(self, channels=3):
+        """
+        :param channels: Number of channels of the tuples returned by next()
+        """
+        self.channels = channels
+        self._px = bytearray(channels)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        px = self._px
+        self.fill(px, 0, 1, self.channels)
+        return tuple(px)
+
+
+class StripeGenerator(BatchGenerator):
+    """
+    Base for color wheel generators. Stripe k is drawn from hue start_hue + k * hue_stride by the subclass's
+    _stripe(table, offset, hue, bpp, order, brightness), which writes the stripe for hue into table from byte offset.
+    """
+
+    def __init__(self, hue_stride, stripe_len, start_hue):
+        """
+        :param hue_stride: Steps on the color wheel from one stripe to the next
+        :param stripe_len: Pixels in a stripe
+        :param start_hue: Hue of the first stripe
+        """
+        super().__init__()
+        self.hue_stride = hue_stride
+        self.stripe_len = stripe_len
+        # hue of the first stripe in the table and the next pixel of the table to use
+        self.hue = start_hue % 255
+        self.pos = 0
+        # stripes before the hues repeat, the table holds window of them
+        self._period = 255 // _gcd(hue_stride % 255, 255)
+        self._window = min(self._period, max(TABLE_PIXELS // stripe_len, 1))
+        self._table = None
+        self._bpp = 0
+        self._order = None
+        self._brightness = None
+        # color and 16.16 fixed point step of a stripe in buffer order
+        self._col = bytearray(4)
+        self._inc = array('i', [0] * 4)
+        self._plan = array('i', [0, 0, 0, 1])
+
+    def _set_col(self, rgb, i, order, val=255):
+        """ Put color i of a wheel table, scaled by val / 255, in _col in buffer order """
+        col = self._col
+        for c in range(3):
+            col[order[c]] = rgb[i + c] * val // 255
+        col[3] = 0
+
+    def _build(self, bpp, order, brightness):
+        size = self._window * self.stripe_len * bpp
+        if self._table is None or len(self._table) != size:
+            self._table = bytearray(size)
+        hue = self.hue
+        step = self.stripe_len * bpp
+        for k in range(self._window):
+            self._stripe(self._table, k * step, hue, bpp, order, brightness)
+            hue = (hue + self.hue_stride) % 255
+        self._bpp = bpp
+        self._order = order
+        self._brightness = brightness
+
+    def fill(self, buf, start_pos, n, bpp=3, order=trickLED.ORDER_RGB, reverse=False):
+        brightness = trickLED.global_setings['brightness']
+        if self._table is None or bpp != self._bpp or order != self._order or brightness != self._brightness:
+            self._build(bpp, order, brightness)
+        plan = self._plan
+        size = self._window * self.stripe_len
+        done = 0
+        while done < n:
+            cnt = min(size - self.pos, n - done)
+            plan[2] = cnt
+            if reverse:
+                plan[0] = start_pos + n - done - cnt
+                plan[1] = self.pos + cnt - 1
+                plan[3] = 0
+            else:
+                plan[0] = start_pos + done
+                plan[1] = self.pos
+                plan[3] = 1
+            kernels.copy_runs(buf, self._table, plan, bpp)
+            done += cnt
+            self.pos += cnt
+            if self.pos == size:
+                self.pos = 0
+                if self._window < self._period:
+                    self.hue = (self.hue + self._window * self.hue_stride) % 255
+                    self._build(bpp, order, brightness)
+
+
+class SteppedColorWheel(StripeGenerator):
+    """ See stepped_color_wheel() """
+
+    def _stripe(self, table, offset, hue, bpp, order, brightness):
+        n = self.stripe_len
+        steps = n - 1
+        rgb1 = trickLED.lut.wheel(trickLED.uint8(brightness))
+        rgb2 = trickLED.lut.wheel(brightness >> 2)
+        i1 = hue * 3
+        i2 = (hue + self.hue_stride) % 255 * 3
+        col = self._col
+        inc = self._inc
+        for c in range(4):
+            col[c] = 0
+            inc[c] = 0
+        for c in range(3):
+            o = order[c]
+            col[o] = rgb1[i1 + c]
+            if steps:
+                inc[o] = ((rgb2[i2 + c] - rgb1[i1 + c]) << 16) // steps
+        kernels.gradient(table, offset, n, col, inc, bpp)
+
+
+class StripedColorWheel(StripeGenerator):
+    """ See striped_color_wheel() """
+
+    def _stripe(self, table, offset, hue, bpp, order, brightness):
+        self._set_col(trickLED.lut.wheel(trickLED.uint8(brightness)), hue * 3, order)
+        kernels.fill_pattern(table, offset, offset + self.stripe_len * bpp, memoryview(self._col)[:bpp])
+
+
+class FadingColorWheel(StripeGenerator):
+    """ See fading_color_wheel() """
+
+    def __init__(self, hue_stride, stripe_size, start_hue, brightness_values):
+        super().__init__(hue_stride, stripe_size, start_hue)
+        self.brightness_values = bytes(brightness_values)
+
+    def _stripe(self, table, offset, hue, bpp, order, brightness):
+        # scale full brightness colors so we don't need a color wheel table for every brightness value
+        wheel = trickLED.lut.wheel(255)
+        col = self._col
+        for bv in self.brightness_values:
+            self._set_col(wheel, hue * 3, order, bv)
+            for c in range(bpp):
+                table[offset + c] = col[c]
+            offset += bpp
+
+
+class ColorCompliment(StripeGenerator):
+    """ See color_compliment() """
+
+    def __init__(self, hue_stride, stripe_size, start_hue):
+        super().__init__(hue_stride, stripe_size * 2, start_hue)
+
+    def _stripe(self, table, offset, hue, bpp, order, brightness):
+        wheel = trickLED.lut.wheel(trickLED.uint8(brightness))
+        half = (self.stripe_len >> 1) * bpp
+        pat = memoryview(self._col)[:bpp]
+        self._set_col(wheel, hue * 3, order)
+        kernels.fill_pattern(table, offset, offset + half, pat)
+        self._set_col(wheel, (hue + 127) % 255 * 3, order)
+        kernels.fill_pattern(table, offset + half, offset + 2 * half, pat)
+
+
+class RandomVivid(BatchGenerator):
+    """ See random_vivid() """
+    # (prime, second) shifts for each pair of channels
+    SHIFTS = (16, 8,  # (p, s, 0)  red-yellow-green
+              8, 0,  # (0, p, s)  green-aqua-blue
+              0, 16)  # (s, 0, p)  blue-purple-red
+
+    def __init__(self, prng=None):
+        super().__init__()
+        self.randrange = prng.randrange if prng else randrange
+
+    def fill(self, buf, start_pos, n, bpp=3, order=trickLED.ORDER_RGB, reverse=False):
+        rr = self.randrange
+        shifts = RandomVivid.SHIFTS
+        brightness = trickLED.global_setings['brightness']
+        for k in range(n):
+            cov = rr(0, 2) << 1
+            prime = rr(1, brightness)
+            val = prime << shifts[cov] | (brightness - prime) << shifts[cov + 1]
+            j = (start_pos + (n - 1 - k if reverse else k)) * bpp
+            buf[j + order[0]] = val >> 16
+            buf[j + order[1]] = (val >> 8) & 255
+            buf[j + order[2]] = val & 255
+            if bpp > 3:
+                buf[j + order[3]] = 0
+
+
+class RandomPastel(BatchGenerator):
+    """ See random_pastel() """
+
+    def __init__(self, bpp=3, mask=None, prng=None):
+        super().__init__(bpp)
+        self.getrandbits = prng.getrandbits if prng else getrandbits
+        mi = 0
+        if mask:
+            if bpp != len(mask):
+                raise ValueError(
+                    'The mask must contain the same number of items as bytes to be returned.')
+            for i in range(bpp):
+                mi = (mi << 8) | mask[i]
+        else:
+            mi = 2 ** (bpp * 8) - 1
+        self.mask = mi
+
+    def fill(self, buf, start_pos, n, bpp=3, order=trickLED.ORDER_RGB, reverse=False):
+        grb = self.getrandbits
+        channels = self.channels
+        bc = channels * 8
+        mi = self.mask
+        for k in range(n):
+            val = grb(bc) & mi
+            j = (start_pos + (n - 1 - k if reverse else k)) * bpp
+            for c in range(bpp):
+                buf[j + order[c]] = (val >> ((channels - 1 - c) << 3)) & 255 if c < channels else 0
+
 
 def stepped_color_wheel(hue_stride=10, stripe_size=20, start_hue=0):
     """
@@ -18,20 +264,7 @@ def stepped_color_wheel(hue_stride=10, stripe_size=20, start_hue=0):
     """
     if hue_stride == 0:
         hue_stride = 1
-
-    hue = start_hue
-    hue_offset = - hue_stride
-
-    while True:
-        brightness = trickLED.global_setings.get('brightness')
-        db = brightness >> 2  # divide by 4
-        color_wheel_1 = trickLED.color_wheel(hue, brightness)
-        color_wheel_2 = trickLED.color_wheel((hue - hue_offset) % 255, db)
-        inc = trickLED.step_inc(color_wheel_1, color_wheel_2, stripe_size - 1)
-        for i in range(stripe_size):
-            incs = [v * i for v in inc]
-            yield tuple(map(trickLED.add8, color_wheel_1, incs))
-        hue = (hue + hue_stride) % 255
+    return SteppedColorWheel(hue_stride, stripe_size, start_hue)
 
 
 def striped_color_wheel(hue_stride=10, stripe_size=10, start_hue=0):
@@ -43,15 +276,9 @@ def striped_color_wheel(hue_stride=10, stripe_size=10, start_hue=0):
     :param start_hue: Starting hue on color wheel
     :return: color generator
     """
-    hue = start_hue
     if hue_stride == 0:
         hue_stride = 1
-    while True:
-        color_wheel = trickLED.color_wheel(
-            hue, trickLED.global_setings.get('brightness'))
-        for _ in range(stripe_size):
-            yield color_wheel
-        hue = (hue + hue_stride) % 255
+    return StripedColorWheel(hue_stride, stripe_size, start_hue)
 
 
 def fading_color_wheel(hue_stride=10, stripe_size=20, start_hue=0, mode=trickLED.FADE_OUT):
@@ -66,28 +293,21 @@ def fading_color_wheel(hue_stride=10, stripe_size=20, start_hue=0, mode=trickLED
     """
     if stripe_size <= 1:
         raise ValueError('stripe_size must be > 1 to fade')
-    hue = start_hue
-    # calculate brightness values
+    # calculate brightness values from the sine table, a quarter cycle is 64 steps
     if mode == trickLED.FADE_IN_OUT:
-        color_stride = 127.5 / (stripe_size - 1)
-        color_offset = 0
-        brightness_value = [2 + int(trickLED.sin8(color_offset + i * color_stride) * 253)
-                            for i in range(stripe_size)]
+        span, offset = 128, 0
+    elif mode == trickLED.FADE_IN:
+        span, offset = 64, 64
     else:
-        if mode == trickLED.FADE_IN:
-            color_stride = 63.75 / (stripe_size - 1)
-            color_offset = 63.75
-        else:
-            color_stride = 63.75 / (stripe_size - 1)
-            color_offset = 0
-        brightness_value = [255 - int(trickLED.sin8(color_offset + i * color_stride) * 253)
-                            for i in range(stripe_size)]
+        span, offset = 64, 0
+    steps = stripe_size - 1
+    brightness_value = []
+    for i in range(stripe_size):
+        s = (trickLED.lut.sin8(offset + (i * span + (steps >> 1)) // steps) - 128) * 253 // 127
+        brightness_value.append(2 + s if mode == trickLED.FADE_IN_OUT else 255 - s)
     if hue_stride == 0:
         hue_stride = 1
-    while True:
-        for i in range(stripe_size):
-            yield trickLED.color_wheel(hue, brightness_value[i])
-        hue = (hue + hue_stride) % 255
+    return FadingColorWheel(hue_stride, stripe_size, start_hue, brightness_value)
 
 
 def color_compliment(hue_stride=10, stripe_size=1, start_hue=0):
@@ -99,55 +319,25 @@ def color_compliment(hue_stride=10, stripe_size=1, start_hue=0):
     :param start_hue: Location on color wheel to begin
     :return color generator
     """
-    hue = start_hue
-    while True:
-        col = trickLED.color_wheel(
-            hue, trickLED.global_setings.get('brightness'))
-        for _ in range(stripe_size):
-            yield col
-        col = trickLED.color_wheel(
-            (hue + 127) % 255, trickLED.global_setings.get('brightness'))
-        for _ in range(stripe_size):
-            yield col
-        hue = (hue + hue_stride) % 255
+    return ColorCompliment(hue_stride, stripe_size, start_hue)
 
 
-def random_vivid():
+def random_vivid(prng=None):
     """
     Generate random vivid colors by filling only 2 channels.
+    :param prng: trickLED.PRNG to use instead of the random module
     :return: color generator
     """
-    shifts = ((16, 8),  # (p, s, 0)  red-yellow-green
-              (8, 0),   # (0, p, s)  green-aqua-blue
-              (0, 16))  # (s, 0, p)  blue-purple-red
-    while True:
-        brightness = trickLED.global_setings.get('brightness')
-        cov = randrange(0, 2)
-        prime = randrange(1, brightness)
-        second = brightness - prime
-        s = shifts[cov]
-        val = prime << s[0] | second << s[1]
-        yield tuple(val.to_bytes(3, 'big'))
+    return RandomVivid(prng)
 
 
-def random_pastel(bpp=3, mask=None):
+def random_pastel(bpp=3, mask=None, prng=None):
     """
     Generate random pastel colors.
 
     :param bpp: Bytes per pixel
     :param mask: Bit masks to control hue. (255, 0, 63) would give red to purple colors.
+    :param prng: trickLED.PRNG to use instead of the random module
     :return: color generator
     """
-    mi = 0
-    bc = bpp * 8
-    if mask:
-        if bpp != len(mask):
-            raise ValueError(
-                'The mask must contain the same number of items as bytes to be returned.')
-        for i in range(bpp):
-            mi = (mi << 8) | mask[i]
-    else:
-        mi = 2 ** bc - 1
-    while True:
-        val = getrandbits(bc) & mi
-        yield tuple(val.to_bytes(bpp, 'big'))
+    return RandomPastel(bpp, mask, prng)
@@ -0,0 +1,528 @@
+"""
+Byte buffer kernels. Saturating arithmetic is done in place on the buffer.
+
+The low level kernels work on raw bytes in the range start - end. Constant kernels take a step so a single
+channel of every pixel can be changed. Buffer kernels take a source buffer and the number of target bytes each
+source byte applies to (1 for byte by byte, bpp for one value per pixel).
+
+Scale factors are 8.8 fixed point (256 = 1.0). Division uses a 16 bit reciprocal which gives the same result as
+floor division for every byte value.
+
+fill_pattern() and gradient() fill runs of pixels, copy_runs() applies a TrickLED repeat plan.
+popcount() and bool_buf() work on the bytes of a BitMap.
+blend_color() and blend_buf() fade toward a color or another buffer by a fraction of 256.
+blend_layer() composites a TrickLED layer with one of the BLEND modes.
+hue_fill() converts hues to pixels through a table, used by color.fill_hsv().
+stamp_erase() and stamp_add() draw the particles of a ParticleSystem.
+rle_apply() decodes the run length encoded frames of a baked frame file in place.
+heat_step() scrolls, diffuses and cools a heat map in one pass, used by Fire.
+expand() converts a buffer of palette indexes to colors, used by the TrickLED indexed mode.
+map_channels() runs every byte through a 256 byte table for its channel, used by the TrickLED output stage.
+xorshift_fill() and xorshift_bits() step the PRNG generator.
+last_diff() finds how much of a buffer changed since it was last written.
+rotate() copies a ring buffer back into order, it is used to resolve the scroll offset of ByteMap and TrickLED.
+
+If the port supports the viper emitter the kernels are replaced by the versions in kernels_viper. Both produce
+identical results.
+"""
+from array import array
+
+from micropython import const
+
+BOOL_AND = const(0)
+BOOL_OR = const(1)
+BOOL_XOR = const(2)
+BOOL_NOT = const(3)
+
+BLEND_REPLACE = const(0)
+BLEND_ADD = const(1)
+BLEND_MULTIPLY = const(2)
+BLEND_ALPHA = const(3)
+
+# number of ones in each byte value
+POP8 = bytes(bin(i).count('1') for i in range(256))
+# 16 bit reciprocal of each divisor, (v * RECIP[d]) >> 16 == v // d for 0 <= v <= 255
+RECIP = array('I', [0] + [(65536 + d - 1) // d for d in range(1, 256)])
+
+
+def add_const(buf, start, end, step, val):
+    for i in range(start, end, step):
+        v = buf[i] + val
+        buf[i] = v if v < 256 else 255
+
+
+def sub_const(buf, start, end, step, val):
+    for i in range(start, end, step):
+        v = buf[i] - val
+        buf[i] = v if v > 0 else 0
+
+
+def scale_const(buf, start, end, step, val):
+    for i in range(start, end, step):
+        v = (buf[i] * val) >> 8
+        buf[i] = v if v < 256 else 255
+
+
+def div_const(buf, start, end, step, val):
+    for i in range(start, end, step):
+        buf[i] = (buf[i] * val) >> 16
+
+
+def add_buf(buf, start, end, src, per):
+    j = 0
+    k = 0
+    for i in range(start, end):
+        v = buf[i] + src[j]
+        buf[i] = v if v < 256 else 255
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+
+
+def sub_buf(buf, start, end, src, per):
+    j = 0
+    k = 0
+    for i in range(start, end):
+        v = buf[i] - src[j]
+        buf[i] = v if v > 0 else 0
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+
+
+def scale_buf(buf, start, end, src, per):
+    j = 0
+    k = 0
+    for i in range(start, end):
+        buf[i] = (buf[i] * src[j]) >> 8
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+
+
+def div_buf(buf, start, end, src, per, recip):
+    j = 0
+    k = 0
+    for i in range(start, end):
+        d = src[j]
+        if d:
+            buf[i] = (buf[i] * recip[d]) >> 16
+        elif buf[i]:
+            buf[i] = 255
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+
+
+def blend_color(buf, start, end, col, bpp, frac):
+    """ Move each byte toward the byte for its channel in col by frac / 256 """
+    c = 0
+    for i in range(start, end):
+        v = buf[i]
+        buf[i] = v + (((col[c] - v) * frac) >> 8)
+        c += 1
+        if c == bpp:
+            c = 0
+
+
+def blend_buf(buf, start, end, src, frac):
+    """ Move each byte toward the byte at the same position in src by frac / 256 """
+    for i in range(start, end):
+        v = buf[i]
+        buf[i] = v + (((src[i] - v) * frac) >> 8)
+
+
+def hue_fill(dst, start, n, hues, vals, vstep, shift, table, bpp):
+    """ Write n pixels from byte start. Each is the color in table for (hue + shift) & 255 scaled by its value.
+        vals is read every vstep bytes, a step of 0 uses vals[0] for every pixel.
+    """
+    pmv = memoryview(table)
+    j = start
+    k = 0
+    for i in range(n):
+        m = ((hues[i] + shift) & 255) * bpp
+        v = vals[k] + 1
+        if v == 256:
+            dst[j:j + bpp] = pmv[m:m + bpp]
+        else:
+            for c in range(bpp):
+                dst[j + c] = (table[m + c] * v) >> 8
+        j += bpp
+        k += vstep
+
+
+def blend_layer(dst, src, alpha, start, end, mode, frac, bpp):
+    """
+    Composite src over dst[start:end] with opacity frac / 256. BLEND_REPLACE moves toward src, BLEND_ADD adds
+    src with saturation, BLEND_MULTIPLY multiplies by src / 256 and BLEND_ALPHA moves toward src by the alpha byte
+    of each pixel (alpha holds one byte per pixel, it is ignored by the other modes).
+    """
+    if mode == BLEND_REPLACE:
+        blend_buf(dst, start, end, src, frac)
+    elif mode == BLEND_ADD:
+        for i in range(start, end):
+            v = dst[i] + ((src[i] * frac) >> 8)
+            dst[i] = v if v < 256 else 255
+    elif mode == BLEND_MULTIPLY:
+        for i in range(start, end):
+            v = dst[i]
+            dst[i] = v + (((((v * (src[i] + 1)) >> 8) - v) * frac) >> 8)
+    else:
+        j = start // bpp
+        c = 0
+        a = 0
+        for i in range(start, end):
+            if c == 0:
+                a = ((alpha[j] + 1) * frac) >> 8
+                j += 1
+            v = dst[i]
+            dst[i] = v + (((src[i] - v) * a) >> 8)
+            c += 1
+            if c == bpp:
+                c = 0
+
+
+def heat_step(dst, src, n, po, mask, cool):
+    """
+    One frame of a heat map. dst[i] is the heat at src[(i + po) % n], so a po of (n - step) % n scrolls by step.
+    Where bit i of mask is set the heat is diffused with its neighbours, (left + 2 * center + right) >> 2 or the
+    average of the two at the ends. Every value is then cooled by cool.
+    """
+    k = po
+    prev = 0
+    cur = src[k]
+    for i in range(n):
+        k += 1
+        if k == n:
+            k = 0
+        nxt = src[k]
+        if mask[i >> 3] & (1 << (i & 7)):
+            if i == 0:
+                v = (cur + nxt) >> 1
+            elif i == n - 1:
+                v = (prev + cur) >> 1
+            else:
+                v = (prev + (cur << 1) + nxt) >> 2
+        else:
+            v = cur
+        v -= cool
+        dst[i] = v if v > 0 else 0
+        prev = cur
+        cur = nxt
+
+
+def stamp_erase(buf, drawn, count, glow, bg, n):
+    """ Fill the pixels within glow of each drawn[i] - 1 (0 is not drawn) with the color bg """
+    bpp = len(bg)
+    for i in range(count):
+        p = drawn[i] - 1
+        if p >= 0:
+            for q in range(max(p - glow, 0), min(p + glow + 1, n)):
+                o = q * bpp
+                for c in range(bpp):
+                    buf[o + c] = bg[c]
+
+
+def stamp_add(buf, pos, color, level, count, tbl, n, bpp, drawn):
+    """
+    Add each particle to buf with saturation. Particle i is at pixel pos[i] >> 8 with color color[i * bpp] at
+    brightness level[i]. tbl holds the brightness at each distance from the center, its length - 1 is the glow.
+    drawn[i] is set to the pixel + 1.
+    """
+    g = len(tbl) - 1
+    for i in range(count):
+        p = pos[i] >> 8
+        drawn[i] = p + 1
+        lv = level[i] + 1
+        ci = i * bpp
+        for d in range(-g, g + 1):
+            q = p + d
+            if 0 <= q < n:
+                f = ((tbl[d if d >= 0 else -d] * lv) >> 8) + 1
+                o = q * bpp
+                for c in range(bpp):
+                    v = buf[o + c] + ((color[ci + c] * f) >> 8)
+                    buf[o + c] = v if v < 256 else 255
+
+
+def rle_apply(dst, src, length, bpp, xor, end):
+    """
+    Decode length bytes of pixel runs from src into dst[0:end]. A control byte c below 128 is followed by c + 1
+    literal pixels, otherwise by one pixel repeated (c & 127) + 1 times. Pixels are bpp bytes. With xor the pixels
+    are xored into dst (a delta from the previous frame) instead of replacing it. Stops at a run past end.
+    """
+    i = 0
+    pos = 0
+    while i < length:
+        c = src[i]
+        i += 1
+        if c & 128:
+            cnt = ((c & 127) + 1) * bpp
+            if pos + cnt > end:
+                return
+            zero = True
+            for b in range(bpp):
+                if src[i + b]:
+                    zero = False
+            if not xor:
+                for k in range(cnt):
+                    dst[pos + k] = src[i + k % bpp]
+            elif not zero:
+                for k in range(cnt):
+                    dst[pos + k] ^= src[i + k % bpp]
+            i += bpp
+        else:
+            cnt = (c + 1) * bpp
+            if pos + cnt > end:
+                return
+            if xor:
+                for k in range(cnt):
+                    dst[pos + k] ^= src[i + k]
+            else:
+                dst[pos:pos + cnt] = src[i:i + cnt]
+            i += cnt
+        pos += cnt
+
+
+def copy_runs(dst, src, plan, bpp):
+    """ Copy runs of pixels from src to dst. plan holds (dst pixel, src pixel, count, forward) for each run where
+        forward is 1 to copy forward or 0 to copy the source pixels in reverse. Plans are array('i') and viper reads
+        them unsigned on 64 bit ports, so the direction is never negative.
+    """
+    mv = memoryview(src)
+    for r in range(0, len(plan), 4):
+        d = plan[r] * bpp
+        s = plan[r + 1] * bpp
+        c = plan[r + 2] * bpp
+        if plan[r + 3]:
+            dst[d:d + c] = mv[s:s + c]
+        else:
+            for k in range(0, c, bpp):
+                dst[d + k:d + k + bpp] = mv[s - k:s - k + bpp]
+
+
+def fill_pattern(buf, start, end, pat):
+    """ Repeat the bytes of pat over buf[start:end], doubling the filled section with each copy """
+    size = end - start
+    if size <= 0:
+        return
+    k = len(pat)
+    if k >= size:
+        buf[start:end] = pat[:size]
+        return
+    buf[start:start + k] = pat
+    mv = memoryview(buf)
+    while k < size:
+        c = min(k, size - k)
+        buf[start + k:start + k + c] = mv[start:start + c]
+        k += c
+
+
+def gradient(buf, start, n, col, inc, bpp):
+    """ Write n pixels starting at byte start. Channel c starts at col[c] and adds inc[c] (16.16 fixed point)
+        each pixel.
+    """
+    for c in range(bpp):
+        v = (col[c] << 16) + 32768
+        d = inc[c]
+        j = start + c
+        for _ in range(n):
+            buf[j] = v >> 16
+            v += d
+            j += bpp
+
+
+def popcount(buf, start, end):
+    """ Count the bits set in buf[start:end] """
+    c = 0
+    for i in range(start, end):
+        c += POP8[buf[i]]
+    return c
+
+
+def bool_buf(dst, src, start, end, op):
+    """ Bitwise BOOL_AND, BOOL_OR or BOOL_XOR of src into dst, or BOOL_NOT of dst (src is ignored) """
+    for i in range(start, end):
+        if op == BOOL_AND:
+            dst[i] &= src[i]
+        elif op == BOOL_OR:
+            dst[i] |= src[i]
+        elif op == BOOL_XOR:
+            dst[i] ^= src[i]
+        else:
+            dst[i] ^= 255
+
+
+def xorshift_fill(buf, start, end, state):
+    """ Fill buf[start:end] with random bytes from the xorshift32 generator in state[0], 4 bytes per step """
+    x = state[0]
+    i = start
+    while i < end:
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        v = x
+        for _ in range(4):
+            if i == end:
+                break
+            buf[i] = v & 255
+            v >>= 8
+            i += 1
+    state[0] = x
+
+
+def xorshift_bits(state, k):
+    """ Next value of the xorshift32 generator in state[0], keeping the top k bits (1 - 32) """
+    x = state[0]
+    x ^= (x << 13) & 0xFFFFFFFF
+    x ^= x >> 17
+    x ^= (x << 5) & 0xFFFFFFFF
+    state[0] = x
+    return x >> (32 - k)
+
+
+def last_diff(a, b, end):
+    """ Position after the last byte that differs between a[:end] and b[:end], 0 if they are the same """
+    if end == len(a) == len(b) and a == b:
+        return 0
+    i = end
+    while i > 0:
+        i -= 1
+        if a[i] != b[i]:
+            return i + 1
+    return 0
+
+
+def rotate(dst, src, start, end, cut):
+    """ Copy src[start:end] into dst[start:end] rotated left by cut bytes """
+    mv = memoryview(src)
+    split = end - cut
+    dst[start:split] = mv[start + cut:end]
+    dst[split:end] = mv[start:start + cut]
+
+
+def map_channels(dst, src, start, end, table, bpp):
+    """ dst[i] = table[channel * 256 + src[i]] where channel counts 0 to bpp - 1 from start """
+    c = 0
+    for i in range(start, end):
+        dst[i] = table[c + src[i]]
+        c += 256
+        if c == bpp << 8:
+            c = 0
+
+
+def expand(dst, src, n, po, pal, count, bpp, shift):
+    """
+    Expand n palette indexes from src into colors in dst. Reading starts at src[po] and wraps around at n.
+    Index values are shifted right by shift and limited to the count of palette entries.
+    """
+    pmv = memoryview(pal)
+    j = 0
+    k = po
+    for _ in range(n):
+        m = src[k] >> shift
+        if m >= count:
+            m = count - 1
+        m *= bpp
+        dst[j:j + bpp] = pmv[m:m + bpp]
+        j += bpp
+        k += 1
+        if k == n:
+            k = 0
+
+
+try:
+    from .kernels_viper import *
+except Exception:
+    # no viper emitter, or it rejects one of the kernels (ViperTypeError): keep the Python versions
+    pass
+
+
+def _fixed(val):
+    """ Convert a multiplier to an 8.8 fixed point factor """
+    if val <= 0:
+        return 0
+    return min(int(val * 256), 65535)
+
+
+def _apply(kc, kb, buf, val, start, end, per, conv, kn=None):
+    if end is None:
+        end = len(buf)
+    if isinstance(val, (list, tuple)):
+        c = len(val)
+        for ch in range(c):
+            v = val[ch]
+            # a negative channel of an add is a subtract and the other way around
+            if kn is not None and v < 0:
+                kn(buf, start + ch, end, c, conv(-v))
+            else:
+                kc(buf, start + ch, end, c, conv(v))
+    elif isinstance(val, (bytes, bytearray, memoryview)):
+        kb(buf, start, end, val, per)
+    else:
+        kc(buf, start, end, 1, conv(val))
+
+
+def _clamp(val):
+    return min(max(int(val), 0), 255)
+
+
+def add(buf, val, start=0, end=None, per=1):
+    """
+    Saturating add in place.
+
+    :param buf: Buffer to change
+    :param val: int or sequence of per channel values, negative values subtract, or a buffer of values
+    :param start: Start byte
+    :param end: End byte, defaults to the end of buf
+    :param per: Number of bytes each byte of a buffer value applies to
+    """
+    if isinstance(val, (int, float)) and val < 0:
+        return sub(buf, -val, start, end, per)
+    _apply(add_const, add_buf, buf, val, start, end, per, _clamp, sub_const)
+
+
+def sub(buf, val, start=0, end=None, per=1):
+    """ Saturating subtract in place. Arguments are the same as add() """
+    if isinstance(val, (int, float)) and val < 0:
+        return add(buf, -val, start, end, per)
+    _apply(sub_const, sub_buf, buf, val, start, end, per, _clamp, add_const)
+
+
+def scale(buf, val, start=0, end=None, per=1):
+    """
+    Saturating multiply in place.
+
+    :param buf: Buffer to change
+    :param val: Number, sequence of per channel numbers or a buffer of fractions of 256
+    :param start: Start byte
+    :param end: End byte, defaults to the end of buf
+    :param per: Number of bytes each byte of a buffer value applies to
+    """
+    _apply(scale_const, scale_buf, buf, val, start, end, per, _fixed)
+
+
+def div(buf, val, start=0, end=None, per=1):
+    """
+    Divide in place. Integer divisors give the same results as floor division. Any other number is converted to
+    a scale factor. A zero in a buffer of divisors saturates the byte.
+    """
+    if end is None:
+        end = len(buf)
+    if isinstance(val, (bytes, bytearray, memoryview)):
+        div_buf(buf, start, end, val, per, RECIP)
+        return
+    vals = val if isinstance(val, (list, tuple)) else (val,)
+    c = len(vals)
+    for ch in range(c):
+        d = vals[ch]
+        if d == 0:
+            raise ZeroDivisionError('division by zero')
+        if isinstance(d, int) and 0 < d < 256:
+            div_const(buf, start + ch, end, c, RECIP[d])
+        else:
+            scale_const(buf, start + ch, end, c, _fixed(1 / d))
@@ -0,0 +1,548 @@
+"""
+Viper versions of the kernels in kernels.py. Importing this fails on ports without the native emitter, in which
+case the pure Python versions are used.
+"""
+import micropython
+
+
+@micropython.viper
+def add_const(buf, start: int, end: int, step: int, val: int):
+    p = ptr8(buf)
+    i = start
+    while i < end:
+        v = p[i] + val
+        if v > 255:
+            v = 255
+        p[i] = v
+        i += step
+
+
+@micropython.viper
+def sub_const(buf, start: int, end: int, step: int, val: int):
+    p = ptr8(buf)
+    i = start
+    while i < end:
+        v = p[i] - val
+        if v < 0:
+            v = 0
+        p[i] = v
+        i += step
+
+
+@micropython.viper
+def scale_const(buf, start: int, end: int, step: int, val: int):
+    p = ptr8(buf)
+    i = start
+    while i < end:
+        v = (p[i] * val) >> 8
+        if v > 255:
+            v = 255
+        p[i] = v
+        i += step
+
+
+@micropython.viper
+def div_const(buf, start: int, end: int, step: int, val: int):
+    p = ptr8(buf)
+    i = start
+    while i < end:
+        p[i] = (p[i] * val) >> 16
+        i += step
+
+
+@micropython.viper
+def add_buf(buf, start: int, end: int, src, per: int):
+    p = ptr8(buf)
+    s = ptr8(src)
+    j = 0
+    k = 0
+    i = start
+    while i < end:
+        v = p[i] + s[j]
+        if v > 255:
+            v = 255
+        p[i] = v
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+        i += 1
+
+
+@micropython.viper
+def sub_buf(buf, start: int, end: int, src, per: int):
+    p = ptr8(buf)
+    s = ptr8(src)
+    j = 0
+    k = 0
+    i = start
+    while i < end:
+        v = p[i] - s[j]
+        if v < 0:
+            v = 0
+        p[i] = v
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+        i += 1
+
+
+@micropython.viper
+def scale_buf(buf, start: int, end: int, src, per: int):
+    p = ptr8(buf)
+    s = ptr8(src)
+    j = 0
+    k = 0
+    i = start
+    while i < end:
+        p[i] = (p[i] * s[j]) >> 8
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+        i += 1
+
+
+@micropython.viper
+def div_buf(buf, start: int, end: int, src, per: int, recip):
+    p = ptr8(buf)
+    s = ptr8(src)
+    r = ptr32(recip)
+    j = 0
+    k = 0
+    i = start
+    while i < end:
+        d = s[j]
+        if d:
+            p[i] = (p[i] * r[d]) >> 16
+        elif p[i]:
+            p[i] = 255
+        k += 1
+        if k == per:
+            k = 0
+            j += 1
+        i += 1
+
+
+@micropython.viper
+def blend_color(buf, start: int, end: int, col, bpp: int, frac: int):
+    p = ptr8(buf)
+    q = ptr8(col)
+    c = 0
+    i = start
+    while i < end:
+        v = p[i]
+        p[i] = v + (((q[c] - v) * frac) >> 8)
+        c += 1
+        if c == bpp:
+            c = 0
+        i += 1
+
+
+@micropython.viper
+def blend_buf(buf, start: int, end: int, src, frac: int):
+    p = ptr8(buf)
+    s = ptr8(src)
+    i = start
+    while i < end:
+        v = p[i]
+        p[i] = v + (((s[i] - v) * frac) >> 8)
+        i += 1
+
+
+@micropython.viper
+def blend_layer(dst, src, alpha, start: int, end: int, mode: int, frac: int, bpp: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    i = start
+    if mode == 0:
+        while i < end:
+            v = d[i]
+            d[i] = v + (((s[i] - v) * frac) >> 8)
+            i += 1
+    elif mode == 1:
+        while i < end:
+            v = d[i] + ((s[i] * frac) >> 8)
+            if v > 255:
+                v = 255
+            d[i] = v
+            i += 1
+    elif mode == 2:
+        while i < end:
+            v = d[i]
+            d[i] = v + (((((v * (s[i] + 1)) >> 8) - v) * frac) >> 8)
+            i += 1
+    else:
+        al = ptr8(alpha)
+        j = 0
+        k = 0
+        while k < start:
+            k += bpp
+            j += 1
+        c = 0
+        a = 0
+        while i < end:
+            if c == 0:
+                a = ((al[j] + 1) * frac) >> 8
+                j += 1
+            v = d[i]
+            d[i] = v + (((s[i] - v) * a) >> 8)
+            c += 1
+            if c == bpp:
+                c = 0
+            i += 1
+
+
+@micropython.viper
+def hue_fill(dst, start: int, n: int, hues, vals, vstep: int, shift: int, table, bpp: int):
+    d = ptr8(dst)
+    h = ptr8(hues)
+    s = ptr8(vals)
+    t = ptr8(table)
+    j = start
+    k = 0
+    i = 0
+    while i < n:
+        m = ((h[i] + shift) & 255) * bpp
+        v = s[k] + 1
+        c = 0
+        while c < bpp:
+            d[j + c] = (t[m + c] * v) >> 8
+            c += 1
+        j += bpp
+        k += vstep
+        i += 1
+
+
+@micropython.viper
+def heat_step(dst, src, n: int, po: int, mask, cool: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    m = ptr8(mask)
+    k = po
+    prev = 0
+    cur = s[k]
+    i = 0
+    while i < n:
+        k += 1
+        if k == n:
+            k = 0
+        nxt = s[k]
+        if m[i >> 3] & (1 << (i & 7)):
+            if i == 0:
+                v = (cur + nxt) >> 1
+            elif i == n - 1:
+                v = (prev + cur) >> 1
+            else:
+                v = (prev + (cur << 1) + nxt) >> 2
+        else:
+            v = cur
+        v -= cool
+        if v < 0:
+            v = 0
+        d[i] = v
+        prev = cur
+        cur = nxt
+        i += 1
+
+
+@micropython.viper
+def stamp_erase(buf, drawn, count: int, glow: int, bg, n: int):
+    b = ptr8(buf)
+    dr = ptr32(drawn)
+    col = ptr8(bg)
+    bpp = int(len(bg))
+    i = 0
+    while i < count:
+        p = dr[i] - 1
+        if p >= 0:
+            q = p - glow
+            if q < 0:
+                q = 0
+            end = p + glow + 1
+            if end > n:
+                end = n
+            o = q * bpp
+            last = end * bpp
+            c = 0
+            while o < last:
+                b[o] = col[c]
+                c += 1
+                if c == bpp:
+                    c = 0
+                o += 1
+        i += 1
+
+
+@micropython.viper
+def stamp_add(buf, pos, color, level, count: int, tbl, n: int, bpp: int, drawn):
+    b = ptr8(buf)
+    ps = ptr32(pos)
+    col = ptr8(color)
+    lvl = ptr8(level)
+    t = ptr8(tbl)
+    dr = ptr32(drawn)
+    g = int(len(tbl)) - 1
+    i = 0
+    while i < count:
+        p = ps[i] >> 8
+        dr[i] = p + 1
+        lv = lvl[i] + 1
+        ci = i * bpp
+        q = p - g
+        last = p + g
+        while q <= last:
+            if q >= 0 and q < n:
+                d = q - p
+                if d < 0:
+                    d = p - q
+                f = ((t[d] * lv) >> 8) + 1
+                o = q * bpp
+                c = 0
+                while c < bpp:
+                    v = b[o + c] + ((col[ci + c] * f) >> 8)
+                    if v > 255:
+                        v = 255
+                    b[o + c] = v
+                    c += 1
+            q += 1
+        i += 1
+
+
+@micropython.viper
+def rle_apply(dst, src, length: int, bpp: int, xor: int, end: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    i = 0
+    pos = 0
+    while i < length:
+        c = s[i]
+        i += 1
+        if c & 128:
+            cnt = ((c & 127) + 1) * bpp
+            if pos + cnt > end:
+                return
+            zero = 1
+            b = 0
+            while b < bpp:
+                if s[i + b]:
+                    zero = 0
+                b += 1
+            if not xor or not zero:
+                k = 0
+                b = 0
+                while k < cnt:
+                    if xor:
+                        d[pos + k] = d[pos + k] ^ s[i + b]
+                    else:
+                        d[pos + k] = s[i + b]
+                    b += 1
+                    if b == bpp:
+                        b = 0
+                    k += 1
+            i += bpp
+        else:
+            cnt = (c + 1) * bpp
+            if pos + cnt > end:
+                return
+            k = 0
+            while k < cnt:
+                if xor:
+                    d[pos + k] = d[pos + k] ^ s[i + k]
+                else:
+                    d[pos + k] = s[i + k]
+                k += 1
+            i += cnt
+        pos += cnt
+
+
+@micropython.viper
+def copy_runs(dst, src, plan, bpp: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    q = ptr32(plan)
+    end = int(len(plan))
+    r = 0
+    while r < end:
+        di = q[r] * bpp
+        si = q[r + 1] * bpp
+        c = q[r + 2] * bpp
+        if q[r + 3]:
+            k = 0
+            while k < c:
+                d[di + k] = s[si + k]
+                k += 1
+        else:
+            k = 0
+            while k < c:
+                b = 0
+                while b < bpp:
+                    d[di + k + b] = s[si - k + b]
+                    b += 1
+                k += bpp
+        r += 4
+
+
+@micropython.viper
+def fill_pattern(buf, start: int, end: int, pat):
+    p = ptr8(buf)
+    q = ptr8(pat)
+    k = int(len(pat))
+    c = 0
+    i = start
+    while i < end:
+        p[i] = q[c]
+        c += 1
+        if c == k:
+            c = 0
+        i += 1
+
+
+@micropython.viper
+def gradient(buf, start: int, n: int, col, inc, bpp: int):
+    p = ptr8(buf)
+    q = ptr8(col)
+    d = ptr32(inc)
+    c = 0
+    while c < bpp:
+        v = (q[c] << 16) + 32768
+        dc = d[c]
+        j = start + c
+        i = 0
+        while i < n:
+            p[j] = v >> 16
+            v += dc
+            j += bpp
+            i += 1
+        c += 1
+
+
+@micropython.viper
+def popcount(buf, start: int, end: int) -> int:
+    p = ptr8(buf)
+    c = 0
+    i = start
+    while i < end:
+        v = p[i]
+        while v:
+            v &= v - 1
+            c += 1
+        i += 1
+    return c
+
+
+@micropython.viper
+def bool_buf(dst, src, start: int, end: int, op: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    i = start
+    while i < end:
+        if op == 0:
+            d[i] = d[i] & s[i]
+        elif op == 1:
+            d[i] = d[i] | s[i]
+        elif op == 2:
+            d[i] = d[i] ^ s[i]
+        else:
+            d[i] = d[i] ^ 255
+        i += 1
+
+
+@micropython.viper
+def xorshift_fill(buf, start: int, end: int, state):
+    p = ptr8(buf)
+    s = ptr32(state)
+    i = start
+    while i < end:
+        # storing in state truncates to 32 bits on ports with a wider machine word
+        x = uint(s[0])
+        s[0] = x ^ (x << 13)
+        x = uint(s[0])
+        x ^= x >> 17
+        s[0] = x ^ (x << 5)
+        x = uint(s[0])
+        c = 0
+        while c < 4 and i < end:
+            p[i] = x
+            x >>= 8
+            c += 1
+            i += 1
+
+
+@micropython.viper
+def xorshift_bits(state, k: int) -> int:
+    s = ptr32(state)
+    x = uint(s[0])
+    s[0] = x ^ (x << 13)
+    x = uint(s[0])
+    x ^= x >> 17
+    s[0] = x ^ (x << 5)
+    x = uint(s[0])
+    return int(x >> (32 - k))
+
+
+@micropython.viper
+def last_diff(a, b, end: int) -> int:
+    p = ptr8(a)
+    q = ptr8(b)
+    i = end
+    while i > 0:
+        i -= 1
+        if p[i] != q[i]:
+            return i + 1
+    return 0
+
+
+@micropython.viper
+def rotate(dst, src, start: int, end: int, cut: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    i = start
+    j = start + cut
+    while i < end:
+        if j == end:
+            j = start
+        d[i] = s[j]
+        i += 1
+        j += 1
+
+
+@micropython.viper
+def map_channels(dst, src, start: int, end: int, table, bpp: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    t = ptr8(table)
+    last = bpp << 8
+    c = 0
+    i = start
+    while i < end:
+        d[i] = t[c + s[i]]
+        c += 256
+        if c == last:
+            c = 0
+        i += 1
+
+
+@micropython.viper
+def expand(dst, src, n: int, po: int, pal, count: int, bpp: int, shift: int):
+    d = ptr8(dst)
+    s = ptr8(src)
+    p = ptr8(pal)
+    j = 0
+    k = po
+    i = 0
+    while i < n:
+        m = s[k] >> shift
+        if m >= count:
+            m = count - 1
+        m *= bpp
+        c = 0
+        while c < bpp:
+            d[j + c] = p[m + c]
+            c += 1
+        j += bpp
+        k += 1
+        if k == n:
+            k = 0
+        i += 1
@@ -0,0 +1,122 @@
+"""
+Lookup tables for the color and wave helpers. Tables are built the first time they are used.
+
+Color wheel tables are kept per brightness. Only the most recently used brightness values are cached, so changing
+the brightness builds one new table and every caller picks it up.
+
+ease() maps the progress of a timed effect through an easing curve in fixed point, it needs no table.
+"""
+import math
+
+from micropython import const
+
+# number of color wheel tables to keep (768 bytes each)
+WHEEL_CACHE_SIZE = const(4)
+EASE_LINEAR = const(0)
+EASE_IN = const(1)
+EASE_OUT = const(2)
+EASE_IN_OUT = const(3)
+
+_wheel_tables = {}
+_wheel_keys = []
+_heat_table = None
+_sin_table = None
+_gamma_table = None
+_gamma = None
+
+
+def _build_wheel(val):
+    # 255 degree color wheel at full saturation, hue 255 is the same as hue 0
+    tbl = bytearray(768)
+    for hue in range(256):
+        h = hue % 255
+        ci = val * (h % 85) // 85
+        cd = val - ci
+        i = hue * 3
+        if h < 85:
+            tbl[i:i + 3] = bytes((cd, ci, 0))
+        elif h < 170:
+            tbl[i:i + 3] = bytes((0, cd, ci))
+        else:
+            tbl[i:i + 3] = bytes((ci, 0, cd))
+    return tbl
+
+
+def wheel(val=255):
+    """ Color wheel table at brightness val, 256 RGB entries """
+    tbl = _wheel_tables.get(val)
+    if tbl is None:
+        if len(_wheel_keys) >= WHEEL_CACHE_SIZE:
+            del _wheel_tables[_wheel_keys.pop(0)]
+        tbl = _wheel_tables[val] = _build_wheel(val)
+        _wheel_keys.append(val)
+    return tbl
+
+
+def heat():
+    """ Black body heat ramp table, 256 RGB entries """
+    global _heat_table
+    if _heat_table is None:
+        tbl = bytearray(768)
+        for temp in range(256):
+            # normalizing to 191 and using last 6 bits of that for heat_ramp was borrowed from FastLED
+            t191 = temp * 191 // 255
+            heat_ramp = (t191 & 63) << 2
+            i = temp * 3
+            if t191 < 64:
+                tbl[i] = heat_ramp
+            elif t191 < 128:
+                tbl[i:i + 2] = bytes((255, heat_ramp))
+            else:
+                tbl[i:i + 3] = bytes((255, 255, heat_ramp))
+        _heat_table = tbl
+    return _heat_table
+
+
+def gamma(g):
+    """ Gamma correction table, only the last gamma value used is kept """
+    global _gamma_table, _gamma
+    if g != _gamma:
+        _gamma_table = bytes(int(255 * (i / 255) ** g + 0.5) for i in range(256))
+        _gamma = g
+    return _gamma_table
+
+
+def sin_table():
+    """ Sine over 256 steps scaled to 0-255, centered on 128 """
+    global _sin_table
+    if _sin_table is None:
+        _sin_table = bytes(min(int(128.5 + 127.5 * math.sin(i * math.pi / 128)), 255) for i in range(256))
+    return _sin_table
+
+
+def sin8(i):
+    """ Integer sine, one full cycle every 256 steps """
+    return sin_table()[i & 255]
+
+
+def cos8(i):
+    """ Integer cosine, one full cycle every 256 steps """
+    return sin_table()[(i + 64) & 255]
+
+
+def ease(curve, t):
+    """
+    Progress t (0-256) through an easing curve, returns 0-256.
+
+    :param curve: EASE_LINEAR, EASE_IN (quadratic, starts slow), EASE_OUT (quadratic, ends slow) or EASE_IN_OUT
+        (smoothstep)
+    :param t: Progress, 256 is done
+    """
+    if t <= 0:
+        return 0
+    if t >= 256:
+        return 256
+    if curve == EASE_IN:
+        return (t * t) >> 8
+    if curve == EASE_OUT:
+        r = 256 - t
+        return 256 - ((r * r) >> 8)
+    if curve == EASE_IN_OUT:
+        return (t * t * (768 - (t << 1))) >> 16
+    return t
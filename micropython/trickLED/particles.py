@@ -0,0 +1,184 @@
+"""
+Fixed capacity particle engine. Every field lives in a preallocated array, so stepping and rendering particles does
+not allocate and costs time per live particle rather than per pixel.
+
+Positions and velocities are 8.8 fixed point pixels (FIXED_ONE = 1 pixel). Particles are drawn with additive
+saturation, optionally with a glow that fades over a few pixels to each side. Before drawing, the pixels under the
+previous stamps are restored to the background color, so particles can move over a static background without
+the whole buffer being redrawn. Whatever was drawn under a stamp is lost, so an animation that draws or scrolls
+under its particles should give them a Layer of their own. A scrolled target is resolved before particles are
+drawn, so they land on the pixels they are shown at.
+"""
+from array import array
+
+from micropython import const
+
+from . import kernels
+from .trickLED import colval
+
+FIXED_ONE = const(256)
+# life value for particles that only die by leaving the strip or fading out
+LIFE_FOREVER = const(65535)
+
+
+def glow_table(glow):
+    """ Brightness (0-255) of a stamp at each distance from its center, 0 to glow pixels """
+    return bytes((((glow + 1 - d) * 255 // (glow + 1)) ** 2) >> 8 if d else 255 for d in range(glow + 1))
+
+
+class ParticleSystem:
+    """ Particles drawn into the buffer of a TrickLED or Layer. """
+
+    def __init__(self, target, capacity=16, glow=0, background=0):
+        """
+        :param target: TrickLED or Layer to draw into
+        :param capacity: Maximum number of live particles
+        :param glow: Pixels of glow on each side of a particle
+        :param background: Color restored under the stamps of moving and dead particles
+        """
+        self.target = target
+        self.bpp = target.bpp
+        self.n = getattr(target, 'repeat_n', None) or target.n
+        self.capacity = capacity
+        self.count = 0
+        self.pos = array('i', [0] * capacity)
+        self.vel = array('i', [0] * capacity)
+        self.life = array('H', [0] * capacity)
+        self.level = bytearray(capacity)
+        self.decay = bytearray(capacity)
+        self.color = bytearray(capacity * self.bpp)
+        # pixel + 1 each particle was last drawn at, 0 if it has not been drawn
+        self.drawn = array('i', [0] * capacity)
+        self.glow = 0
+        self._glow = None
+        self.set_glow(glow)
+        self.background = None
+        self.set_background(background)
+
+    def _order(self, color):
+        col = colval(color, self.bpp)
+        order = self.target.ORDER
+        return bytes(col[order[i]] for i in range(self.bpp))
+
+    def set_target(self, target):
+        """ Draw into another TrickLED or Layer of the same length, live particles stay where they are """
+        n = getattr(target, 'repeat_n', None) or target.n
+        if n != self.n or target.bpp != self.bpp:
+            raise ValueError('target must have {} pixels of {} bytes'.format(self.n, self.bpp))
+        self.target = target
+        # nothing has been drawn on the new target yet
+        for i in range(self.count):
+            self.drawn[i] = 0
+
+    def set_glow(self, glow):
+        """ Set the pixels of glow on each side of a particle """
+        self.glow = glow
+        self._glow = glow_table(glow)
+
+    def set_background(self, color):
+        """ Set the color restored under old stamps """
+        self.background = self._order(color)
+
+    def emit(self, pixel, vel, color, life=LIFE_FOREVER, level=255, decay=0):
+        """
+        Add a particle.
+
+        :param pixel: Starting pixel
+        :param vel: Pixels per frame in 8.8 fixed point, negative moves toward pixel 0
+        :param color: Color at full level
+        :param life: Frames to live
+        :param level: Starting brightness 0-255
+        :param decay: Brightness lost each frame
+        :return: Index of the particle or -1 if the system is full
+        """
+        i = self.count
+        if i >= self.capacity or not 0 <= pixel < self.n:
+            return -1
+        self.count = i + 1
+        self.pos[i] = (pixel << 8) + (FIXED_ONE >> 1)
+        self.vel[i] = vel
+        self.life[i] = life
+        self.level[i] = level
+        self.decay[i] = decay
+        self.drawn[i] = 0
+        o = i * self.bpp
+        self.color[o:o + self.bpp] = self._order(color)
+        return i
+
+    def pixel(self, i):
+        """ Pixel particle i is on """
+        return self.pos[i] >> 8
+
+    def _buf(self):
+        """ Buffer of the target with its scroll offset applied, layers are never scrolled """
+        target = self.target
+        if getattr(target, '_po', 0):
+            target.resolve()
+        return target.buf
+
+    def _erase(self, i):
+        p = self.drawn[i] - 1
+        if p >= 0:
+            bpp = self.bpp
+            kernels.fill_pattern(self._buf(), max(p - self.glow, 0) * bpp,
+                                 min(p + self.glow + 1, self.n) * bpp, self.background)
+            self.drawn[i] = 0
+
+    def kill(self, i):
+        """ Remove particle i, the last particle takes its index """
+        self._erase(i)
+        last = self.count - 1
+        if i != last:
+            self.pos[i] = self.pos[last]
+            self.vel[i] = self.vel[last]
+            self.life[i] = self.life[last]
+            self.level[i] = self.level[last]
+            self.decay[i] = self.decay[last]
+            self.drawn[i] = self.drawn[last]
+            bpp = self.bpp
+            for c in range(bpp):
+                self.color[i * bpp + c] = self.color[last * bpp + c]
+        self.count = last
+
+    def clear(self):
+        """ Remove every particle """
+        while self.count:
+            self.kill(self.count - 1)
+
+    def bake(self):
+        """ Leave every particle in the buffer as a plain pixel of its color and remove it """
+        bpp = self.bpp
+        for i in range(self.count):
+            self._erase(i)
+            buf = self._buf()
+            o = self.pixel(i) * bpp
+            for c in range(bpp):
+                buf[o + c] = self.color[i * bpp + c]
+        self.count = 0
+
+    def step(self):
+        """ Move, age and fade the particles one frame. Particles that leave the strip or fade out die. """
+        limit = self.n << 8
+        i = 0
+        while i < self.count:
+            life = self.life[i]
+            if life != LIFE_FOREVER:
+                if life == 0:
+                    self.kill(i)
+                    continue
+                self.life[i] = life - 1
+            level = self.level[i] - self.decay[i]
+            pos = self.pos[i] + self.vel[i]
+            if level <= 0 or not 0 <= pos < limit:
+                self.kill(i)
+                continue
+            self.level[i] = level
+            self.pos[i] = pos
+            i += 1
+
+    def render(self):
+        """ Restore the background under the last stamps then draw every particle """
+        buf = self._buf()
+        kernels.stamp_erase(buf, self.drawn, self.count, self.glow, self.background, self.n)
+        kernels.stamp_add(buf, self.pos, self.color, self.level, self.count, self._glow, self.n, self.bpp,
+                          self.drawn)
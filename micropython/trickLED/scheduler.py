@@ -0,0 +1,231 @@
+"""
+Fixed rate frame clock. Frames are scheduled against absolute ticks_us deadlines, so render and write time do not
+add to the frame period and the rate does not drift.
+
+When a frame runs late the policy decides what happens to the deadlines that were missed:
+
+POLICY_SKIP drops them and the frame count jumps ahead, so animations stay on time.
+POLICY_CATCH_UP keeps every deadline, late frames run back to back until the clock has caught up.
+POLICY_DRIFT restarts the schedule from the late frame, nothing is dropped but the rate slows down.
+
+FrameStats keeps per frame timings and allocations of an animation for profiling, see AnimationBase.enable_stats().
+"""
+import gc
+import time
+from array import array
+
+from micropython import const
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+POLICY_SKIP = const(0)
+POLICY_CATCH_UP = const(1)
+POLICY_DRIFT = const(2)
+
+# lateness histogram buckets: under 1 ms, then doubling up to 64 ms and over
+LATE_BUCKETS = const(8)
+# frames kept by FrameStats
+STATS_SAMPLES = const(128)
+
+try:
+    mem_alloc = gc.mem_alloc
+    mem_peak = mem_alloc
+    reset_peak = None
+except AttributeError:
+    # CPython frees memory right away, so count the peak traced by tracemalloc when it is running instead,
+    # used by the host benchmarks
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0]
+
+    def mem_peak():
+        return tracemalloc.get_traced_memory()[1]
+
+    try:
+        import tracemalloc
+        reset_peak = tracemalloc.reset_peak
+    except (ImportError, AttributeError):
+        def mem_alloc():
+            return 0
+
+        mem_peak = mem_alloc
+        reset_peak = None
+
+if hasattr(gc, 'get_stats'):
+    def gc_collections():
+        return sum(s['collections'] for s in gc.get_stats())
+else:
+    # MicroPython does not count collections, a frame that ends with less memory allocated than it started with
+    # had one
+    gc_collections = None
+
+
+class FrameClock:
+    """ Paces frames at a fixed interval and keeps timing stats for them. """
+
+    def __init__(self, interval=50, policy=POLICY_SKIP):
+        """
+        :param interval: Milliseconds between the start of each frame
+        :param policy: POLICY_SKIP, POLICY_CATCH_UP or POLICY_DRIFT
+        """
+        self.interval = interval
+        self.policy = policy
+        self.deadline = 0
+        # late[b] counts frames that started 2 ** (b - 1) to 2 ** b ms late, late[0] under 1 ms
+        self.late = array('I', [0] * LATE_BUCKETS)
+        self.stats = {}
+        self.reset()
+
+    def reset(self):
+        """ Clear the stats and start the clock from now """
+        for b in range(LATE_BUCKETS):
+            self.late[b] = 0
+        self.stats = {'frames': 0, 'dropped': 0, 'render_us': 0, 'render_max_us': 0,
+                      'write_us': 0, 'write_max_us': 0, 'late_max_us': 0}
+        self.deadline = time.ticks_us()
+
+    def frame_done(self, render_us, write_us):
+        """ Record the time taken to render and write the frame that just finished """
+        stats = self.stats
+        stats['frames'] += 1
+        stats['render_us'] += render_us
+        stats['write_us'] += write_us
+        if render_us > stats['render_max_us']:
+            stats['render_max_us'] = render_us
+        if write_us > stats['write_max_us']:
+            stats['write_max_us'] = write_us
+
+    async def wait(self):
+        """
+        Sleep until the next deadline.
+
+        :return: Number of frames dropped to get back on time, the caller should advance its frame count by it
+        """
+        period = self.interval * 1000
+        self.deadline = time.ticks_add(self.deadline, period)
+        remaining = time.ticks_diff(self.deadline, time.ticks_us())
+        if remaining > 0:
+            await asyncio.sleep(remaining / 1000000)
+        else:
+            # always give the other tasks a turn
+            await asyncio.sleep(0)
+        late = time.ticks_diff(time.ticks_us(), self.deadline)
+        if late < 0:
+            late = 0
+        self._record_late(late)
+        if late < period or period == 0:
+            return 0
+        if self.policy == POLICY_DRIFT:
+            self.deadline = time.ticks_add(self.deadline, late)
+            return 0
+        if self.policy == POLICY_CATCH_UP:
+            return 0
+        missed = late // period
+        self.deadline = time.ticks_add(self.deadline, missed * period)
+        self.stats['dropped'] += missed
+        return missed
+
+    def _record_late(self, late):
+        if late > self.stats['late_max_us']:
+            self.stats['late_max_us'] = late
+        b = 0
+        v = late >> 10
+        while v and b < LATE_BUCKETS - 1:
+            v >>= 1
+            b += 1
+        self.late[b] += 1
+
+    def fps(self):
+        """ Frames per second needed for the interval """
+        return 1000 / self.interval if self.interval > 0 else 1000
+
+    def report(self):
+        """ Summary of the stats as a string """
+        stats = self.stats
+        frames = stats['frames'] or 1
+        return ('frames: {} dropped: {} render: {} us avg {} us max - write: {} us avg {} us max - '
+                'late: {} us max, histogram {}').format(
+            stats['frames'], stats['dropped'], stats['render_us'] // frames, stats['render_max_us'],
+            stats['write_us'] // frames, stats['write_max_us'], stats['late_max_us'], list(self.late))
+
+
+class FrameStats:
+    """ Timings and allocations of the last samples frames of an animation. Percentiles are worked out when
+        queried, recording a frame does not allocate.
+    """
+    FIELDS = ('update_us', 'write_us', 'frame_us', 'alloc')
+
+    def __init__(self, samples=STATS_SAMPLES):
+        """
+        :param samples: Number of frames kept
+        """
+        self.samples = samples
+        self.update_us = array('I', [0] * samples)
+        self.write_us = array('I', [0] * samples)
+        self.frame_us = array('I', [0] * samples)
+        # bytes allocated during each frame, 0 for frames with a collection on MicroPython
+        self.alloc = array('I', [0] * samples)
+        self.frames = 0
+        # collections during recorded frames
+        self.collections = 0
+        self._start = 0
+        self._mem = 0
+        self._gc = 0
+
+    def reset(self):
+        """ Forget every recorded frame """
+        self.frames = 0
+        self.collections = 0
+
+    def begin(self):
+        """ Mark the start of a frame """
+        if gc_collections is not None:
+            self._gc = gc_collections()
+        if reset_peak is not None:
+            reset_peak()
+        self._mem = mem_alloc()
+        self._start = time.ticks_us()
+
+    def elapsed(self):
+        """ Microseconds since begin() """
+        return time.ticks_diff(time.ticks_us(), self._start)
+
+    def end(self, update_us, write_us):
+        """ Record the frame started by begin() """
+        frame_us = self.elapsed()
+        used = mem_peak() - self._mem
+        i = self.frames % self.samples
+        self.update_us[i] = update_us
+        self.write_us[i] = write_us
+        self.frame_us[i] = frame_us
+        if gc_collections is not None:
+            self.collections += gc_collections() - self._gc
+        elif used < 0:
+            self.collections += 1
+        self.alloc[i] = used if used > 0 else 0
+        self.frames += 1
+
+    def summary(self, field):
+        """
+        Statistics of one field over the kept frames.
+
+        :param field: One of FIELDS
+        :return: (min, avg, max, p99) or None if no frames were recorded
+        """
+        n = min(self.frames, self.samples)
+        if not n:
+            return None
+        vals = sorted(getattr(self, field)[:n])
+        return vals[0], sum(vals) // n, vals[-1], vals[n * 99 // 100]
+
+    def report(self):
+        """ Summary of every field as a string """
+        parts = []
+        for field in FrameStats.FIELDS:
+            s = self.summary(field)
+            if s:
+                parts.append('{}: {} min {} avg {} max {} p99'.format(field, *s))
+        return '{} - frames: {} collections: {}'.format(' - '.join(parts) or 'no frames', self.frames,
+                                                       self.collections)
@@ -1,10 +1,16 @@
 import math
 import struct
 
+from array import array
 from random import getrandbits
 from neopixel import NeoPixel
 from micropython import const
 
+from . import color
+from . import kernels
+from . import lut
+from .kernels import BLEND_REPLACE, BLEND_ADD, BLEND_MULTIPLY, BLEND_ALPHA
+
 BITS_LOW = const(15)             # 00001111
 BITS_MID = const(60)             # 00111100
 BITS_HIGH = const(240)           # 11110000
@@ -18,6 +24,8 @@ FADE_OUT = const(2)
 FADE_IN_OUT = const(3)
 FILL_MODE_MULTI = const(4)
 FILL_MODE_SOLID = const(5)
+# byte order of buffers that hold colors as RGB(W), like ByteMap palettes
+ORDER_RGB = (0, 1, 2, 3)
 
 global_setings = {
     'brightness': 200,
@@ -31,6 +39,18 @@ global_state = {
     'audio_peak': None,
 }
 
+# wire buffers of indexed strips by (size, slot), every strip of a size expands into the same one just before writing
+_wire_bufs = {}
+
+
+def _wire_buf(size, slot=0):
+    """ Shared wire buffer, slot 0 holds the colors and slot 1 the repeated strip of center and interleave """
+    key = (size, slot)
+    buf = _wire_bufs.get(key)
+    if buf is None:
+        buf = _wire_bufs[key] = bytearray(size)
+    return buf
+
 
 def blend(col1, col2, pct=50):
     """
@@ -42,14 +62,16 @@ def blend(col1, col2, pct=50):
     :return: color tuple
     """
     if 0 <= pct <= 100:
-        result = [0, 0, 0]
-        for i in range(len(col1)):
-            result[i] = uint8(col1[i] + (col2[i] - col1[i]) / 100 * pct)
-        return tuple(result)
+        return tuple(uint8(col1[i] + (col2[i] - col1[i]) * pct // 100) for i in range(len(col1)))
     else:
         return col1
 
 
+def pct_frac(pct):
+    """ Convert a percentage to a fraction of 256 for the blend kernels """
+    return min(max(int(pct * 256) // 100, 0), 256)
+
+
 def step_inc(c1, c2, steps):
     """ Calculate step increment to blend colors in n steps """
     return tuple((c2[i] - c1[i]) / steps for i in range(len(c1)))
@@ -73,43 +95,29 @@ def mult8(a, b):
 
 
 def sin8(v):
-    """ Sin in 255 "degrees" """
+    """ Sin in 255 "degrees". See lut.sin8 for an integer version. """
     vr = v / 127.5 * math.pi
     return math.sin(vr)
 
 
 def cos8(v):
-    """ Cos in 255 "degrees" """
+    """ Cos in 255 "degrees". See lut.cos8 for an integer version. """
     vr = v / 127.5 * math.pi
     return math.cos(vr)
 
 
 def color_wheel(hue, val=255):
     """ 255 degree color wheel. HSV but all at full saturation. """
-    hue = uint8(hue) % 255
-    pa = hue % 85
-    ss = val / 85
-    ci = uint8(ss * pa)
-    cd = uint8(val) - ci
-    if hue < 85:
-        return cd, ci, 0
-    elif hue < 170:
-        return 0, cd, ci
-    else:
-        return ci, 0, cd
+    tbl = lut.wheel(uint8(val))
+    i = uint8(hue) * 3
+    return tbl[i], tbl[i + 1], tbl[i + 2]
 
 
 def heat_color(temp):
     """ Return loose approximation of black body radiation. """
-    # normalizing to 191 and using last 6 bits of that for heat_ramp was borrowed from FastLED
-    t191 = temp * 191 // 255
-    heat_ramp = (t191 & 63) << 2
-    if t191 < 64:
-        return heat_ramp, 0, 0
-    elif t191 < 128:
-        return 255, heat_ramp, 0
-    else:
-        return 255, 255, heat_ramp
+    tbl = lut.heat()
+    i = uint8(temp) * 3
+    return tbl[i], tbl[i + 1], tbl[i + 2]
 
 
 def rand32(pct):
@@ -156,6 +164,82 @@ def randrange(low, high):
     return high
 
 
+# bitwise combinations of random bytes that give an approximate percentage of ones, same as rand32
+_DENSITY = (
+    (6, (kernels.BOOL_AND, kernels.BOOL_AND, kernels.BOOL_AND)),
+    (19, (kernels.BOOL_AND, kernels.BOOL_AND)),
+    (31, (kernels.BOOL_AND,)),
+    (44, (kernels.BOOL_OR, kernels.BOOL_AND)),
+    (56, ()),
+    (69, (kernels.BOOL_AND, kernels.BOOL_OR)),
+    (81, (kernels.BOOL_OR,)),
+    (94, (kernels.BOOL_OR, kernels.BOOL_OR)),
+    (99, (kernels.BOOL_OR, kernels.BOOL_OR, kernels.BOOL_OR)),
+)
+
+
+class PRNG:
+    """ Small seedable xorshift32 random number generator. Use the same seed to replay an animation exactly.
+        fill_bytes() and fill_bits() fill a whole buffer in one call.
+    """
+
+    def __init__(self, seed=None):
+        self.state = array('I', [1])
+        self._sbuf = None
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """ Restart the sequence. A random seed is used if seed is None. """
+        if seed is None:
+            seed = getrandbits(32)
+        # xorshift gets stuck on 0
+        self.state[0] = (seed & 0xFFFFFFFF) or 0x9E3779B9
+
+    def getrandbits(self, k):
+        """ Random int with k bits (up to 32) """
+        if k <= 16:
+            return kernels.xorshift_bits(self.state, k) if k > 0 else 0
+        return (kernels.xorshift_bits(self.state, k - 16) << 16) | kernels.xorshift_bits(self.state, 16)
+
+    def randrange(self, low, high):
+        """ Random int from low up to but not including high """
+        diff = high - low
+        if diff <= 0:
+            raise ValueError('empty range')
+        # draw just enough bits and try again when the value is out of range, a modulo would favour low values
+        k = 0
+        while (diff - 1) >> k:
+            k += 1
+        v = self.getrandbits(k)
+        while v >= diff:
+            v = self.getrandbits(k)
+        return low + v
+
+    def fill_bytes(self, buf, start=0, end=None):
+        """ Fill buf with random bytes """
+        kernels.xorshift_fill(buf, start, len(buf) if end is None else end, self.state)
+
+    def fill_bits(self, buf, pct=50, start=0, end=None):
+        """ Fill buf with random bits where approximately pct percent are ones """
+        if end is None:
+            end = len(buf)
+        if pct < 1 or pct >= 100:
+            v = 255 if pct >= 100 else 0
+            for i in range(start, end):
+                buf[i] = v
+            return
+        for limit, ops in _DENSITY:
+            if pct <= limit:
+                break
+        self.fill_bytes(buf, start, end)
+        if ops:
+            if self._sbuf is None or len(self._sbuf) < end:
+                self._sbuf = bytearray(end)
+            for op in ops:
+                self.fill_bytes(self._sbuf, start, end)
+                kernels.bool_buf(buf, self._sbuf, start, end, op)
+
+
 def colval(val, bpp=3):
     """ allow the input of color values as ints (including hex) and None/0 for black """
     if not val:
@@ -174,12 +258,46 @@ def shift_bits(val, shift):
     return val
 
 
+def _fill_gradient(buf, start_pos, end_pos, col1, col2, bpp):
+    """ Write a gradient in fixed point straight into buf, colors are in buffer byte order """
+    steps = end_pos - start_pos
+    inc = array('i', [((col2[c] - col1[c]) << 16) // steps if steps else 0 for c in range(bpp)])
+    kernels.gradient(buf, start_pos * bpp, steps, col1, inc, bpp)
+    si = end_pos * bpp
+    buf[si:si + bpp] = col2
+
+
+def _fill_gen(buf, gen, start_pos, end_pos, direction, bpp, order):
+    """ Write colors from a generator straight into buf, order gives the buffer position of each channel """
+    fill = getattr(gen, 'fill', None)
+    if fill is not None:
+        # batch generator, one call for the whole range
+        fill(buf, start_pos, end_pos - start_pos + 1, bpp, order, direction < 0)
+        return
+    if direction > 0:
+        rng = range(start_pos, end_pos + 1)
+    else:
+        rng = range(end_pos, start_pos - 1, -1)
+    for i in rng:
+        col = next(gen)
+        if not isinstance(col, tuple):
+            col = colval(col, bpp)
+        j = i * bpp
+        for c in range(bpp):
+            buf[j + order[c]] = col[c]
+
+
 class BitMap:
     """ Helper class to keep track of metadata about our pixels as a bit in a bytearray
         The values automatically wrap around instead of throwing an index error.
     """
 
-    def __init__(self, n, pct=50):
+    def __init__(self, n, pct=50, prng=None):
+        """
+        :param n: Number of bits
+        :param pct: Approximate percent of ones when randomizing
+        :param prng: PRNG used by randomize(), random.getrandbits is used if not set
+        """
         self.n = n
         # number of 32-bit words
         self.wc = math.ceil(n / 32)
@@ -188,13 +306,14 @@ class BitMap:
         self.pct = pct
         self.buf = bytearray(self.wc * 4)
         self._po = 0
+        self.prng = prng
 
     def bit(self, idx, val=None):
         """ Get or set a single bit """
         if self._po:
             idx = (idx + self._po) % self.n
-        byte_idx = idx // 8
-        bit_idx = idx % 8
+        byte_idx = idx >> 3
+        bit_idx = idx & 7
         mask = 1 << bit_idx
         if val is None:
             return (self.buf[byte_idx] & mask) >> bit_idx
@@ -219,15 +338,105 @@ class BitMap:
     def scroll(self, steps):
         self._po = (self._po - steps) % self.n
 
+    def resolve(self):
+        """ Apply the scroll offset so bits are stored in order in buf. """
+        if not self._po:
+            return
+        buf = bytearray(len(self.buf))
+        for i in self.iter_bits():
+            buf[i >> 3] |= 1 << (i & 7)
+        self.buf = buf
+        self._po = 0
+
+    def popcount(self):
+        """ Number of bits set """
+        n = self.n
+        nb = n >> 3
+        c = kernels.popcount(self.buf, 0, nb)
+        if n & 7:
+            c += kernels.POP8[self.buf[nb] & ((1 << (n & 7)) - 1)]
+        return c
+
+    def iter_bits(self, val=1):
+        """ Yield the index of each bit equal to val in order. Empty bytes and words are skipped so the time taken
+            depends on the number of matching bits more than the size of the map.
+        """
+        buf = self.buf
+        n = self.n
+        po = self._po
+        flip = 0 if val else 255
+        # physical bits po to n-1 come first, then 0 to po-1
+        for start, end, adj in ((po, n, -po), (0, po, n - po)):
+            i = start
+            while i < end:
+                bi = i >> 3
+                if not i & 31 and i + 32 <= end and not (
+                        (buf[bi] ^ flip) | (buf[bi + 1] ^ flip) | (buf[bi + 2] ^ flip) | (buf[bi + 3] ^ flip)):
+                    i += 32
+                    continue
+                b = (buf[bi] ^ flip) >> (i & 7)
+                if not b:
+                    i = (bi + 1) << 3
+                    continue
+                if b & 1:
+                    yield i + adj
+                i += 1
+
+    def _bool(self, other, op):
+        if other is not None:
+            if other.n != self.n:
+                raise ValueError('BitMaps must be the same size')
+            if other._po != self._po:
+                self.resolve()
+                other.resolve()
+            src = other.buf
+        else:
+            src = self.buf
+        kernels.bool_buf(self.buf, src, 0, len(self.buf), op)
+
+    def bit_and(self, other):
+        """ Keep only bits that are also set in other """
+        self._bool(other, kernels.BOOL_AND)
+
+    def bit_or(self, other):
+        """ Set bits that are set in other """
+        self._bool(other, kernels.BOOL_OR)
+
+    def bit_xor(self, other):
+        """ Flip bits that are set in other """
+        self._bool(other, kernels.BOOL_XOR)
+
+    def bit_not(self):
+        """ Flip every bit """
+        self._bool(None, kernels.BOOL_NOT)
+
+    def shift_words(self, words):
+        """ Move bits toward higher indexes by whole 32 bit words, or lower if negative. Vacated bits are 0. """
+        self.resolve()
+        buf = self.buf
+        size = len(buf)
+        cut = min(abs(words) * 4, size)
+        if words > 0:
+            for i in range(size - 1, cut - 1, -1):
+                buf[i] = buf[i - cut]
+            for i in range(cut):
+                buf[i] = 0
+        elif words < 0:
+            for i in range(size - cut):
+                buf[i] = buf[i + cut]
+            for i in range(size - cut, size):
+                buf[i] = 0
+
     def randomize(self, pct=None):
         """ fill buffer with random 1s and 0s. Use pct to control the approx percent of 1s """
         self._po = 0
         if pct is None:
             pct = self.pct
-        buf = bytearray()
+        if self.prng is not None:
+            self.prng.fill_bits(self.buf, pct)
+            return
         for i in range(self.wc):
-            buf += struct.pack('I', rand32(pct))
-        self.buf = buf
+            struct.pack_into('I', self.buf, i * 4, rand32(pct))
 
     def repeat(self, val):
         """ fill buffer by repeating val """
@@ -279,13 +488,34 @@ class ByteMap:
         self.bpi = bpi
         self.buf = bytearray(n * bpi)
         self.order = order
+        # virtual rotation offset set by scroll(), resolved by resolve()
+        self._po = 0
+        self._sbuf = None
+
+    def _idx(self, key):
+        """ Convert item index to position in buffer """
+        if self._po:
+            key = (key + self._po) % self.n
+        return key * self.bpi
+
+    def resolve(self):
+        """ Apply the scroll offset so items are stored in order in buf. """
+        if not self._po:
+            return
+        size = self.n * self.bpi
+        if self._sbuf is None or len(self._sbuf) != len(self.buf):
+            self._sbuf = bytearray(len(self.buf))
+        kernels.rotate(self._sbuf, self.buf, 0, size, self._po * self.bpi)
+        self.buf, self._sbuf = self._sbuf, self.buf
+        self._po = 0
 
     def __setitem__(self, key, value):
         value = bytes(colval(value, self.bpi))
-        idx = key * self.bpi
         if 0 <= key < self.n:
+            idx = self._idx(key)
             self.buf[idx:idx + self.bpi] = value
         elif key == self.n:
+            self.resolve()
             self.buf += value
             self.n += 1
         else:
@@ -294,9 +524,9 @@ class ByteMap:
     def __getitem__(self, key):
         if isinstance(key, int):
             if 0 <= key < self.n:
-                si = key * self.bpi
+                si = self._idx(key)
             elif -self.n < key < 0:
-                si = (key + self.n) * self.bpi
+                si = self._idx(key + self.n)
             else:
                 raise IndexError('index out of range')
             if self.bpi > 1:
@@ -304,6 +534,7 @@ class ByteMap:
             else:
                 return self.buf[si]
         elif isinstance(key, slice):
+            self.resolve()
             si = (key.start if key.start else 0) * self.bpi
             ei = (key.stop if key.stop else self.n) * self.bpi
             if key.step and (key.step < -1 or key.step > 1):
@@ -314,92 +545,125 @@ class ByteMap:
 
     def get_ordered_item(self, key):
         # get item in proper order to write to led buffer
-        si = key * self.bpi
+        si = self._idx(key)
         return bytearray(self.buf[si + i] for i in self.order)
 
     def __len__(self):
         return self.n
 
     def append(self, val):
+        self.resolve()
         self.buf.append(val)
         self.n += 1
 
     def extend(self, vals):
+        self.resolve()
         self.buf.extend(vals)
         self.n = len(self.buf) // self.bpi
 
-    def add(self, val):
+    def _check_operand(self, val, op):
         if isinstance(val, (list, tuple)):
             if len(val) < self.bpi:
-                raise ValueError(
-                    'Length of value to add must match byte size.')
-            self.buf = bytearray([uint8(self.buf[i] + val[i % self.bpi])
-                                 for i in range(self.n * self.bpi)])
-        else:
-            self.buf = bytearray([uint8(v + val) for v in self.buf])
+                raise ValueError('Length of value to {} must match byte size.'.format(op))
+            # extra values are ignored, the kernels would step by the length of val
+            return val[:self.bpi]
+        if isinstance(val, (bytes, bytearray, memoryview)):
+            # per item values have to line up with the items
+            self.resolve()
+        return val
+
+    def add(self, val):
+        """ Saturating add of an int, per channel sequence or per item buffer """
+        kernels.add(self.buf, self._check_operand(val, 'add'), 0, self.n * self.bpi, self.bpi)
 
     def sub(self, val):
-        if isinstance(val, (list, tuple)):
-            if len(val) < self.bpi:
-                raise ValueError(
-                    'Length of value to sub must match byte size.')
-            self.buf = bytearray([uint8(self.buf[i] - val[i % self.bpi])
-                                 for i in range(self.n * self.bpi)])
-        else:
-            self.buf = bytearray([uint8(v - val) for v in self.buf])
+        """ Saturating subtract of an int, per channel sequence or per item buffer """
+        kernels.sub(self.buf, self._check_operand(val, 'sub'), 0, self.n * self.bpi, self.bpi)
 
     def mul(self, val):
-        if isinstance(val, (list, tuple)):
-            if len(val) < self.bpi:
-                raise ValueError(
-                    'Length of value to multiply must match byte size.')
-            self.buf = bytearray([uint8(self.buf[i] * val[i % self.bpi])
-                                 for i in range(self.n * self.bpi)])
-        else:
-            self.buf = bytearray([uint8(v * val) for v in self.buf])
+        """ Saturating multiply by a number, per channel sequence or per item buffer of fractions of 256 """
+        kernels.scale(self.buf, self._check_operand(val, 'multiply'), 0, self.n * self.bpi, self.bpi)
 
     def div(self, val):
-        if isinstance(val, (list, tuple)):
-            if len(val) < self.bpi:
-                raise ValueError(
-                    'Length of value to divide must match byte size.')
-            self.buf = bytearray(
-                [uint8(self.buf[i] // val[i % self.bpi]) for i in range(self.n * self.bpi)])
-        else:
-            self.buf = bytearray([uint8(v // val) for v in self.buf])
+        """ Divide by a number, per channel sequence or per item buffer """
+        kernels.div(self.buf, self._check_operand(val, 'divide'), 0, self.n * self.bpi, self.bpi)
 
     def scroll(self, step=1):
-        cut = self.bpi * -step
-        self.buf = self.buf[cut:] + self.buf[:cut]
+        """ Rotate items by changing the offset, the buffer itself is not touched. """
+        if self.n:
+            self._po = (self._po - step) % self.n
 
     def fill(self, val, start_pos=0, end_pos=None):
-        val = colval(val, self.bpi)
         if end_pos is None or end_pos >= self.n:
             end_pos = self.n - 1
-        for i in range(start_pos, end_pos + 1):
-            self[i] = val
+        if start_pos > end_pos:
+            return
+        self.resolve()
+        kernels.fill_pattern(self.buf, start_pos * self.bpi, (end_pos + 1) * self.bpi, bytes(colval(val, self.bpi)))
 
     def fill_gradient(self, v1, v2, start_pos=0, end_pos=None):
         if end_pos is None or end_pos >= self.n:
             end_pos = self.n - 1
-        steps = end_pos - start_pos
-        v1 = colval(v1, self.bpi)
-        v2 = colval(v2, self.bpi)
-        inc = step_inc(v1, v2, steps)
-        for i in range(steps):
-            val = tuple(uint8(v1[n] + inc[n] * i) for n in range(self.bpi))
-            self[start_pos + i] = val
-        self[end_pos] = v2
+        if start_pos > end_pos:
+            return
+        self.resolve()
+        _fill_gradient(self.buf, start_pos, end_pos, bytes(colval(v1, self.bpi)), bytes(colval(v2, self.bpi)),
+                       self.bpi)
 
     def fill_gen(self, gen, start_pos=0, end_pos=None, direction=1):
         if end_pos is None or end_pos >= self.n:
             end_pos = self.n - 1
-        if direction > 0:
-            for i in range(start_pos, end_pos + 1):
-                self[i] = next(gen)
+        self.resolve()
+        _fill_gen(self.buf, gen, start_pos, end_pos, direction, self.bpi, ORDER_RGB)
+
+
+class Layer:
+    """ Overlay composited over a TrickLED at write(), see TrickLED.add_layer().
+        Colors are stored in the byte order of the strip.
+    """
+
+    def __init__(self, n, bpp=3, mode=BLEND_ALPHA, opacity=0, order=None):
+        """
+        :param n: Number of pixels
+        :param bpp: Bytes per pixel
+        :param mode: One of the BLEND constants
+        :param opacity: 0-255, 0 hides the layer
+        :param order: Byte order of the strip (NeoPixel.ORDER)
+        """
+        self.n = n
+        self.bpp = bpp
+        self.mode = mode
+        self.opacity = opacity
+        self.ORDER = order or (0, 1, 2, 3)
+        self.buf = bytearray(n * bpp)
+        # one byte per pixel, only used by BLEND_ALPHA
+        self.alpha = bytearray(n) if mode == BLEND_ALPHA else None
+
+    def _color(self, color):
+        col = colval(color, self.bpp)
+        return bytes(col[self.ORDER[i]] for i in range(self.bpp))
+
+    def __setitem__(self, i, color):
+        if 0 <= i < self.n:
+            off = i * self.bpp
+            self.buf[off:off + self.bpp] = self._color(color)
         else:
-            for i in range(end_pos, start_pos - 1, -1):
-                self[i] = next(gen)
+            raise IndexError('Index out of range')
+
+    def fill(self, color, alpha=255, start_pos=0, end_pos=None):
+        """
+        Fill the layer with a color
+
+        :param color: Color to fill
+        :param alpha: Alpha for BLEND_ALPHA layers
+        :param start_pos: Start position, defaults to beginning of layer
+        :param end_pos: End position, defaults to end of layer
+        """
+        if end_pos is None or end_pos >= self.n:
+            end_pos = self.n - 1
+        kernels.fill_pattern(self.buf, start_pos * self.bpp, (end_pos + 1) * self.bpp, self._color(color))
+        if self.alpha is not None:
+            self.alpha[start_pos:end_pos + 1] = bytes((alpha,)) * (end_pos + 1 - start_pos)
 
 
 class TrickLED(NeoPixel):
@@ -409,26 +673,100 @@ class TrickLED(NeoPixel):
     REPEAT_MODE_STRIPE = const(1)
     # repeat section alternating backward and forward 0-n, n-0, 0-n
     REPEAT_MODE_MIRROR = const(2)
-
-    def __init__(self, pin, n, repeat_n=None, repeat_mode=None, **kwargs):
+    # repeat section backward after the first 0-n, n-0, n-0
+    REPEAT_MODE_REVERSE = const(3)
+    # section starts at the center and goes out to both ends n-0, 0-n. For crossguards.
+    REPEAT_MODE_CENTER = const(4)
+    # each pixel of the section is repeated in place 0, 0, 1, 1, .. n, n. For interleaved strips.
+    REPEAT_MODE_INTERLEAVE = const(5)
+
+    def __init__(self, pin, n, repeat_n=None, repeat_mode=None, buf=None, **kwargs):
         """
-        :param pin: Data pin
+        :param pin: Data pin, None for an off-screen strip that is drawn into but never written
         :param n: number of pixels
         :param repeat_n: If set, the first n pixels will be repeated across the rest of the strip 
-        :param repeat_mode: Controls if section is repeated or mirrored (alternating between forward and reversed)
+        :param repeat_mode: Controls how the section is repeated, one of the REPEAT_MODE constants
+        :param buf: Use this buffer (usually a memoryview into a FrameBuffer) instead of allocating one, it is kept in
+            indexed mode
         :param kwargs: bpp, timing
         """
-        super().__init__(pin, n, **kwargs)
+        # in indexed mode give up buf for a wire buffer shared with the other indexed strips of the same size,
+        # off-screen strips are never written so they keep their own
+        self.share_buf = buf is None and pin is not None
+        if pin is None:
+            # the NeoPixel driver would set up the pin, an off-screen strip only needs the buffer
+            self.pin = None
+            self.n = n
+            self.bpp = kwargs.get('bpp', 3)
+            if buf is None:
+                buf = bytearray(n * self.bpp)
+            elif len(buf) != n * self.bpp:
+                raise ValueError('buf must be {} bytes'.format(n * self.bpp))
+            self.buf = buf
+        elif buf is None:
+            super().__init__(pin, n, **kwargs)
+        else:
+            # NeoPixel always allocates n * bpp bytes, give it no pixels then take over the shared buffer
+            super().__init__(pin, 0, **kwargs)
+            if len(buf) != n * self.bpp:
+                raise ValueError('buf must be {} bytes'.format(n * self.bpp))
+            self.n = n
+            self.buf = buf
+        self._shared = False
         self.repeat_n = repeat_n
         self.repeat_mode = repeat_mode if repeat_mode else TrickLED.REPEAT_MODE_STRIPE
+        # precomputed copy plan for repeat_n, rebuilt when n, repeat_n or repeat_mode change
+        self._plan = None
+        self._plan_key = None
+        self._plan_scratch = False
+        self._rbuf = None
+        # skip writes when nothing changed, shorten them to the last changed pixel when partial_writes is set
+        self.track_changes = True
+        self.partial_writes = True
+        self.write_stats = {'writes': 0, 'skipped': 0, 'shortened': 0}
+        self._last = None
+        # virtual rotation offset set by scroll(), resolved at write()
+        self._po = 0
+        self._sbuf = None
+        # output stage, see set_output()
+        self._brightness = 255
+        self._gamma = None
+        self._correction = None
+        self._out_table = None
+        self._wbuf = None
+        # indexed color mode, see set_indexed()
+        self.index = None
+        self.index_shift = 0
+        self._ipal = None
+        self._ipal_n = 0
+        self._opal = None
+        # copy of the index at the last write and what else changes the colors, for track_changes in indexed mode
+        self._ilast = None
+        self._ipo = 0
+        self._ishift = 0
+        self._idirty = True
+        # overlays composited at write(), see add_layer()
+        self.layers = []
+        self._cbuf = None
+
+    def _idx(self, i):
+        """ Convert pixel index to position in buffer applying the scroll offset """
+        if self._po:
+            span = self.repeat_n or self.n
+            if i < span:
+                i = (i + self._po) % span
+        return i
 
     def __setitem__(self, i, val):
         if 0 <= i < self.n:
             val = colval(val, self.bpp)
-            super().__setitem__(i, val)
+            super().__setitem__(self._idx(i), val)
         else:
             raise IndexError('Assignment index out of range')
 
+    def __getitem__(self, i):
+        return super().__getitem__(self._idx(i))
+
     def _rgb_to_order(self, col):
         """ Convert RGB value to byte order of LEDs """
         return [col[self.ORDER[i]] for i in range(self.bpp)]
@@ -438,8 +776,21 @@ class TrickLED(NeoPixel):
 
         :param step: Number and direction to shift pixels
         """
-        cut = self.bpp * -step
-        self.buf = self.buf[cut:] + self.buf[:cut]
+        if self.index is not None:
+            self.index.scroll(step)
+            return
+        self._po = (self._po - step) % (self.repeat_n or self.n)
+
+    def resolve(self):
+        """ Apply the scroll offset so pixels are stored in order in buf. """
+        if not self._po:
+            return
+        span = (self.repeat_n or self.n) * self.bpp
+        if self._sbuf is None or len(self._sbuf) < span:
+            self._sbuf = bytearray(span)
+        kernels.rotate(self._sbuf, self.buf, 0, span, self._po % (self.repeat_n or self.n) * self.bpp)
+        kernels.rotate(self.buf, self._sbuf, 0, span, 0)
+        self._po = 0
 
     def fill_solid(self, color, start_pos=0, end_pos=None):
         """
@@ -449,10 +800,16 @@ class TrickLED(NeoPixel):
         :param start_pos: Start position, defaults to beginning of strip
         :param end_pos: End position, defaults to end of strip
         """
+        span = self.repeat_n or self.n
         if end_pos is None or end_pos >= self.n:
-            end_pos = (self.repeat_n or self.n) - 1
-        for i in range(start_pos, end_pos + 1):
-            self[i] = color
+            end_pos = span - 1
+        if start_pos > end_pos:
+            return
+        if start_pos > 0 or end_pos < span - 1:
+            # a full span fill looks the same at any scroll offset
+            self.resolve()
+        pat = bytes(self._rgb_to_order(colval(color, self.bpp)))
+        kernels.fill_pattern(self.buf, start_pos * self.bpp, (end_pos + 1) * self.bpp, pat)
 
     def fill_gradient(self, col1, col2, start_pos=0, end_pos=None):
         """
@@ -465,14 +822,12 @@ class TrickLED(NeoPixel):
         """
         if end_pos is None or end_pos >= self.n:
             end_pos = (self.repeat_n or self.n) - 1
-        steps = end_pos - start_pos
-        col1 = colval(col1, self.bpp)
-        col2 = colval(col2, self.bpp)
-        inc = step_inc(col1, col2, steps)
-        for i in range(steps):
-            col = tuple(uint8(col1[n] + inc[n] * i) for n in range(len(col1)))
-            self[start_pos + i] = col
-        self[end_pos] = col2
+        if start_pos > end_pos:
+            return
+        self.resolve()
+        col1 = bytes(self._rgb_to_order(colval(col1, self.bpp)))
+        col2 = bytes(self._rgb_to_order(colval(col2, self.bpp)))
+        _fill_gradient(self.buf, start_pos, end_pos, col1, col2, self.bpp)
 
     def fill_gen(self, gen, start_pos=0, end_pos=None, direction=1):
         """
@@ -484,12 +839,37 @@ class TrickLED(NeoPixel):
         """
         if end_pos is None or end_pos >= self.n:
             end_pos = (self.repeat_n or self.n) - 1
-        if direction > 0:
-            for i in range(start_pos, end_pos + 1):
-                self[i] = next(gen)
-        else:
-            for i in range(end_pos, start_pos - 1, -1):
-                self[i] = next(gen)
+        self.resolve()
+        _fill_gen(self.buf, gen, start_pos, end_pos, direction, self.bpp, self.ORDER)
+
+    def fill_hsv(self, hues, vals=255, sat=255, shift=0, start_pos=0):
+        """
+        Fill strip from a buffer of hues in one pass. See color.fill_hsv.
+
+        :param hues: Buffer with one hue (0-255 around the wheel) per pixel
+        :param vals: Buffer with one value per pixel or a single value for every pixel
+        :param sat: Saturation for every pixel
+        :param shift: Added to every hue, change it each frame to rotate the colors
+        :param start_pos: Start position, defaults to beginning of strip
+        """
+        self.resolve()
+        color.fill_hsv(self.buf, hues, vals, sat, shift, start_pos, (self.repeat_n or self.n) - start_pos,
+                       self.ORDER, self.bpp)
+
+    def fill_masked(self, mask, palette, background=None):
+        """
+        Set the pixels where a bit is set in mask to colors from palette. The palette repeats along the strip, so
+        pixel i gets palette[i % len(palette)]. Only set bits are visited.
+
+        :param mask: BitMap
+        :param palette: ByteMap or list of colors
+        :param background: Color for pixels whose bit is not set, None leaves them as they are
+        """
+        if background is not None:
+            self.fill_solid(background, 0, mask.n - 1)
+        pl = len(palette)
+        for i in mask.iter_bits():
+            self[i] = palette[i % pl]
 
     def blend_to_color(self, color=0, pct=50, start_pos=0, end_pos=None):
         """
@@ -500,114 +880,442 @@ class TrickLED(NeoPixel):
         :param start_pos: Start position, defaults to beginning of strip
         :param end_pos: End position
         """
-        color = colval(color, self.bpp)
-        last_col = (0,) * self.bpp
-        blend_col = (0,) * self.bpp
+        color = bytes(self._rgb_to_order(colval(color, self.bpp)))
         if end_pos is None:
             end_pos = (self.repeat_n or self.n) - 1
-        for i in range(start_pos, end_pos + 1):
-            if self[i] == blend_col:
-                continue
-            elif self[i] == last_col:
-                self[i] = blend_col
-            else:
-                last_col = self[i]
-                blend_col = blend(self[i], color, pct)
-                self[i] = blend_col
+        self.resolve()
+        kernels.blend_color(self.buf, start_pos * self.bpp, (end_pos + 1) * self.bpp, color, self.bpp,
+                            pct_frac(pct))
+
+    def blend_to_buf(self, src, pct=50, start_pos=0, end_pos=None):
+        """
+        Blend each pixel with the pixel at the same position in another buffer, like the buf of another strip.
+
+        :param src: Buffer in the byte order of this strip
+        :param pct: Percentage of src vs existing color
+        :param start_pos: Start position, defaults to beginning of strip
+        :param end_pos: End position
+        """
+        if end_pos is None:
+            end_pos = (self.repeat_n or self.n) - 1
+        self.resolve()
+        kernels.blend_buf(self.buf, start_pos * self.bpp, (end_pos + 1) * self.bpp, src, pct_frac(pct))
+
+    def _operand(self, val, op):
+        """ Check operand and convert per channel values from RGB to byte order of LEDs """
+        if isinstance(val, (list, tuple)):
+            if len(val) < self.bpp:
+                raise ValueError('Length of value to {} must match bpp'.format(op))
+            return self._rgb_to_order(val)
+        if isinstance(val, (bytes, bytearray, memoryview)):
+            # per pixel values have to line up with the pixels
+            self.resolve()
+        return val
 
     def add(self, val):
-        bpp = self.bpp
+        """ Saturating add of an int, RGB tuple or per pixel buffer """
         mi = self.repeat_n or self.n
-        if isinstance(val, (list, tuple)):
-            if len(val) < bpp:
-                raise ValueError('Length of value to add must match bpp')
-            # convert RGB to string byte order
-            val = self._rgb_to_order(val)
-            self.buf = bytearray([uint8(self.buf[i] + val[i % bpp])
-                                 for i in range(mi * bpp)])
-        else:
-            self.buf = bytearray([uint8(self.buf[i] + val)
-                                 for i in range(mi * bpp)])
+        kernels.add(self.buf, self._operand(val, 'add'), 0, mi * self.bpp, self.bpp)
 
     def sub(self, val):
-        bpp = self.bpp
+        """ Saturating subtract of an int, RGB tuple or per pixel buffer """
         mi = self.repeat_n or self.n
-        if isinstance(val, (list, tuple)):
-            if len(val) < bpp:
-                raise ValueError('Length of value to subtract must match bpp')
-            # convert RGB to string byte order
-            val = self._rgb_to_order(val)
-            self.buf = bytearray([uint8(self.buf[i] - val[i % bpp])
-                                 for i in range(mi * bpp)])
-        else:
-            self.buf = bytearray([uint8(self.buf[i] - val)
-                                 for i in range(mi * bpp)])
+        kernels.sub(self.buf, self._operand(val, 'subtract'), 0, mi * self.bpp, self.bpp)
 
     def mul(self, val):
-        bpp = self.bpp
+        """ Saturating multiply by a number, RGB tuple or per pixel buffer of fractions of 256 """
         mi = self.repeat_n or self.n
-        if isinstance(val, (list, tuple)):
-            if len(val) < bpp:
-                raise ValueError('Length of value to multiply must match bpp')
-            # convert RGB to string byte order
-            val = self._rgb_to_order(val)
-            self.buf = bytearray([uint8(self.buf[i] * val[i % bpp])
-                                 for i in range(mi * bpp)])
-        else:
-            self.buf = bytearray([uint8(self.buf[i] * val)
-                                 for i in range(mi * bpp)])
+        kernels.scale(self.buf, self._operand(val, 'multiply'), 0, mi * self.bpp, self.bpp)
 
     def div(self, val):
-        bpp = self.bpp
+        """ Divide by a number, RGB tuple or per pixel buffer """
         mi = self.repeat_n or self.n
-        if isinstance(val, (list, tuple)):
-            if len(val) < bpp:
-                raise ValueError('Length of value to multiply must match bpp')
-            # convert RGB to string byte order
-            val = self._rgb_to_order(val)
-            self.buf = bytearray([uint8(self.buf[i] / val[i % bpp])
-                                 for i in range(mi * bpp)])
+        kernels.div(self.buf, self._operand(val, 'divide'), 0, mi * self.bpp, self.bpp)
+
+    def _repeat_map(self):
+        """ Section pixel shown at each position of the strip """
+        n = self.n
+        rn = self.repeat_n
+        mode = self.repeat_mode
+        if mode == TrickLED.REPEAT_MODE_CENTER:
+            c = n // 2
+            return [(i - c if i >= c else c - 1 - i) % rn for i in range(n)]
+        if mode == TrickLED.REPEAT_MODE_INTERLEAVE:
+            ways = -(-n // rn)
+            return [i // ways for i in range(n)]
+        src = []
+        for i in range(n):
+            sect, k = divmod(i, rn)
+            if sect and (mode == TrickLED.REPEAT_MODE_REVERSE or
+                         (mode == TrickLED.REPEAT_MODE_MIRROR and sect & 1)):
+                k = rn - 1 - k
+            src.append(k)
+        return src
+
+    def _build_plan(self):
+        """ Compress the repeat map to runs of pixels that can be block copied """
+        src = self._repeat_map()
+        # center and interleave move the section itself, so they are laid out in a wire buffer of their own and the
+        # section in buf is left for the animation
+        scratch = self.repeat_mode in (TrickLED.REPEAT_MODE_CENTER, TrickLED.REPEAT_MODE_INTERLEAVE)
+        start = 0 if scratch else self.repeat_n
+        runs = []
+        i = start
+        while i < self.n:
+            step = 1
+            if i + 1 < self.n and src[i + 1] == src[i] - 1:
+                step = -1
+            j = i + 1
+            while j < self.n and src[j] == src[j - 1] + step:
+                j += 1
+            runs.extend((i, src[i], j - i, 1 if step > 0 else 0))
+            i = j
+        self._plan = array('i', runs)
+        self._plan_scratch = scratch
+        self._plan_key = (self.n, self.repeat_n, self.repeat_mode)
+
+    def _repeat(self):
+        """
+        Copy the first repeat_n pixels over the rest of the strip using the precomputed plan. buf[0:repeat_n] is
+        never changed.
+
+        :return: Buffer holding the whole strip, buf or the wire buffer of center and interleave
+        """
+        if self._plan_key != (self.n, self.repeat_n, self.repeat_mode):
+            self._build_plan()
+        if not self._plan_scratch:
+            kernels.copy_runs(self.buf, self.buf, self._plan, self.bpp)
+            return self.buf
+        size = len(self.buf)
+        if self._shared:
+            rbuf = _wire_buf(size, 1)
         else:
-            self.buf = bytearray([uint8(self.buf[i] / val)
-                                 for i in range(mi * bpp)])
-
-    def _repeat_stripe(self, n=None):
-        """
-        Copy the first n pixels and repeat them over the rest of the strip
-
-        :param n: Number of pixels to copy (not the zero-based index!)
-        """
-        if n is None:
-            n = self.repeat_n
-        loc = jump = n * self.bpp
-        end = self.n * self.bpp
-        section = self.buf[0:jump]
-        while loc + jump <= end:
-            self.buf[loc:loc + jump] = section
-            loc += jump
-        if loc < end:
-            self.buf[loc:end] = section[:(end - loc)]
-
-    def _repeat_mirror(self, n=None):
-        """ Copy the first n pixels and repeat them alternating directions """
-        if n is None:
-            n = self.repeat_n
-        rl = n - 1
-        direction = -1
-        setitem = super().__setitem__
-        for i in range(n, self.n):
-            setitem(i, self[rl])
-            if 0 < rl < n:
-                rl += 1 * direction
-            elif rl == 0:
-                direction = 1
-            else:
-                direction = -1
-
-    def write(self):
-        if self.repeat_n:
-            if self.repeat_mode == TrickLED.REPEAT_MODE_STRIPE:
-                self._repeat_stripe()
-            elif self.repeat_mode == TrickLED.REPEAT_MODE_MIRROR:
-                self._repeat_mirror()
-        super().write()
+            rbuf = self._rbuf
+            if rbuf is None or len(rbuf) != size:
+                self._rbuf = rbuf = bytearray(size)
+        kernels.copy_runs(rbuf, self.buf, self._plan, self.bpp)
+        return rbuf
+
+    def set_indexed(self, palette, index=None, shift=0):
+        """
+        Switch to indexed color mode. Animations store one byte per pixel in index and write() expands them to colors
+        with the palette. Colors set directly on the strip are overwritten at write() while this mode is on.
+
+        Unless share_buf is cleared (or the strip was given its buf) the strip lets go of its own pixel buffer and
+        expands into a wire buffer shared by every indexed strip of the same size, changes are tracked on the index.
+        A strip then holds about a third of the bytes it does in RGB. buf only holds this strip's colors right after
+        render() or write().
+
+        :param palette: ByteMap of RGB colors, up to 256
+        :param index: ByteMap with bpi=1 and one item per calculated pixel, created if not given
+        :param shift: Bits to shift index values right, to map 256 values to a palette of 128, 64 or 32 colors
+        :return: index ByteMap
+        """
+        n = self.repeat_n or self.n
+        if index is None:
+            index = ByteMap(n, bpi=1)
+        elif index.bpi != 1 or index.n != n:
+            raise ValueError('index must have bpi=1 and {} items'.format(n))
+        self.index = index
+        self.index_shift = shift
+        self._po = 0
+        if self.share_buf and not self._shared:
+            self.buf = _wire_buf(len(self.buf))
+            self._shared = True
+            self._rbuf = None
+        # changes are tracked on the index instead
+        self._last = None
+        self._idirty = True
+        self.set_palette(palette)
+        return index
+
+    def set_palette(self, palette):
+        """ Convert palette to the byte order of the strip. Cheap enough to swap palettes while playing. """
+        bpp = self.bpp
+        order = self.ORDER
+        pn = len(palette)
+        if self._ipal is None or len(self._ipal) != max(pn, 1) * bpp:
+            self._ipal = bytearray(max(pn, 1) * bpp)
+        ip = self._ipal
+        for k in range(pn):
+            col = palette[k]
+            off = k * bpp
+            for j in range(min(len(col), bpp)):
+                ip[off + order[j]] = col[j]
+        self._ipal_n = pn
+        self._opal = None
+        self._idirty = True
+
+    def clear_indexed(self):
+        """ Leave indexed color mode. A strip that shared its buffer gets one of its own holding the last colors. """
+        if self._shared:
+            if self.index is not None:
+                self._expand()
+            self.buf = bytearray(self.buf)
+            self._shared = False
+        self.index = None
+        self._ipal = None
+        self._opal = None
+        self._ilast = None
+
+    def _expand(self, mapped=False):
+        """ Expand the index to colors in buf, with mapped through a palette that went through the output stage """
+        pal = self._ipal
+        if mapped:
+            if self._opal is None:
+                self._opal = bytearray(len(pal))
+                kernels.map_channels(self._opal, pal, 0, len(pal), self._out_table, self.bpp)
+            pal = self._opal
+        idx = self.index
+        kernels.expand(self.buf, idx.buf, idx.n, idx._po, pal, max(self._ipal_n, 1), self.bpp, self.index_shift)
+
+    def render(self):
+        """ Bring the calculated pixels in buf up to date: expand the index in indexed mode, otherwise apply the
+            scroll offset. Use it to read the pixels of a strip that is never written, the output stage is not applied.
+        """
+        if self.index is not None:
+            self._expand()
+        else:
+            self.resolve()
+
+    def set_output(self, brightness=255, gamma=None, correction=None):
+        """
+        Enable the output stage. Pixels are stored at full scale and mapped through one 256 byte table per channel
+        when written, so changing the brightness does not require the animation to render again.
+
+        :param brightness: Global brightness 0-255
+        :param gamma: Gamma correction exponent, 2.2 - 2.8 is typical. None for linear.
+        :param correction: Per channel color correction / white balance as an RGB(W) tuple, 255 is unchanged.
+        """
+        self._brightness = uint8(brightness)
+        self._gamma = gamma
+        self._correction = colval(correction, self.bpp) if correction else None
+        if self._wbuf is None or len(self._wbuf) != len(self.buf):
+            self._wbuf = bytearray(len(self.buf))
+        self._build_output_table()
+
+    def clear_output(self):
+        """ Disable the output stage and write the buffer as is. """
+        self._out_table = None
+        self._wbuf = None
+        self._idirty = True
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, val):
+        """ Set brightness of the output stage, enabling it if needed. Only the tables are rebuilt. """
+        if self._out_table is None:
+            self.set_output(val)
+        else:
+            self._brightness = uint8(val)
+            self._build_output_table()
+
+    def _build_output_table(self):
+        bpp = self.bpp
+        tbl = self._out_table
+        if tbl is None or len(tbl) != bpp << 8:
+            tbl = bytearray(bpp << 8)
+        gamma = lut.gamma(self._gamma) if self._gamma else None
+        corr = self._correction or (255,) * bpp
+        for c in range(bpp):
+            # table c is for byte c of each pixel, the channel stored there depends on the color order
+            scale = self._brightness * corr[self.ORDER.index(c)]
+            off = c << 8
+            for v in range(256):
+                g = gamma[v] if gamma else v
+                tbl[off + v] = (g * scale + 32512) // 65025
+        self._out_table = tbl
+        self._opal = None
+        self._idirty = True
+
+    def add_layer(self, mode=BLEND_ALPHA, opacity=0):
+        """
+        Add an overlay that is composited over the whole strip at write(). Layers are applied in the order they were
+        added and never change buf, so the animation underneath keeps running. Layers with 0 opacity are skipped.
+
+        :param mode: BLEND_REPLACE, BLEND_ADD, BLEND_MULTIPLY or BLEND_ALPHA
+        :param opacity: 0-255
+        :return: Layer
+        """
+        layer = Layer(self.n, self.bpp, mode, opacity, self.ORDER)
+        self.layers.append(layer)
+        if self._cbuf is None:
+            self._cbuf = bytearray(len(self.buf))
+        return layer
+
+    def remove_layer(self, layer):
+        self.layers.remove(layer)
+
+    def _layers_visible(self):
+        for layer in self.layers:
+            if layer.opacity:
+                return True
+        return False
+
+    def _composite(self, src):
+        """ Composite the visible layers over src into the scratch buffer, returns src if none are visible """
+        out = src
+        size = len(src)
+        for layer in self.layers:
+            opacity = layer.opacity
+            if opacity:
+                if out is src:
+                    out = self._cbuf
+                    kernels.rotate(out, src, 0, size, 0)
+                kernels.blend_layer(out, layer.buf, layer.alpha or layer.buf, 0, size, layer.mode,
+                                    opacity + (opacity >> 7), self.bpp)
+        return out
+
+    def _index_end(self, force):
+        """ Wire bytes of an indexed strip that can have changed since the last write, 0 if none did """
+        idx = self.index
+        size = len(idx.buf)
+        last = self._ilast
+        if last is None or len(last) != size:
+            self._ilast = last = bytearray(size)
+            force = True
+        if self._idirty or idx._po != self._ipo or self.index_shift != self._ishift:
+            force = True
+        end = size
+        if not force:
+            end = kernels.last_diff(idx.buf, last, size)
+            if end == 0:
+                return 0
+        kernels.rotate(last, idx.buf, 0, size, 0)
+        self._ipo = idx._po
+        self._ishift = self.index_shift
+        self._idirty = False
+        # index positions are wire positions unless the index is scrolled or repeated
+        if end < size and self.partial_writes and not idx._po and not self.repeat_n:
+            return end * self.bpp
+        return len(self.buf)
+
+    def write(self, force=False):
+        """
+        Write the pixels to the strip. If track_changes is set the write is skipped when nothing changed since the
+        last write and, with partial_writes, stops after the last changed pixel. Counts are kept in write_stats.
+        Indexed strips compare the index, so unchanged frames are not even expanded.
+
+        :param force: Write the whole strip even if nothing changed
+        """
+        visible = self._layers_visible()
+        stats = self.write_stats
+        end = None
+        if self.index is not None and self.track_changes:
+            end = self._index_end(force or visible)
+            # layers change without the index, the frame after them has to be written to clear them
+            self._idirty = visible
+            if end == 0:
+                stats['skipped'] += 1
+                return
+        # an indexed strip runs its palette through the output stage once instead of every pixel every frame, unless
+        # layers have to be composited over the colors before the output stage
+        mapped = self.index is not None and self._out_table is not None and not visible
+        if self.index is not None:
+            self._expand(mapped)
+        else:
+            self.resolve()
+        wire = self._repeat() if self.repeat_n else self.buf
+        if self.layers:
+            wire = self._composite(wire)
+        if self._out_table is not None and not mapped:
+            kernels.map_channels(self._wbuf, wire, 0, len(wire), self._out_table, self.bpp)
+            wire = self._wbuf
+        size = len(wire)
+        if end is None:
+            end = size
+            if self.track_changes:
+                last = self._last
+                if last is None or len(last) != size:
+                    self._last = last = bytearray(size)
+                    force = True
+                if not force:
+                    end = kernels.last_diff(wire, last, size)
+                    if end == 0:
+                        stats['skipped'] += 1
+                        return
+                    if self.partial_writes:
+                        end = -(-end // self.bpp) * self.bpp
+                    else:
+                        end = size
+                kernels.rotate(last, wire, 0, end, 0)
+        buf = self.buf
+        self.buf = wire if end == size else memoryview(wire)[:end]
+        try:
+            super().write()
+        finally:
+            self.buf = buf
+        stats['writes'] += 1
+        if end < size:
+            stats['shortened'] += 1
+
+
+class FrameBuffer:
+    """ One contiguous buffer behind several strips. Each strip is a TrickLED whose buf is a memoryview into the
+        shared buffer, so effects can span strips without copying.
+    """
+
+    def __init__(self, strips, bpp=3, **kwargs):
+        """
+        :param strips: Sequence of (pin, n) for each strip in the order they are stored
+        :param bpp: Bytes per pixel, the same for every strip
+        :param kwargs: Passed on to each TrickLED (repeat_n, repeat_mode, timing)
+        """
+        self.bpp = bpp
+        self.n = 0
+        for pin, n in strips:
+            self.n += n
+        self.buf = bytearray(self.n * bpp)
+        mv = memoryview(self.buf)
+        self.views = []
+        self.offsets = []
+        pos = 0
+        for pin, n in strips:
+            self.offsets.append(pos)
+            self.views.append(TrickLED(pin, n, bpp=bpp, buf=mv[pos * bpp:(pos + n) * bpp], **kwargs))
+            pos += n
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, i):
+        return self.views[i]
+
+    def region(self, first, last=None):
+        """
+        Memoryview over the pixels of strips first to last (inclusive), for effects that span strips.
+        Scroll offsets are not applied, call resolve() on the strips first if they have been scrolled.
+        """
+        if last is None:
+            last = first
+        start = self.offsets[first] * self.bpp
+        end = (self.offsets[last] + self.views[last].n) * self.bpp
+        return memoryview(self.buf)[start:end]
+
+    def fill(self, color):
+        """ Fill every strip with color """
+        for v in self.views:
+            v.fill_solid(color)
+
+    def resolve(self):
+        for v in self.views:
+            v.resolve()
+
+    def write(self, force=False):
+        """ Write every strip back to back. Strips that did not change are skipped. """
+        for v in self.views:
+            v.write(force)
+
+    def show(self, *renderers):
+        """
+        Render one frame then write every strip.
+
+        :param renderers: Callables run in order before writing, usually the update method of the animation on
+            each strip
+        """
+        for r in renderers:
+            r()
+        self.write()
@@ -0,0 +1,50 @@
+"""
+Bake an animation to a frame file for animations.FramePlayer.
+
+On the board:   import bake; bake.bake_animation('Fire', 600, '/sd/fonts/kylo/fire.tlf', indexed=True)
+On a PC:        python3 bake.py Fire 600 fire.tlf 144 indexed compress
+"""
+import sys
+
+import host
+host.install()
+
+try:
+    import trickLED
+except ImportError:
+    # running from the samples directory on a PC
+    sys.path.append(sys.path[0] + '/..')
+    import trickLED
+from trickLED import animations
+from trickLED import animations32
+from trickLED import frames
+
+
+def bake_animation(name, n_frames, path, n_pixels=144, indexed=False, repeat_n=None, compress=False, **kwargs):
+    """
+    Bake n_frames of the animation class called name into path.
+
+    :param name: Class name in animations or animations32
+    :param n_frames: Number of frames
+    :param path: File to write
+    :param n_pixels: Strip length
+    :param indexed: Save palette indexes, for Fire and other animations in indexed color mode
+    :param repeat_n: repeat_n of the strip, only the calculated pixels are baked
+    :param compress: Save run length encoded key and delta frames
+    :param kwargs: Settings for the animation
+    :return: Number of bytes written
+    """
+    cls = getattr(animations, name, None) or getattr(animations32, name)
+    leds = trickLED.TrickLED(host.Pin(0), n_pixels, repeat_n=repeat_n)
+    size = frames.bake(cls(leds, **kwargs), path, n_frames, indexed, compress)
+    print('{}: {} frames of {} pixels, {} bytes'.format(path, n_frames, repeat_n or n_pixels, size))
+    return size
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print('usage: bake.py animation frames file [pixels] [indexed] [compress]')
+        sys.exit(1)
+    bake_animation(sys.argv[1], int(sys.argv[2]), sys.argv[3],
+                   int(sys.argv[4]) if len(sys.argv) > 4 else 144, 'indexed' in sys.argv[5:],
+                   compress='compress' in sys.argv[5:])
@@ -0,0 +1,175 @@
+"""
+Benchmark every animation off the board. Runs each class in animations and animations32 on strips of several lengths
+with the stand-ins from host.py and reports microseconds and bytes allocated per frame. Results can be saved as a
+JSON baseline and later runs compared against it, so regressions in the engine show up before flashing.
+
+CPython:                python3 benchmark.py [save|compare] [baseline file]
+MicroPython unix port:  micropython benchmark.py [save|compare] [baseline file]
+"""
+import gc
+import sys
+
+import host
+host.install()
+
+try:
+    import trickLED
+except ImportError:
+    # running from the samples directory on a PC
+    sys.path.append(sys.path[0] + '/..')
+    import trickLED
+from trickLED import animations
+from trickLED import animations32
+from trickLED import frames
+
+try:
+    import json
+except ImportError:
+    import ujson as json
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+import os
+import random
+
+SIZES = (10, 60, 144, 288)
+WARMUP_FRAMES = 5
+FRAMES = 100
+BASELINE = 'benchmark_baseline.json'
+# slower than the baseline by this fraction and by more than NOISE_US counts as a regression, allocating more than
+# NOISE_BYTES more per frame does too
+TOLERANCE = 0.25
+NOISE_US = 50
+NOISE_BYTES = 16
+FRAME_FILE = 'benchmark.tlf'
+# classes that only exist to be subclassed
+BASES = ('AnimationBase', 'MappedAnimationBase')
+
+
+def _frame_player(leds):
+    frames.bake(animations.Jitter(trickLED.TrickLED(host.Pin(0), leds.n)), FRAME_FILE, FRAMES + WARMUP_FRAMES)
+    return animations.FramePlayer(leds, FRAME_FILE)
+
+
+def _transition(leds):
+    # long enough to stay in the blend for every measured frame
+    return animations.Transition(leds, animations.Jitter(leds), animations.Rainbow(leds),
+                                 duration=(FRAMES + WARMUP_FRAMES) * 2 * 50)
+
+
+# animations that need more than a strip to be created
+FACTORIES = {
+    'FramePlayer': _frame_player,
+    'Transition': _transition,
+}
+
+
+def animation_classes():
+    """ (name, class) of every animation, sorted by name """
+    found = {}
+    for module in (animations, animations32):
+        for name in dir(module):
+            obj = getattr(module, name)
+            if isinstance(obj, type) and issubclass(obj, animations.AnimationBase) and name not in BASES:
+                found[name] = obj
+    return sorted(found.items())
+
+
+def run(name, cls, n):
+    """ Microseconds and bytes allocated per frame for cls on n pixels """
+    random.seed(1)
+    leds = trickLED.TrickLED(host.Pin(0), n)
+    factory = FACTORIES.get(name)
+    ani = factory(leds) if factory else cls(leds)
+    ani.start()
+    for _ in range(WARMUP_FRAMES):
+        ani.frame += 1
+        ani.update()
+        leds.write()
+    stats = ani.enable_stats(FRAMES)
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(FRAMES):
+            ani.frame += 1
+            stats.begin()
+            ani.update()
+            update_us = stats.elapsed()
+            leds.write()
+            stats.end(update_us, stats.elapsed() - update_us)
+    finally:
+        gc.enable()
+    return {'us': stats.summary('frame_us')[1], 'alloc': stats.summary('alloc')[1]}
+
+
+def compare(results, baseline):
+    """ Print the change from the baseline of each result, return the names of regressions """
+    regressions = []
+    for key in sorted(results):
+        res = results[key]
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if 'error' in res:
+            # an animation that starts failing is the worst regression, one that failed before is just noted
+            if 'error' not in base:
+                regressions.append(key)
+                print('{:<24} REGRESSION {}'.format(key, res['error']))
+            continue
+        if 'error' in base:
+            print('{:<24} fixed, no baseline'.format(key))
+            continue
+        d_us = res['us'] - base['us']
+        d_alloc = res['alloc'] - base['alloc']
+        worse = (d_us > NOISE_US and d_us > base['us'] * TOLERANCE) or d_alloc > NOISE_BYTES
+        if worse:
+            regressions.append(key)
+        print('{:<24} {:>+8d} us {:>+7d} B {}'.format(key, d_us, d_alloc, 'REGRESSION' if worse else ''))
+    return regressions
+
+
+def main(mode=None, path=BASELINE, sizes=SIZES):
+    """
+    Benchmark every animation at every size.
+
+    :param mode: 'save' to write the results to path, 'compare' to compare them with path
+    :param path: Baseline file
+    :param sizes: Strip lengths
+    :return: Results by 'Class/pixels'
+    """
+    if tracemalloc:
+        tracemalloc.start()
+    print('{:<24} {:>10} {:>10}'.format('animation/pixels', 'us/frame', 'B/frame'))
+    results = {}
+    for name, cls in animation_classes():
+        for n in sizes:
+            key = '{}/{}'.format(name, n)
+            try:
+                res = run(name, cls, n)
+                print('{:<24} {:>10d} {:>10d}'.format(key, res['us'], res['alloc']))
+            except Exception as e:
+                res = {'error': repr(e)}
+                print('{:<24} {}'.format(key, res['error']))
+            results[key] = res
+    try:
+        os.remove(FRAME_FILE)
+    except OSError:
+        pass
+    if mode == 'save':
+        with open(path, 'w') as f:
+            json.dump(results, f)
+        print('baseline saved to', path)
+    elif mode == 'compare':
+        with open(path) as f:
+            baseline = json.load(f)
+        print('\nchange from', path)
+        regressions = compare(results, baseline)
+        print('{} regressions'.format(len(regressions)))
+        if regressions:
+            sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None, sys.argv[2] if len(sys.argv) > 2 else BASELINE)
@@ -0,0 +1,74 @@
+"""
+Compare raw and run length encoded frame files: bytes per frame read from the SD card and the time to decode a frame.
+
+On the board:   import frames_benchmark; frames_benchmark.main('/sd/bench.tlf')
+On a PC:        python3 frames_benchmark.py
+"""
+import sys
+import time
+
+import host
+host.install()
+
+try:
+    import trickLED
+except ImportError:
+    # running from the samples directory on a PC
+    sys.path.append(sys.path[0] + '/..')
+    import trickLED
+from trickLED import animations
+from trickLED import animations32
+from trickLED import frames
+
+try:
+    from random import getrandbits
+except ImportError:
+    from urandom import getrandbits
+
+
+class Flicker(animations.AnimationBase):
+    """ Solid blade color at a random brightness each frame, like an unstable blade """
+
+    def __init__(self, leds, color=(255, 32, 0), **kwargs):
+        super().__init__(leds, **kwargs)
+        self.settings['color'] = color
+
+    def update(self):
+        level = 160 + getrandbits(6)
+        col = self.settings['color']
+        self.leds.fill((col[0] * level >> 8, col[1] * level >> 8, col[2] * level >> 8))
+
+
+def play(path, n_frames):
+    """ Read every frame of path, return the bytes read and microseconds per frame """
+    reader = frames.FrameReader(path)
+    buf = bytearray(reader.frame_size)
+    start = time.ticks_us()
+    for _ in range(n_frames):
+        reader.readinto(buf)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    size = reader.bytes_read
+    reader.close()
+    return size / n_frames, elapsed / n_frames
+
+
+def compare(name, make, path, n_frames, n_pixels, indexed=False):
+    results = []
+    for compress in (False, True):
+        leds = trickLED.TrickLED(host.Pin(0), n_pixels)
+        frames.bake(make(leds), path, n_frames, indexed, compress)
+        results.append(play(path, n_frames))
+    (raw, raw_us), (rle, rle_us) = results
+    print('{:<12} raw {:>7.1f} B/frame {:>7.1f} us - rle {:>7.1f} B/frame {:>7.1f} us - {:>5.1f}x less data'.format(
+        name, raw, raw_us, rle, rle_us, raw / rle))
+
+
+def main(path='bench.tlf', n_frames=200, n_pixels=144):
+    print('Frame files of {} frames on {} pixels'.format(n_frames, n_pixels))
+    compare('Flicker', lambda leds: Flicker(leds), path, n_frames, n_pixels)
+    compare('Jitter', lambda leds: animations.Jitter(leds), path, n_frames, n_pixels)
+    compare('Fire', lambda leds: animations32.Fire(leds), path, n_frames, n_pixels, indexed=True)
+
+
+if __name__ == '__main__':
+    main()
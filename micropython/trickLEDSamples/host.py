@@ -0,0 +1,86 @@
+"""
+Stand-ins for the MicroPython modules trickLED imports, so animations can run headless on a PC with CPython or the
+MicroPython unix port. install() only adds what is missing, on the board it does nothing.
+"""
+import sys
+import time
+
+
+class _Module:
+    pass
+
+
+class NeoPixel:
+    """ NeoPixel that keeps its buffer but does not drive anything """
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.timing = timing
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for j in range(self.bpp):
+            self.buf[offset + self.ORDER[j]] = v[j]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[j]] for j in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        pass
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 2
+
+    def __init__(self, pin_id, *args, **kwargs):
+        self.pin_id = pin_id
+
+    def init(self, *args, **kwargs):
+        pass
+
+
+def _ticks_us():
+    return time.perf_counter_ns() // 1000
+
+
+def install():
+    """ Register the stand-in modules that are missing """
+    try:
+        import micropython
+    except ImportError:
+        micropython = _Module()
+        micropython.const = lambda v: v
+        sys.modules['micropython'] = micropython
+    try:
+        import neopixel
+    except ImportError:
+        neopixel = _Module()
+        neopixel.NeoPixel = NeoPixel
+        sys.modules['neopixel'] = neopixel
+    try:
+        import machine
+        machine.Pin
+    except (ImportError, AttributeError):
+        machine = _Module()
+        machine.Pin = Pin
+        sys.modules['machine'] = machine
+    if not hasattr(time, 'ticks_us'):
+        time.ticks_us = _ticks_us
+        time.ticks_ms = lambda: _ticks_us() // 1000
+        time.ticks_add = lambda a, b: a + b
+        time.ticks_diff = lambda a, b: a - b
+        time.sleep_ms = lambda ms: time.sleep(ms / 1000)
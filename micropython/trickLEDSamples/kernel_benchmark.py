@@ -0,0 +1,91 @@
+"""
+Time the byte buffer kernels against the per pixel Python they replace and count the bytes each call allocates.
+What measuring itself costs is taken off. On the board the kernels allocate nothing, on a PC CPython still
+counts a few dozen bytes per call for its range iterators and large ints, the same for any number of pixels.
+
+On the board:   import kernel_benchmark; kernel_benchmark.main()
+On a PC:        python3 kernel_benchmark.py
+"""
+import gc
+import sys
+
+import host
+host.install()
+
+try:
+    import trickLED
+except ImportError:
+    # running from the samples directory on a PC
+    sys.path.append(sys.path[0] + '/..')
+    import trickLED
+from trickLED import generators
+from trickLED import kernels
+from trickLED import scheduler
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def rebuild_sub(bm, val):
+    """ How ByteMap.sub worked before the kernels """
+    bm.buf = bytearray([trickLED.uint8(v - val) for v in bm.buf])
+
+
+def next_fill(bm, gen):
+    """ How fill_gen worked before batch generators, one next() per pixel """
+    for i in range(bm.n):
+        bm[i] = next(gen)
+
+
+def _nothing():
+    pass
+
+
+def run(func, n_calls):
+    """ FrameStats of n_calls calls of func """
+    stats = scheduler.FrameStats(n_calls)
+    # the first call can allocate caches, it is not counted
+    func()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(n_calls):
+            stats.begin()
+            func()
+            stats.end(stats.elapsed(), 0)
+    finally:
+        gc.enable()
+    return stats.summary('frame_us')[1], stats.summary('alloc')[1]
+
+
+def measure(name, func, n_calls=50):
+    """ Print the average microseconds and bytes allocated per call of func, less what measuring costs """
+    base_us, base_alloc = run(_nothing, n_calls)
+    us, alloc = run(func, n_calls)
+    print('{:<28} {:>8d} us/call {:>8d} bytes/call'.format(name, max(us - base_us, 0), max(alloc - base_alloc, 0)))
+
+
+def main(n_pixels=4 * 144):
+    if tracemalloc:
+        tracemalloc.start()
+    print('Kernel benchmark on {} pixels, viper: {}'.format(
+        n_pixels, kernels.add_const.__class__.__name__ != 'function'))
+    bm = trickLED.ByteMap(n_pixels, bpi=3)
+    bm.fill((200, 100, 50))
+    measure('list comprehension sub', lambda: rebuild_sub(bm, 1))
+    bm.fill((200, 100, 50))
+    measure('ByteMap.sub int', lambda: bm.sub(1))
+    measure('ByteMap.add tuple', lambda: bm.add((1, 2, 3)))
+    measure('ByteMap.mul float', lambda: bm.mul(0.9))
+    measure('ByteMap.div int', lambda: bm.div(2))
+    heat = bytearray(n_pixels)
+    measure('kernels.sub_buf per pixel', lambda: kernels.sub_buf(bm.buf, 0, len(bm.buf), heat, 3))
+    gen = generators.stepped_color_wheel()
+    measure('next() per pixel generator', lambda: next_fill(bm, gen))
+    measure('ByteMap.fill_gen batch', lambda: bm.fill_gen(gen))
+
+
+if __name__ == '__main__':
+    main()
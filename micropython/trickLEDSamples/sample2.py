@@ -14,22 +14,19 @@ async def play(animation, n_frames, **kwargs):
     await animation.play(n_frames, **kwargs)
 
 
-async def demo_animations(leds, n_frames=200):
-    animation = animations.NextGen(leds)
-    print('NextGen settings: default')
-    await animation.play(n_frames)
-    print('NextGen settings: blanks=2, interval=150')
-    await animation.play(n_frames, blanks=2, interval=150)
+async def demo_animations(n_ticks=200):
+    # all four strips run from one clock, the last two update every other tick
+    group = animations.StripGroup(interval=50)
+    group.add(animations.NextGen(tl1))
+    group.add(animations.NextGen(tl2))
+    group.add(animations.NextGen(tl3, blanks=2), divisor=2)
+    group.add(animations.NextGen(tl4, blanks=2), divisor=2)
+    print('NextGen on four strips, blanks=2 at half rate on strips 3 and 4')
+    await group.play(n_ticks)
 
 
 async def main():
-    demos = [
-        asyncio.create_task(demo_animations(tl1, 100)),
-        asyncio.create_task(demo_animations(tl2, 100)),
-        asyncio.create_task(demo_animations(tl3, 100)),
-        asyncio.create_task(demo_animations(tl4, 100))
-    ]
-    await asyncio.gather(*demos)
+    await demo_animations(100)
 
 # LED_PIN
 LED1_PIN = 13